@@ -0,0 +1,48 @@
+"""
+Building blocks for listing filters.
+
+Each helper returns the condition for one field, shaped so that MongoDB can
+turn it into index bounds.
+"""
+import sys
+from typing import Any, Dict, Optional
+
+
+def range_condition(lower: Optional[Any] = None, upper: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    """
+    Build an inclusive range condition.
+
+    Args:
+        lower: Smallest accepted value, if bounded below
+        upper: Largest accepted value, if bounded above
+
+    Returns:
+        The condition, or None when neither bound is given
+    """
+    condition = {}
+    if lower is not None:
+        condition["$gte"] = lower
+    if upper is not None:
+        condition["$lte"] = upper
+    return condition or None
+
+
+def prefix_condition(prefix: str) -> Dict[str, Any]:
+    """
+    Build a condition matching strings that start with a prefix.
+
+    A half-open range is used instead of an anchored regex: it is an exact
+    index range scan and needs no escaping of the prefix. Strings compare by
+    code point (UTF-8 preserves that order), so every string starting with
+    the prefix sorts before the prefix with its last character incremented.
+
+    Args:
+        prefix: The required prefix (non-empty)
+
+    Returns:
+        The condition
+    """
+    last = ord(prefix[-1])
+    if last == sys.maxunicode:
+        return {"$gte": prefix}
+    return {"$gte": prefix, "$lt": prefix[:-1] + chr(last + 1)}
@@ -0,0 +1,209 @@
+"""
+Declarative index definitions for the landscape supply platform.
+
+Indexes are declared per collection and ensured on application startup.
+Creating an index that already exists with the same definition is a no-op,
+so ensure_indexes can safely run on every startup. An index whose definition
+changes gets a new name, and the old one is listed in REPLACED_INDEXES.
+"""
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import OperationFailure
+
+from database.outbox import OUTBOX_COLLECTION, STATUS_PENDING
+from settings import settings
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    # Product listing filters. Equality fields come first, then the sort
+    # field (which also serves price ranges), then _id as the tie-breaker of
+    # keyset pagination, so filtered pages are index scans with no sort.
+    "products": [
+        # Category browsing sorted by price, optionally within a price range
+        IndexModel(
+            [("category", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING)],
+            name="category_price",
+        ),
+        # Category browsing sorted by name
+        IndexModel(
+            [("category", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)],
+            name="category_name",
+        ),
+        # Supplier catalogs sorted by price
+        IndexModel(
+            [("supplier_name", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING)],
+            name="supplier_name_price",
+        ),
+        # Price ranges and price sorting across the whole catalog
+        IndexModel(
+            [("price", ASCENDING), ("_id", ASCENDING)],
+            name="price",
+        ),
+        # Name sorting across the whole catalog
+        IndexModel(
+            [("name", ASCENDING), ("_id", ASCENDING)],
+            name="name",
+        ),
+        # SKU is the natural key: lookups and upserts by SKU, and prefix
+        # searches. Sparse, so documents without a SKU do not collide on null.
+        IndexModel(
+            [("sku", ASCENDING)],
+            name="sku_unique",
+            unique=True,
+            sparse=True,
+        ),
+    ],
+    "quotes": [
+        # A customer's quotes, newest first. Status is left out of the keys
+        # and filtered while scanning: one customer has few quotes, and
+        # leading with status would force a sort for customer-only listings.
+        IndexModel(
+            [("customer_email", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="customer_email_created_at",
+        ),
+        # Quotes in a status, newest first or within a creation date range
+        IndexModel(
+            [("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="status_created_at",
+        ),
+        # Quotes in a status in the listing's default _id order, which
+        # status_created_at cannot return without sorting every match
+        IndexModel(
+            [("status", ASCENDING), ("_id", ASCENDING)],
+            name="status_id",
+        ),
+        # Creation date ranges across all quotes
+        IndexModel(
+            [("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="created_at",
+        ),
+        # Multikey index for finding the quotes that embed a product.
+        # The trailing _id lets propagation and the ?product_id= listing
+        # walk those quotes in _id order.
+        IndexModel(
+            [("line_items.product_id", ASCENDING), ("_id", ASCENDING)],
+            name="line_items_product_id",
+        ),
+        # Same keys restricted to open quotes, which are the only ones
+        # propagation rewrites. Its size follows live quotes, not history.
+        IndexModel(
+            [("line_items.product_id", ASCENDING), ("_id", ASCENDING)],
+            name="line_items_product_id_open",
+            partialFilterExpression={
+                "status": {"$in": settings.PROPAGATION_OPEN_STATUSES},
+            },
+        ),
+    ],
+    OUTBOX_COLLECTION: [
+        # Claiming picks the oldest task in a given status
+        IndexModel(
+            [("status", ASCENDING), ("_id", ASCENDING)],
+            name="status_id",
+        ),
+        # At most one pending task per product, which coalescing merges into
+        IndexModel(
+            [("product_id", ASCENDING)],
+            name="pending_product_id",
+            unique=True,
+            partialFilterExpression={"status": STATUS_PENDING},
+        ),
+        # Completed tasks are kept for a week for inspection and stats
+        IndexModel(
+            [("completed_at", ASCENDING)],
+            name="completed_at_ttl",
+            expireAfterSeconds=7 * 24 * 60 * 60,
+        ),
+    ],
+}
+
+# Indexes replaced by a declaration above: old index name -> replacement name
+REPLACED_INDEXES: Dict[str, Dict[str, str]] = {
+    # Non-unique SKU index, superseded by sku_unique
+    "products": {"sku": "sku_unique"},
+}
+
+# Server error code for dropping an index that does not exist
+INDEX_NOT_FOUND = 27
+
+# Duplicated values reported when a unique replacement cannot be built
+DUPLICATES_REPORTED = 5
+
+
+class IndexMigrationError(Exception):
+    """A replaced index cannot be dropped because its replacement cannot be built."""
+
+
+def _declared_index(collection_name: str, index_name: str) -> IndexModel:
+    """Find a declared index by collection and name."""
+    for index in INDEXES[collection_name]:
+        if index.document["name"] == index_name:
+            return index
+    raise KeyError(f"No index {index_name} is declared on {collection_name}")
+
+
+async def _check_unique(db: AsyncDatabase, collection_name: str, index: IndexModel) -> None:
+    """
+    Check that the documents of a collection satisfy a unique index.
+
+    Args:
+        db: The database holding the collection
+        collection_name: The collection the index is declared on
+        index: The unique index
+
+    Raises:
+        IndexMigrationError: If documents share the index's keys
+    """
+    fields = list(index.document["key"])
+    pipeline: List[Dict[str, Any]] = []
+    if index.document.get("sparse"):
+        pipeline.append({"$match": {"$or": [{field: {"$exists": True}} for field in fields]}})
+    pipeline += [
+        {"$group": {"_id": {field.replace(".", "_"): f"${field}" for field in fields},
+                    "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": DUPLICATES_REPORTED},
+    ]
+    duplicates = await (await db[collection_name].aggregate(pipeline)).to_list(None)
+    if duplicates:
+        values = ", ".join(str(duplicate["_id"]) for duplicate in duplicates)
+        raise IndexMigrationError(
+            f"Cannot create unique index {index.document['name']} on {collection_name}: "
+            f"documents share the same {', '.join(fields)} (e.g. {values}). "
+            f"Resolve the duplicates and restart; the existing indexes were left in place."
+        )
+
+
+async def ensure_indexes(db: AsyncDatabase) -> None:
+    """
+    Replace superseded indexes and create all declared indexes that do not exist yet.
+
+    A replaced index is only dropped once its replacement is known to
+    build, so a failed migration never leaves the collection without it:
+    when the replacement is unique, the collection is first checked for
+    duplicates.
+
+    Args:
+        db: The database to create the indexes in
+
+    Raises:
+        IndexMigrationError: If a unique replacement index cannot be built
+    """
+    for collection_name, replaced in REPLACED_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index_name, replacement_name in replaced.items():
+            if index_name not in existing:
+                continue
+            replacement = _declared_index(collection_name, replacement_name)
+            if replacement.document.get("unique"):
+                await _check_unique(db, collection_name, replacement)
+            try:
+                await db[collection_name].drop_index(index_name)
+            except OperationFailure as e:
+                # Another process starting up dropped it first
+                if e.code != INDEX_NOT_FOUND:
+                    raise
+
+    for collection_name, indexes in INDEXES.items():
+        if indexes:
+            await db[collection_name].create_indexes(indexes)
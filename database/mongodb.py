@@ -1,25 +1,91 @@
 """
 MongoDB connection setup for the landscape supply platform.
 
-This module provides async MongoDB connection management using Motor.
+This module provides async MongoDB connection management using PyMongo's
+native asyncio client.
 """
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import AsyncMongoClient, monitoring
+from pymongo.asynchronous.database import AsyncDatabase
 
+from database.monitoring import command_counter, command_metrics, command_timer
 from settings import settings
 
 
 class MongoDB:
     """MongoDB connection manager."""
 
-    client: Optional[AsyncIOMotorClient] = None
-    database: Optional[AsyncIOMotorDatabase] = None
+    client: Optional[AsyncMongoClient] = None
+    database: Optional[AsyncDatabase] = None
 
 
 mongodb = MongoDB()
 
 
+def client_options() -> Dict[str, Any]:
+    """
+    Get the pool, timeout and compression options from settings.
+
+    Returns:
+        Dict[str, Any]: Client keyword arguments, leaving out unset options
+    """
+    options = {
+        "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        "compressors": settings.MONGODB_COMPRESSORS or None,
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def create_client(
+    mongodb_url: str,
+    event_listeners: Iterable[monitoring.CommandListener] = (),
+    **overrides: Any,
+) -> AsyncMongoClient:
+    """
+    Create a MongoDB client configured for the application.
+
+    Datetimes are returned timezone-aware (UTC), pool, timeout and
+    compression options come from settings, and the application's command
+    listeners (round-trip counting, latency metrics, slow command logs and
+    Server-Timing) are registered alongside any extra ones given.
+
+    Args:
+        mongodb_url: The MongoDB connection string
+        event_listeners: Additional command listeners to register
+        **overrides: Client options replacing the ones from settings
+
+    Returns:
+        AsyncMongoClient: The new client
+    """
+    return AsyncMongoClient(
+        mongodb_url,
+        tz_aware=True,
+        event_listeners=[command_counter, command_metrics, command_timer, *event_listeners],
+        **{**client_options(), **overrides},
+    )
+
+
+def utc_now() -> datetime:
+    """
+    Get the current UTC time at the precision MongoDB stores.
+
+    BSON dates hold milliseconds, so a document built in Python with this
+    timestamp serializes the same as the document read back from MongoDB.
+
+    Returns:
+        datetime: The current time, truncated to milliseconds
+    """
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
 async def connect_to_mongodb() -> None:
     """
     Establish connection to MongoDB.
@@ -33,7 +99,7 @@ async def connect_to_mongodb() -> None:
 
     print(f"Connecting to MongoDB at {mongodb_url}, database: {db_name}")
 
-    mongodb.client = AsyncIOMotorClient(mongodb_url)
+    mongodb.client = create_client(mongodb_url)
     mongodb.database = mongodb.client[db_name]
 
     # Test the connection
@@ -51,16 +117,16 @@ async def close_mongodb_connection() -> None:
     Called on application shutdown.
     """
     if mongodb.client:
-        mongodb.client.close()
+        await mongodb.client.close()
         print("Closed MongoDB connection")
 
 
-def get_database() -> AsyncIOMotorDatabase:
+def get_database() -> AsyncDatabase:
     """
     Get the MongoDB database instance.
 
     Returns:
-        AsyncIOMotorDatabase: The database instance
+        AsyncDatabase: The database instance
 
     Raises:
         RuntimeError: If database connection is not established
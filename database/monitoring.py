@@ -0,0 +1,241 @@
+"""
+MongoDB command monitoring for the landscape supply platform.
+
+Listeners registered here are attached to every client created through
+database.mongodb.create_client.
+"""
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from metrics import CounterFamily, HistogramFamily, MetricFamily
+from settings import settings
+from timing import DB, record
+
+logger = logging.getLogger(__name__)
+
+# Fields holding the query of each command, whose shape slow command logs show
+QUERY_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "find": ("filter", "sort", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort", "update"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+
+# Statements or stages of a list-valued query field kept for its shape
+SHAPE_MAX_ITEMS = 20
+
+# How long a command without a socket timeout is tracked before it is
+# presumed abandoned. The driver publishes no event for a cancelled command.
+IN_FLIGHT_MAX_AGE_SECONDS = 600.0
+
+
+class RequestRoundTrips:
+    """Commands started while handling one request."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+
+current_round_trips: ContextVar[Optional[RequestRoundTrips]] = ContextVar(
+    "current_round_trips", default=None)
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Counts the commands (round trips) sent to MongoDB.
+
+    The asyncio client starts commands on the event loop thread, so the
+    counts need no lock. Besides the process total, each command is
+    counted for the request in context, if any: the started event is
+    published from the task that runs the command, so the count stays
+    exact while requests overlap. Tasks a request spawns copy its context
+    and count towards it too.
+    """
+
+    def __init__(self) -> None:
+        self._total = 0
+
+    @property
+    def total(self) -> int:
+        """Number of commands started since the process began."""
+        return self._total
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._total += 1
+        round_trips = current_round_trips.get()
+        if round_trips is not None:
+            round_trips.count += 1
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+
+command_counter = CommandCounter()
+
+
+def query_shape(value: Any) -> Any:
+    """
+    Reduce a query to its shape: field names and operators, without values.
+
+    Literal values become "?", so queries differing only in their values
+    have the same shape and the logs hold no customer data. Lists of
+    documents (pipelines, $or branches, update statements) keep one shape
+    per element; lists of values become a single "?".
+
+    Args:
+        value: A query document or part of one
+
+    Returns:
+        The shape of the value
+    """
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+        return [query_shape(item) for item in value]
+    return "?"
+
+
+def command_target(command_name: str, command: Dict[str, Any]) -> str:
+    """
+    Get the collection a command operates on.
+
+    Args:
+        command_name: The command name
+        command: The command document
+
+    Returns:
+        The collection name, or "" for commands not bound to a collection
+    """
+    if command_name == "getMore":
+        return command.get("collection", "")
+    target = command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+
+def _query_fields(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the query fields of a command, list-valued ones cut to SHAPE_MAX_ITEMS."""
+    fields = {}
+    for field in QUERY_FIELDS.get(command_name, ()):
+        if field in command:
+            value = command[field]
+            fields[field] = value[:SHAPE_MAX_ITEMS] if isinstance(value, list) else value
+    return fields
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Records latency histograms and failure counts per collection and command.
+
+    Commands slower than settings.MONGODB_SLOW_COMMAND_MS are logged as
+    warnings with their query shape. Between their start and end events,
+    only the collection, command name, start time and a bounded copy of the
+    query fields of the commands in flight are kept, and the shape is only
+    computed for slow commands. A cancelled command gets no end event, so
+    commands older than the socket timeout (or IN_FLIGHT_MAX_AGE_SECONDS
+    without one) are dropped as new ones start.
+    """
+
+    def __init__(self, registry: Optional[List[MetricFamily]] = None) -> None:
+        self.durations = HistogramFamily(
+            "mongodb_command_duration_seconds",
+            "Duration of MongoDB commands.",
+            ("collection", "command"),
+            registry=registry,
+        )
+        self.failures = CounterFamily(
+            "mongodb_command_failures_total",
+            "MongoDB commands that failed.",
+            ("collection", "command"),
+            registry=registry,
+        )
+        # (connection, request ID) -> (collection, command name, start time,
+        # query fields), in the order the commands started
+        self._in_flight: Dict[Tuple[Any, int], Tuple[str, str, float, Dict[str, Any]]] = {}
+
+    def _prune(self, now: float) -> None:
+        """Drop the commands that started too long ago to still be running."""
+        if settings.MONGODB_SOCKET_TIMEOUT_MS is not None:
+            max_age = settings.MONGODB_SOCKET_TIMEOUT_MS / 1000
+        else:
+            max_age = IN_FLIGHT_MAX_AGE_SECONDS
+        while self._in_flight:
+            oldest = next(iter(self._in_flight))
+            if now - self._in_flight[oldest][2] <= max_age:
+                break
+            del self._in_flight[oldest]
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        now = time.monotonic()
+        self._prune(now)
+        self._in_flight[(event.connection_id, event.request_id)] = (
+            command_target(event.command_name, event.command),
+            event.command_name,
+            now,
+            _query_fields(event.command_name, event.command),
+        )
+
+    def _finished(self, event: Any, failed: bool) -> None:
+        """Record the duration of a command, and its failure or slowness."""
+        started = self._in_flight.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        collection, command_name, _, query = started
+
+        seconds = event.duration_micros / 1_000_000
+        self.durations.labels(collection, command_name).observe(seconds)
+        if failed:
+            self.failures.inc(collection, command_name)
+
+        threshold = settings.MONGODB_SLOW_COMMAND_MS
+        if threshold is not None and seconds * 1000 >= threshold:
+            shape = {field: query_shape(value) for field, value in query.items()}
+            logger.warning(
+                "Slow MongoDB command: %s on %s took %.1f ms%s, shape %s",
+                command_name,
+                collection or "-",
+                seconds * 1000,
+                " and failed" if failed else "",
+                json.dumps(shape, default=str),
+            )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event, failed=True)
+
+
+command_metrics = CommandMetrics()
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Adds the duration of commands to the Server-Timing of the request.
+
+    The asyncio client publishes command events from the task that runs
+    the command, so the request's timings are in context when they arrive.
+    Outside timed requests recording is a no-op.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        record(DB, event.duration_micros / 1_000_000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        record(DB, event.duration_micros / 1_000_000)
+
+
+command_timer = CommandTimer()
@@ -0,0 +1,456 @@
+"""
+Durable outbox for propagating product changes into quotes.
+
+Product updates only record a propagation task in the outbox collection.
+A worker (scripts/propagation_worker.py) claims tasks, rewrites the affected
+quotes in _id-ordered chunks and checkpoints after every chunk, so a crash
+or redeploy resumes from the last checkpoint instead of starting over.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from database.propagation import (
+    build_products_propagation_filter,
+    build_propagation_filter,
+    propagate_product_to_quotes,
+    propagate_products_to_quotes,
+)
+from settings import settings
+
+OUTBOX_COLLECTION = "outbox"
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+
+
+def _enqueue_update(
+    now: datetime,
+    update_count: int = 1,
+    product_ids: Optional[List[str]] = None,
+    settles_at: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build the upsert pipeline that records a pending task or merges into one.
+
+    The task settles no sooner than the product cache TTL (plus a margin)
+    after the latest update merged into it. Other API processes may serve
+    the products' previous state from their caches until then, and a quote
+    created from such an entry after the pass had run would keep the old
+    values for good. Tasks are queued before the product is written, so
+    the margin covers caches filled between the enqueue and the write.
+
+    Updates merging into a task push its settling time back, but the task
+    becomes runnable no later than PROPAGATION_MAX_DELAY_SECONDS after it
+    was created, so a product updated continuously is still propagated. A
+    task run before it settled queues a follow-up pass (see process_task).
+
+    Args:
+        now: The current time
+        update_count: Number of product updates the task absorbs
+        product_ids: Products to add to a bulk task
+        settles_at: Settling time of a follow-up pass, which absorbs no
+            update (defaults to the delay after now)
+
+    Returns:
+        An aggregation pipeline usable as the update of an upsert
+    """
+    delay = max(
+        settings.PROPAGATION_COALESCE_WINDOW_SECONDS,
+        settings.PRODUCT_CACHE_TTL_SECONDS + settings.PROPAGATION_WRITE_MARGIN_SECONDS,
+    )
+    if settles_at is None:
+        settles_at = now + timedelta(seconds=delay)
+    # Never shorter than the delay, so a follow-up pass settles in time
+    max_delay_ms = max(settings.PROPAGATION_MAX_DELAY_SECONDS, delay) * 1000
+
+    # Pipeline updates have no $setOnInsert; $ifNull keeps a merged task's values
+    fields: Dict[str, Any] = {
+        "last_quote_id": {"$ifNull": ["$last_quote_id", None]},
+        "quotes_modified": {"$ifNull": ["$quotes_modified", 0]},
+        "worker_id": {"$ifNull": ["$worker_id", None]},
+        "locked_until": {"$ifNull": ["$locked_until", None]},
+        "created_at": {"$ifNull": ["$created_at", now]},
+        "updated_at": now,
+        "settled_at": {"$max": ["$settled_at", settles_at]},
+        "update_count": {"$add": [{"$ifNull": ["$update_count", 0]}, update_count]},
+    }
+    if product_ids is not None:
+        # Append the products the task does not list yet, in order
+        listed = {"$ifNull": ["$product_ids", []]}
+        fields["product_ids"] = {"$concatArrays": [listed, {"$filter": {
+            "input": {"$literal": product_ids},
+            "cond": {"$not": [{"$in": ["$$this", listed]}]},
+        }}]}
+    return [
+        {"$set": fields},
+        {"$set": {"available_at": {
+            "$min": ["$settled_at", {"$add": ["$created_at", max_delay_ms]}],
+        }}},
+    ]
+
+
+async def enqueue_propagation(db: AsyncDatabase, product_id: str) -> ObjectId:
+    """
+    Record a propagation task for a product, coalescing with a pending one.
+
+    A new task only becomes runnable once the coalescing window (and the
+    product cache TTL, see _enqueue_update) has passed. Further updates of
+    the same product in the meantime merge into the pending task instead
+    of adding another pass over the quotes, and push it back so it still
+    runs after the cache TTL following the latest of them, up to
+    PROPAGATION_MAX_DELAY_SECONDS after the task was created. The task
+    only references the product; the worker reads the product's current
+    state when it runs, so a merged task applies the latest data.
+
+    Args:
+        db: The database holding the outbox collection
+        product_id: The ID of the product whose quotes need updating
+
+    Returns:
+        The ID of the pending task
+    """
+    query = {"product_id": product_id, "status": STATUS_PENDING}
+    update = _enqueue_update(datetime.now(timezone.utc))
+
+    try:
+        task = await db[OUTBOX_COLLECTION].find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent update inserted the pending task first; merge into it
+        task = await db[OUTBOX_COLLECTION].find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    return task["_id"]
+
+
+async def enqueue_propagations(db: AsyncDatabase, product_ids: Iterable[str]) -> int:
+    """
+    Record propagation tasks for many products in one round trip.
+
+    Behaves like enqueue_propagation for each product, for bulk writes that
+    change many products at once.
+
+    Args:
+        db: The database holding the outbox collection
+        product_ids: The IDs of the products whose quotes need updating
+
+    Returns:
+        The number of products enqueued
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return 0
+
+    update = _enqueue_update(datetime.now(timezone.utc))
+    operations = [
+        UpdateOne({"product_id": product_id, "status": STATUS_PENDING}, update, upsert=True)
+        for product_id in product_ids
+    ]
+    try:
+        await db[OUTBOX_COLLECTION].bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # Products whose pending task a concurrent update inserted first are
+        # merged into it; any other failure is not ours to swallow
+        retry = []
+        for error in e.details["writeErrors"]:
+            if error["code"] != 11000:
+                raise
+            retry.append(operations[error["index"]])
+        await db[OUTBOX_COLLECTION].bulk_write(retry, ordered=False)
+    return len(product_ids)
+
+
+async def enqueue_bulk_propagation(
+    db: AsyncDatabase, product_ids: Iterable[str]
+) -> Optional[ObjectId]:
+    """
+    Record one propagation task covering many products.
+
+    For changes applied to many products at once, such as a bulk price
+    adjustment. Instead of a task per product, the products are added to a
+    single pending bulk task (product_id None, product_ids listing them),
+    which the worker propagates in one pass over the quotes. Bulk changes
+    made during its coalescing window merge into the same task.
+
+    Args:
+        db: The database holding the outbox collection
+        product_ids: The IDs of the products whose quotes need updating
+
+    Returns:
+        The ID of the pending task, or None if there were no products
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    if not product_ids:
+        return None
+
+    query = {"product_id": None, "status": STATUS_PENDING}
+    update = _enqueue_update(
+        datetime.now(timezone.utc), update_count=len(product_ids), product_ids=product_ids)
+
+    try:
+        task = await db[OUTBOX_COLLECTION].find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent bulk change inserted the pending task first; merge into it
+        task = await db[OUTBOX_COLLECTION].find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    return task["_id"]
+
+
+async def _enqueue_follow_up(db: AsyncDatabase, task: Dict[str, Any]) -> None:
+    """
+    Queue one more pass for a task that ran before it settled.
+
+    The pass runs once the task's settling time has passed, merging into
+    any pending task for the same products. It absorbs no update, so it
+    counts as a pass without adding to the updates received.
+
+    Args:
+        db: The database holding the outbox collection
+        task: The task that ran before it settled
+    """
+    bulk = task.get("product_id") is None
+    query = {"product_id": task.get("product_id"), "status": STATUS_PENDING}
+    update = _enqueue_update(
+        datetime.now(timezone.utc),
+        update_count=0,
+        product_ids=task["product_ids"] if bulk else None,
+        settles_at=task["settled_at"],
+    )
+    try:
+        await db[OUTBOX_COLLECTION].update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # An update of the same products inserted the pending task first
+        await db[OUTBOX_COLLECTION].update_one(query, update, upsert=True)
+
+
+async def claim_task(
+    db: AsyncDatabase, worker_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Claim the oldest runnable task for a worker.
+
+    Pending tasks are runnable once their coalescing window has passed, as
+    are processing tasks whose lease expired because their worker stopped
+    before finishing them.
+
+    Args:
+        db: The database holding the outbox collection
+        worker_id: Identifier of the claiming worker
+
+    Returns:
+        The claimed task, or None if nothing is runnable
+    """
+    now = datetime.now(timezone.utc)
+    return await db[OUTBOX_COLLECTION].find_one_and_update(
+        {
+            "$or": [
+                {"status": STATUS_PENDING, "available_at": {"$lte": now}},
+                {"status": STATUS_PROCESSING, "locked_until": {"$lt": now}},
+            ]
+        },
+        {
+            "$set": {
+                "status": STATUS_PROCESSING,
+                "worker_id": worker_id,
+                "locked_until": now + timedelta(seconds=settings.PROPAGATION_LEASE_SECONDS),
+                "updated_at": now,
+            }
+        },
+        sort=[("_id", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _next_chunk_end(
+    db: AsyncDatabase,
+    quote_filter: Dict[str, Any],
+    after: Optional[ObjectId],
+    chunk_size: int,
+) -> Optional[ObjectId]:
+    """Find the _id of the last quote in the next chunk, or None for the final chunk."""
+    query = dict(quote_filter)
+    if after is not None:
+        query["_id"] = {"$gt": after}
+
+    cursor = (
+        db["quotes"]
+        .find(query, {"_id": 1})
+        .sort("_id", ASCENDING)
+        .skip(chunk_size - 1)
+        .limit(1)
+    )
+    async for quote in cursor:
+        return quote["_id"]
+    return None
+
+
+async def process_task(
+    db: AsyncDatabase,
+    task: Dict[str, Any],
+    worker_id: str,
+    chunk_size: Optional[int] = None,
+) -> bool:
+    """
+    Propagate a claimed task chunk by chunk, checkpointing after each chunk.
+
+    A bulk task (one listing product_ids) propagates all of its products
+    together, so each chunk of quotes is rewritten once however many of its
+    products changed.
+
+    Args:
+        db: The database holding the outbox and quotes collections
+        task: The claimed task document
+        worker_id: Identifier of the worker holding the task
+        chunk_size: Number of quotes per chunk (defaults to settings)
+
+    Returns:
+        True if the task was completed, False if the lease was lost to
+        another worker
+    """
+    outbox = db[OUTBOX_COLLECTION]
+    chunk_size = chunk_size or settings.PROPAGATION_CHUNK_SIZE
+    last_quote_id = task.get("last_quote_id")
+
+    bulk = task.get("product_id") is None
+    product_ids = task["product_ids"] if bulk else [task["product_id"]]
+    products: List[Dict[str, Any]] = await db["products"].find(
+        {"_id": {"$in": [ObjectId(product_id) for product_id in product_ids]}},
+        {"name": 1, "price": 1, "unit": 1},
+    ).to_list(None)
+
+    if bulk:
+        quote_filter = build_products_propagation_filter(products)
+    elif products:
+        quote_filter = build_propagation_filter(products[0])
+
+    # Deleted products leave nothing to propagate
+    modified = 0
+
+    while products:
+        chunk_end = await _next_chunk_end(db, quote_filter, last_quote_id, chunk_size)
+
+        id_range: Dict[str, Any] = {}
+        if last_quote_id is not None:
+            id_range["$gt"] = last_quote_id
+        if chunk_end is not None:
+            id_range["$lte"] = chunk_end
+
+        id_filter = {"_id": id_range} if id_range else None
+        if bulk:
+            modified = await propagate_products_to_quotes(db, products, id_filter)
+        else:
+            modified = await propagate_product_to_quotes(db, products[0], id_filter)
+
+        # The final chunk is recorded together with completing the task
+        if chunk_end is None:
+            break
+
+        # Checkpoint the chunk and renew the lease
+        now = datetime.now(timezone.utc)
+        result = await outbox.update_one(
+            {"_id": task["_id"], "worker_id": worker_id},
+            {
+                "$set": {
+                    "last_quote_id": chunk_end,
+                    "locked_until": now + timedelta(seconds=settings.PROPAGATION_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": {"quotes_modified": modified},
+            },
+        )
+        if result.matched_count == 0:
+            return False
+        last_quote_id = chunk_end
+
+    # A task run at its maximum delay may have started while other processes
+    # still cached the previous state of its products. The follow-up is
+    # queued before the task completes, so a crash in between cannot lose it.
+    settled_at = task.get("settled_at")
+    if settled_at is not None and settled_at > task["available_at"]:
+        await _enqueue_follow_up(db, task)
+
+    now = datetime.now(timezone.utc)
+    result = await outbox.update_one(
+        {"_id": task["_id"], "worker_id": worker_id},
+        {
+            "$set": {
+                "status": STATUS_DONE,
+                "locked_until": None,
+                "completed_at": now,
+                "updated_at": now,
+            },
+            "$inc": {"quotes_modified": modified},
+        },
+    )
+    return result.matched_count == 1
+
+
+async def drain_outbox(
+    db: AsyncDatabase,
+    worker_id: str,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """
+    Process runnable tasks until the outbox has none left.
+
+    Args:
+        db: The database holding the outbox and quotes collections
+        worker_id: Identifier of the draining worker
+        chunk_size: Number of quotes per chunk (defaults to settings)
+
+    Returns:
+        The number of tasks completed
+    """
+    completed = 0
+    while (task := await claim_task(db, worker_id)) is not None:
+        if await process_task(db, task, worker_id, chunk_size):
+            completed += 1
+    return completed
+
+
+async def get_outbox_stats(db: AsyncDatabase) -> Dict[str, int]:
+    """
+    Summarize the outbox, including how many passes coalescing saved.
+
+    Every product update counts once in update_count of the task it was
+    merged into, so the passes saved are the updates received minus the
+    tasks that were created for them. Completed tasks expire after a week,
+    so the figures cover that window.
+
+    Args:
+        db: The database holding the outbox collection
+
+    Returns:
+        Task counts per status, updates received, passes and passes saved
+    """
+    stats = {
+        STATUS_PENDING: 0,
+        STATUS_PROCESSING: 0,
+        STATUS_DONE: 0,
+        "updates_received": 0,
+        "passes": 0,
+    }
+    pipeline = [
+        {"$group": {
+            "_id": "$status",
+            "tasks": {"$sum": 1},
+            "updates": {"$sum": "$update_count"},
+        }},
+    ]
+    async for group in await db[OUTBOX_COLLECTION].aggregate(pipeline):
+        stats[group["_id"]] = group["tasks"]
+        stats["updates_received"] += group["updates"]
+        stats["passes"] += group["tasks"]
+
+    stats["passes_saved"] = stats["updates_received"] - stats["passes"]
+    return stats
@@ -0,0 +1,160 @@
+"""
+Keyset (cursor-based) pagination for MongoDB collections.
+
+A page is read by sorting on a unique key and continuing strictly after the
+last document of the previous page, so every page costs an index range scan
+no matter how deep into the collection it is. The position is handed to
+clients as an opaque cursor token.
+"""
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import json_util
+from pymongo import ASCENDING
+from pymongo.asynchronous.collection import AsyncCollection
+
+# Sort specification: (field, direction) pairs ending with _id as tie-breaker
+SortSpec = Sequence[Tuple[str, int]]
+
+ID_SORT: SortSpec = (("_id", ASCENDING),)
+
+
+def encode_cursor(sort: SortSpec, document: Dict[str, Any]) -> str:
+    """
+    Encode the position right after a document as an opaque cursor token.
+
+    Args:
+        sort: The sort specification of the listing
+        document: The last document of the page
+
+    Returns:
+        A URL-safe cursor token
+    """
+    payload = {
+        "fields": [field for field, _ in sort],
+        "values": [document[field] for field, _ in sort],
+    }
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode()
+
+
+def decode_cursor(sort: SortSpec, token: str) -> List[Any]:
+    """
+    Decode a cursor token into the sort values it points after.
+
+    Args:
+        sort: The sort specification of the listing
+        token: A token produced by encode_cursor
+
+    Returns:
+        The sort values of the last document of the previous page
+
+    Raises:
+        ValueError: If the token is malformed or was issued for another sort
+    """
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(token.encode()))
+        fields, values = payload["fields"], payload["values"]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if fields != [field for field, _ in sort] or len(values) != len(fields):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: SortSpec, values: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Build the filter selecting documents that sort after the given values.
+
+    For a sort on (a, _id) this is: a > v_a OR (a == v_a AND _id > v_id),
+    with > replaced by < for descending fields.
+
+    Args:
+        sort: The sort specification of the listing
+        values: The sort values of the last document of the previous page
+
+    Returns:
+        A filter document
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        operator = "$gt" if direction == ASCENDING else "$lt"
+        branch = {sort[j][0]: values[j] for j in range(i)}
+        branch[field] = {operator: values[i]}
+        branches.append(branch)
+
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+
+def page_query(
+    query: Dict[str, Any], sort: SortSpec, after: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Combine a listing filter with the keyset condition of a cursor token.
+
+    Args:
+        query: The listing filter
+        sort: The sort specification of the listing
+        after: Cursor token of the previous page, if any
+
+    Returns:
+        The filter for the requested page
+
+    Raises:
+        ValueError: If the cursor token is invalid
+    """
+    if after is None:
+        return query
+    condition = keyset_filter(sort, decode_cursor(sort, after))
+    return {"$and": [query, condition]} if query else condition
+
+
+async def fetch_page(
+    collection: AsyncCollection,
+    query: Dict[str, Any],
+    sort: SortSpec,
+    limit: int,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page of documents and the cursor token for the next page.
+
+    One extra document is requested to tell whether another page exists.
+    Sort fields left out of the projection are still read, since the next
+    cursor is built from them, and removed from the returned documents.
+
+    Args:
+        collection: The collection to read from
+        query: The page filter, as built by page_query
+        sort: The sort specification of the listing
+        limit: Maximum number of documents in the page
+        projection: Optional projection of the returned fields
+
+    Returns:
+        The page's documents and the next cursor token (None on the last page)
+    """
+    hidden_fields = []
+    if projection is not None:
+        # _id is returned unless explicitly excluded
+        hidden_fields = [
+            field for field, _ in sort if field not in projection and field != "_id"
+        ]
+        projection = {**projection, **{field: 1 for field in hidden_fields}}
+
+    cursor = (
+        collection.find(query, projection)
+        .sort(list(sort))
+        .limit(limit + 1)
+    )
+    documents = await cursor.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(sort, documents[-1])
+
+    for document in documents:
+        for field in hidden_fields:
+            document.pop(field, None)
+    return documents, next_cursor
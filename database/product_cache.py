@@ -0,0 +1,202 @@
+"""
+In-process read-through cache of product documents.
+
+The product catalog is small and read on every quote creation, so recently
+read products are kept in memory, bounded in number (least recently used
+entries are evicted first) and in age (entries expire after a TTL).
+
+Routes that write products invalidate the entries they touch. Each API
+process has its own cache and does not see invalidations made by other
+processes, so the TTL bounds how stale a product read from the cache can be.
+Code that must see the latest product state, such as the propagation
+worker, reads from the database directly.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.asynchronous.collection import AsyncCollection
+
+from settings import settings
+
+
+class ProductCache:
+    """
+    LRU cache of product documents keyed by their string ID, with a TTL.
+
+    Cached products can also be found by SKU, through an index of the SKUs
+    of the cached documents. Cached documents are shared between requests
+    and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # SKU -> ID of the cached product carrying it
+        self._skus: Dict[str, str] = {}
+        # Bumped by every invalidation, so a database read that overlapped
+        # with a write is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached product, counting a hit or a miss.
+
+        Args:
+            product_id: The product ID
+
+        Returns:
+            The product document, or None if it is not cached or has expired
+        """
+        entry = self._entries.get(product_id)
+        if entry is not None and entry[0] > self._clock():
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+            return entry[1]
+
+        if entry is not None:
+            self._drop(product_id)
+        self.misses += 1
+        return None
+
+    def _drop(self, product_id: str) -> None:
+        """Remove a product and its SKU from the cache, if present."""
+        entry = self._entries.pop(product_id, None)
+        if entry is not None and self._skus.get(entry[1].get("sku")) == product_id:
+            del self._skus[entry[1]["sku"]]
+
+    def put(self, product_id: str, document: Dict[str, Any]) -> None:
+        """
+        Cache a product, evicting the least recently used one when full.
+
+        Args:
+            product_id: The product ID
+            document: The product document
+        """
+        if self.max_size <= 0:
+            return
+        self._drop(product_id)
+        self._entries[product_id] = (self._clock() + self.ttl_seconds, document)
+        if "sku" in document:
+            self._skus[document["sku"]] = product_id
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, product_id: str) -> None:
+        """
+        Drop a product from the cache after it was written.
+
+        Args:
+            product_id: The product ID
+        """
+        self._generation += 1
+        self._drop(product_id)
+
+    def clear(self) -> None:
+        """Drop every cached product and reset the counters."""
+        self._generation += 1
+        self._entries.clear()
+        self._skus.clear()
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(
+        self,
+        collection: AsyncCollection,
+        product_ids: Iterable[ObjectId],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Read products through the cache.
+
+        Products that are not cached are fetched with a single $in query
+        and cached.
+
+        Args:
+            collection: The products collection
+            product_ids: IDs of the products to read
+
+        Returns:
+            The products found, keyed by string ID. Missing products are left out.
+        """
+        products = {}
+        missing = []
+        for product_id in set(product_ids):
+            document = self.get(str(product_id))
+            if document is None:
+                missing.append(product_id)
+            else:
+                products[str(product_id)] = document
+
+        if missing:
+            generation = self._generation
+            # The batch size keeps large lookups from needing a getMore
+            async for document in collection.find(
+                {"_id": {"$in": missing}}, batch_size=len(missing)
+            ):
+                products[str(document["_id"])] = document
+                if generation == self._generation:
+                    self.put(str(document["_id"]), document)
+
+        return products
+
+    async def get_one(
+        self, collection: AsyncCollection, product_id: ObjectId
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read one product through the cache.
+
+        Args:
+            collection: The products collection
+            product_id: ID of the product to read
+
+        Returns:
+            The product document, or None if it does not exist
+        """
+        products = await self.get_many(collection, [product_id])
+        return products.get(str(product_id))
+
+    async def get_by_sku(
+        self, collection: AsyncCollection, sku: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read one product by SKU through the cache.
+
+        Args:
+            collection: The products collection
+            sku: SKU of the product to read
+
+        Returns:
+            The product document, or None if no product has the SKU
+        """
+        product_id = self._skus.get(sku)
+        if product_id is not None:
+            document = self.get(product_id)
+            if document is not None:
+                return document
+        else:
+            self.misses += 1
+
+        generation = self._generation
+        document = await collection.find_one({"sku": sku})
+        if document is not None and generation == self._generation:
+            self.put(str(document["_id"]), document)
+        return document
+
+
+product_cache = ProductCache(
+    max_size=settings.PRODUCT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRODUCT_CACHE_TTL_SECONDS,
+)
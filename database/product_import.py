@@ -0,0 +1,165 @@
+"""
+Bulk writes of imported products.
+
+Imports arrive in batches of already validated rows. Each batch is written
+with one unordered bulk operation, so a row that fails (for example on a
+unique index) is reported on its own while the rest of the batch is
+written. Rows that change a product embedded in quotes queue propagation
+in the outbox, exactly like single product updates.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError
+
+from database.mongodb import utc_now
+from database.outbox import enqueue_propagations
+from database.product_cache import product_cache
+from database.propagation import DENORMALIZED_FIELDS, denormalized_fields_changed
+
+# Insert every row as a new product
+MODE_INSERT = "insert"
+# Update the product with the row's sku, or insert it if there is none
+MODE_UPSERT = "upsert"
+# Like upsert, but only write rows that differ from their product
+MODE_DIFF = "diff"
+
+# (row number, validated product fields)
+ImportRow = Tuple[int, Dict[str, Any]]
+
+
+def _write_errors(rows: List[ImportRow], error: BulkWriteError) -> Dict[int, Dict[str, Any]]:
+    """Map the positions of failed operations to per-row error reports."""
+    failed = {}
+    for write_error in error.details["writeErrors"]:
+        row_number, fields = rows[write_error["index"]]
+        failed[write_error["index"]] = {
+            "row": row_number,
+            "sku": fields.get("sku"),
+            "message": write_error["errmsg"],
+        }
+    return failed
+
+
+async def insert_products(
+    db: AsyncDatabase, rows: List[ImportRow]
+) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+    """
+    Insert a batch of rows as new products with one unordered insert_many.
+
+    Args:
+        db: The database holding the products collection
+        rows: The batch of validated rows
+
+    Returns:
+        Counts of inserted products, and an error report for each failed row
+    """
+    now = utc_now()
+    documents = [{**fields, "created_at": now, "updated_at": now} for _, fields in rows]
+    failed: Dict[int, Dict[str, Any]] = {}
+    try:
+        await db["products"].insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        failed = _write_errors(rows, e)
+
+    counts = {"inserted": len(rows) - len(failed), "updated": 0, "unchanged": 0}
+    return counts, list(failed.values())
+
+
+async def upsert_products(
+    db: AsyncDatabase, rows: List[ImportRow], skip_unchanged: bool = False
+) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+    """
+    Upsert a batch of rows by sku with one unordered bulk_write.
+
+    The existing products are read first (one $in query on sku) so that
+    propagation is queued only for products whose embedded fields change.
+    It is queued before the batch is written, so a failed import cannot
+    leave products changed without a task; a row that then fails to write
+    only costs its task a pass finding the quotes up to date.
+
+    With skip_unchanged (diff mode) every field of the existing products is
+    read, rows identical to their product are not written at all, and
+    changed rows only set the fields that differ. Re-sending a whole
+    catalog then only writes, and re-indexes, what actually changed.
+
+    Args:
+        db: The database holding the products collection
+        rows: The batch of validated rows
+        skip_unchanged: Whether to diff rows against their products
+
+    Returns:
+        Counts of inserted, updated and unchanged products, and an error
+        report for each failed row
+    """
+    products_collection = db["products"]
+    skus = list({fields["sku"] for _, fields in rows})
+    if skip_unchanged:
+        compared_fields = {field for _, fields in rows for field in fields}
+    else:
+        compared_fields = {"sku", *DENORMALIZED_FIELDS}
+    existing = {
+        product["sku"]: product
+        async for product in products_collection.find(
+            {"sku": {"$in": skus}},
+            {field: 1 for field in compared_fields},
+            batch_size=len(skus),
+        )
+    }
+
+    now = utc_now()
+    unchanged = 0
+    # Rows to write, with the state of their product before the row
+    written: List[Tuple[ImportRow, Optional[Dict[str, Any]]]] = []
+    operations = []
+    changed = []
+    for row in rows:
+        _, fields = row
+        product = existing.get(fields["sku"])
+        changes = fields
+        if skip_unchanged and product is not None:
+            changes = {
+                field: value for field, value in fields.items() if product.get(field) != value
+            }
+            if not changes:
+                unchanged += 1
+                continue
+
+        operations.append(UpdateOne(
+            {"sku": fields["sku"]},
+            {"$set": {**changes, "updated_at": now}, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        ))
+        written.append((row, product))
+        # Products inserted earlier in the batch have no _id and are not quoted yet
+        if product is not None and "_id" in product:
+            if denormalized_fields_changed(product, fields):
+                changed.append(str(product["_id"]))
+        # Later rows with the same sku compare against the product this row writes
+        existing[fields["sku"]] = {**(product or {}), **fields}
+
+    await enqueue_propagations(db, changed)
+
+    failed: Dict[int, Dict[str, Any]] = {}
+    if operations:
+        try:
+            await products_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            failed = _write_errors([row for row, _ in written], e)
+
+    updated = 0
+    for index, (_, product) in enumerate(written):
+        if index in failed or product is None:
+            continue
+        updated += 1
+        # Products inserted earlier in the batch are not cached
+        if "_id" in product:
+            product_cache.invalidate(str(product["_id"]))
+
+    counts = {
+        "inserted": len(written) - len(failed) - updated,
+        "updated": updated,
+        "unchanged": unchanged,
+    }
+    return counts, list(failed.values())
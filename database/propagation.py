@@ -0,0 +1,266 @@
+"""
+Propagation of product changes into the quotes that embed them.
+
+Quotes denormalize product_name, product_price and product_unit into each
+line item. When a product changes, the embedded copies are rewritten inside
+MongoDB with a single update_many driven by an aggregation pipeline, so no
+quote document is ever read into Python.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo.asynchronous.database import AsyncDatabase
+
+from settings import settings
+
+# Product fields copied into quote line items (as product_name, product_price
+# and product_unit). Changes to any other product field leave quotes as is.
+DENORMALIZED_FIELDS = ("name", "price", "unit")
+
+
+def denormalized_fields_changed(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """
+    Check whether any product field embedded in quotes changed value.
+
+    Args:
+        old: The product document before the change
+        new: The product document after the change
+
+    Returns:
+        True if quotes need propagation, False otherwise
+    """
+    return any(old.get(field) != new.get(field) for field in DENORMALIZED_FIELDS)
+
+
+def build_propagation_filter(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the filter matching open quotes with stale line items for a product.
+
+    Only quotes in one of the open statuses are matched; closed quotes keep
+    their committed pricing. Quotes whose line items already carry the
+    current product state are excluded, which keeps repeated propagations
+    of the same state cheap.
+
+    Args:
+        product: Product document (must include _id, name, price and unit)
+
+    Returns:
+        A filter document for the quotes collection
+    """
+    return {
+        "status": {"$in": settings.PROPAGATION_OPEN_STATUSES},
+        "line_items": {"$elemMatch": _stale_line_item(product)},
+    }
+
+
+def _stale_line_item(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the condition matching a line item of a product that is out of date."""
+    return {
+        "product_id": str(product["_id"]),
+        "$or": [
+            {"product_name": {"$ne": product["name"]}},
+            {"product_price": {"$ne": product["price"]}},
+            {"product_unit": {"$ne": product["unit"]}},
+        ],
+    }
+
+
+def build_propagation_pipeline(product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Build the update pipeline that rewrites a product's denormalized fields.
+
+    Matching line items get the new name, price and unit, and their
+    line_total is recomputed from the stored quantity. The quote's
+    total_amount is then recomputed from all of its line totals.
+
+    Args:
+        product: Product document (must include _id, name, price and unit)
+
+    Returns:
+        An aggregation pipeline usable as the update of update_many
+    """
+    product_id = str(product["_id"])
+    price = product["price"]
+
+    # $literal keeps values such as "$5 bag" from being read as field paths
+    updated_fields = {
+        "product_name": {"$literal": product["name"]},
+        "product_price": {"$literal": price},
+        "product_unit": {"$literal": product["unit"]},
+        "line_total": {"$multiply": ["$$item.quantity", {"$literal": price}]},
+    }
+
+    return [
+        {
+            "$set": {
+                "line_items": {
+                    "$map": {
+                        "input": "$line_items",
+                        "as": "item",
+                        "in": {
+                            "$cond": [
+                                {"$eq": ["$$item.product_id", product_id]},
+                                {"$mergeObjects": ["$$item", updated_fields]},
+                                "$$item",
+                            ]
+                        },
+                    }
+                }
+            }
+        },
+        {
+            "$set": {
+                "total_amount": {"$sum": "$line_items.line_total"},
+                "updated_at": {"$literal": datetime.now(timezone.utc)},
+            }
+        },
+    ]
+
+
+async def propagate_product_to_quotes(
+    db: AsyncDatabase,
+    product: Dict[str, Any],
+    quote_filter: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Propagate a product's current name, price and unit into quotes.
+
+    Args:
+        db: The database holding the quotes collection
+        product: The current product document
+        quote_filter: Optional extra conditions restricting which quotes are
+            rewritten (e.g. an _id range when propagating in chunks)
+
+    Returns:
+        The number of quotes that were modified
+    """
+    result = await db["quotes"].update_many(
+        {**build_propagation_filter(product), **(quote_filter or {})},
+        build_propagation_pipeline(product),
+    )
+    return result.modified_count
+
+
+def build_products_propagation_filter(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the filter matching open quotes with stale line items for several products.
+
+    Used when many products changed together (e.g. a bulk price adjustment).
+    Like build_propagation_filter, quotes whose line items already carry the
+    current state of every product are excluded. The product IDs are also
+    matched on their own, which keeps the filter an index range scan no
+    matter how many products are involved; the staleness check is applied
+    to the quotes that scan finds.
+
+    Args:
+        products: Product documents (must include _id, name, price and unit)
+
+    Returns:
+        A filter document for the quotes collection
+    """
+    return {
+        "status": {"$in": settings.PROPAGATION_OPEN_STATUSES},
+        "line_items.product_id": {"$in": [str(product["_id"]) for product in products]},
+        "line_items": {"$elemMatch": {"$or": [_stale_line_item(product) for product in products]}},
+    }
+
+
+def build_products_propagation_pipeline(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Build the update pipeline that rewrites several products' denormalized fields.
+
+    Works like build_propagation_pipeline, with each line item looking up
+    its product's new state by position in literal arrays of IDs and states.
+
+    Args:
+        products: Product documents (must include _id, name, price and unit)
+
+    Returns:
+        An aggregation pipeline usable as the update of update_many
+    """
+    product_ids = [str(product["_id"]) for product in products]
+    states = [
+        {"name": product["name"], "price": product["price"], "unit": product["unit"]}
+        for product in products
+    ]
+
+    updated_fields = {
+        "product_name": "$$product.name",
+        "product_price": "$$product.price",
+        "product_unit": "$$product.unit",
+        "line_total": {"$multiply": ["$$item.quantity", "$$product.price"]},
+    }
+
+    return [
+        {
+            "$set": {
+                "line_items": {
+                    "$map": {
+                        "input": "$line_items",
+                        "as": "item",
+                        "in": {
+                            "$let": {
+                                "vars": {
+                                    "position": {
+                                        "$indexOfArray": [
+                                            {"$literal": product_ids}, "$$item.product_id"
+                                        ]
+                                    }
+                                },
+                                "in": {
+                                    "$cond": [
+                                        {"$eq": ["$$position", -1]},
+                                        "$$item",
+                                        {
+                                            "$let": {
+                                                "vars": {
+                                                    "product": {
+                                                        "$arrayElemAt": [
+                                                            {"$literal": states}, "$$position"
+                                                        ]
+                                                    }
+                                                },
+                                                "in": {"$mergeObjects": ["$$item", updated_fields]},
+                                            }
+                                        },
+                                    ]
+                                },
+                            }
+                        },
+                    }
+                }
+            }
+        },
+        {
+            "$set": {
+                "total_amount": {"$sum": "$line_items.line_total"},
+                "updated_at": {"$literal": datetime.now(timezone.utc)},
+            }
+        },
+    ]
+
+
+async def propagate_products_to_quotes(
+    db: AsyncDatabase,
+    products: List[Dict[str, Any]],
+    quote_filter: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Propagate the current name, price and unit of several products in one pass.
+
+    Args:
+        db: The database holding the quotes collection
+        products: The current product documents
+        quote_filter: Optional extra conditions restricting which quotes are
+            rewritten (e.g. an _id range when propagating in chunks)
+
+    Returns:
+        The number of quotes that were modified
+    """
+    if not products:
+        return 0
+    result = await db["quotes"].update_many(
+        {**build_products_propagation_filter(products), **(quote_filter or {})},
+        build_products_propagation_pipeline(products),
+    )
+    return result.modified_count
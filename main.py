@@ -1,9 +1,16 @@
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from database.mongodb import connect_to_mongodb, close_mongodb_connection
-from routes import health, products, quotes
+from database.indexes import ensure_indexes
+from database.monitoring import RequestRoundTrips, current_round_trips
+from database.mongodb import connect_to_mongodb, close_mongodb_connection, get_database
+from metrics import CounterFamily, GaugeFamily, HistogramFamily
+from routes import health, metrics, products, propagation, quotes
+from settings import settings
+from timing import RequestTimings, current_timings
 
 
 @asynccontextmanager
@@ -13,13 +20,160 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     await connect_to_mongodb()
+    await ensure_indexes(get_database())
     yield
     # Shutdown
     await close_mongodb_connection()
 
 
+class MongoRoundTripMiddleware:
+    """
+    Reports the MongoDB commands a request issued in X-Mongo-Round-Trips.
+
+    The count covers commands started between the request arriving and its
+    response headers being sent. It is held in a context variable, like the
+    Server-Timing breakdown, so overlapping requests each get their own.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        round_trips = RequestRoundTrips()
+
+        async def send_with_round_trips(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-mongo-round-trips", str(round_trips.count).encode()),
+                ]
+            await send(message)
+
+        token = current_round_trips.set(round_trips)
+        try:
+            await self.app(scope, receive, send_with_round_trips)
+        finally:
+            current_round_trips.reset(token)
+
+
+class ServerTimingMiddleware:
+    """
+    Reports where a request's time went in a Server-Timing header.
+
+    Requests are timed when settings.SERVER_TIMING is on, or when they send
+    an X-Debug-Timing header and settings.SERVER_TIMING_DEBUG_HEADER allows
+    it. The header breaks the time until the response starts into MongoDB
+    commands, validation and response serialization (see timing.py), plus
+    the total; browsers show it in their developer tools.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def _enabled(self, scope: Scope) -> bool:
+        if settings.SERVER_TIMING:
+            return True
+        if not settings.SERVER_TIMING_DEBUG_HEADER:
+            return False
+        return any(name == b"x-debug-timing" for name, _ in scope["headers"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._enabled(scope):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        started_at = time.perf_counter()
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header = timings.header_value(time.perf_counter() - started_at)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", header.encode()),
+                ]
+            await send(message)
+
+        token = current_timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            current_timings.reset(token)
+
+
+# Route label of requests that matched no route, so raw paths never become labels
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = CounterFamily(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status class.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = GaugeFamily(
+    "http_requests_in_flight",
+    "HTTP requests being handled.",
+)
+HTTP_REQUEST_DURATION = HistogramFamily(
+    "http_request_duration_seconds",
+    "Time to handle HTTP requests, until the response body is sent.",
+    ("method", "route"),
+)
+
+
+class HTTPMetricsMiddleware:
+    """
+    Records request counts, in-flight requests and latency per route.
+
+    Requests are labelled with the template of the route they matched
+    (e.g. /quotes/{quote_id}), which routing leaves in the scope, and with
+    the class of their status code (2xx, 4xx, ...). A request whose handler
+    raised is counted as 5xx.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = route.path if route is not None else UNMATCHED_ROUTE
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, template).observe(elapsed)
+            HTTP_REQUESTS.inc(method, template, f"{status_code // 100}xx")
+
+
 app = FastAPI(lifespan=lifespan)
 
+if settings.DEBUG:
+    app.add_middleware(MongoRoundTripMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+# Added last so it is outermost and times the whole request
+app.add_middleware(HTTPMetricsMiddleware)
+
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(products.router)
 app.include_router(quotes.router)
+app.include_router(propagation.router)
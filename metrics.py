@@ -0,0 +1,223 @@
+"""
+In-process metrics exported in the Prometheus text format.
+
+Metric families are created at import time by the modules that record them
+and register themselves with the module registry, which GET /metrics
+renders. Each process keeps its own figures; Prometheus aggregates them
+across processes.
+
+Recording happens on the event loop thread, so the metrics are plain
+counters and bucket arrays updated without locks.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds, in seconds, of latency histogram buckets
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Format label pairs as {name="value",...}, or nothing when there are none."""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, writing whole numbers without a decimal point."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets.
+
+    Each observation increments one bucket; the cumulative counts the
+    format requires are computed when rendering.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        # One count per bucket, plus one for values above the last bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value: The observed value
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """Base of metric families: a named metric with one series per label values."""
+
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        registry: Optional[List["MetricFamily"]] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        # Families go to the process registry unless given another one
+        (REGISTRY if registry is None else registry).append(self)
+
+    def clear(self) -> None:
+        """Drop every series."""
+        self._series.clear()
+
+    def render(self) -> List[str]:
+        """
+        Render the family in the text format.
+
+        Returns:
+            The lines of the family, starting with its HELP and TYPE lines
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for label_values in sorted(self._series):
+            lines.extend(self._render_series(label_values))
+        return lines
+
+
+class CounterFamily(MetricFamily):
+    """Monotonically increasing counts, one per label values."""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        registry: Optional[List[MetricFamily]] = None,
+    ) -> None:
+        super().__init__(name, documentation, label_names, registry)
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """
+        Increase the counter of some label values.
+
+        Args:
+            *label_values: The label values, in the order of the label names
+            amount: The increase
+        """
+        self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        """Return the current count of some label values."""
+        return self._series.get(label_values, 0)
+
+    def _render_series(self, label_values: Tuple[str, ...]) -> List[str]:
+        labels = _format_labels(self.label_names, label_values)
+        return [f"{self.name}{labels} {_format_value(self._series[label_values])}"]
+
+
+class GaugeFamily(CounterFamily):
+    """Values that go up and down, one per label values."""
+
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        """
+        Decrease the gauge of some label values.
+
+        Args:
+            *label_values: The label values, in the order of the label names
+            amount: The decrease
+        """
+        self.inc(*label_values, amount=-amount)
+
+
+class HistogramFamily(MetricFamily):
+    """Histograms over shared buckets, one per label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        registry: Optional[List[MetricFamily]] = None,
+    ) -> None:
+        super().__init__(name, documentation, label_names, registry)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *label_values: str) -> Histogram:
+        """
+        Get the histogram of some label values, creating it on first use.
+
+        Args:
+            *label_values: The label values, in the order of the label names
+
+        Returns:
+            The histogram
+        """
+        histogram = self._series.get(label_values)
+        if histogram is None:
+            histogram = self._series[label_values] = Histogram(self.buckets)
+        return histogram
+
+    def _render_series(self, label_values: Tuple[str, ...]) -> List[str]:
+        histogram = self._series[label_values]
+        bucket_names = (*self.label_names, "le")
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            labels = _format_labels(bucket_names, (*label_values, le))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(histogram.sum)}")
+        lines.append(f"{self.name}_count{labels} {histogram.count}")
+        return lines
+
+
+# Every metric family created in the process, in creation order
+REGISTRY: List[MetricFamily] = []
+
+
+def render_metrics(registry: Optional[List[MetricFamily]] = None) -> str:
+    """
+    Render every registered metric family in the text format.
+
+    Args:
+        registry: The families to render (defaults to the process registry)
+
+    Returns:
+        The exposition, ending with a newline
+    """
+    lines = []
+    for family in REGISTRY if registry is None else registry:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
@@ -4,9 +4,9 @@ Product data models for the landscape supply platform.
 Products represent materials that can be purchased (e.g., mulch, stone, soil).
 """
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 class ProductBase(BaseModel):
@@ -30,6 +30,16 @@ class ProductCreate(ProductBase):
     pass
 
 
+class ProductUpsert(ProductBase):
+    """
+    Schema for creating or replacing a product by SKU.
+
+    The SKU comes from the path, so it may be left out of the body.
+    """
+
+    sku: Optional[str] = Field(None, description="Must match the SKU in the path if given")
+
+
 class ProductUpdate(BaseModel):
     """Schema for updating a product. All fields are optional."""
 
@@ -41,6 +51,14 @@ class ProductUpdate(BaseModel):
     category: Optional[str] = None
     sku: Optional[str] = None
 
+    @field_validator("sku")
+    @classmethod
+    def check_sku_not_null(cls, sku: Optional[str]) -> str:
+        """Reject an explicit null, which the unique SKU index allows only once."""
+        if sku is None:
+            raise ValueError("sku cannot be null")
+        return sku
+
 
 class Product(ProductBase):
     """
@@ -72,3 +90,90 @@ class Product(ProductBase):
             }
         }
     )
+
+
+class ProductUpdateResult(Product):
+    """Updated product along with whether propagation to quotes was queued."""
+
+    propagation_triggered: bool = Field(
+        ...,
+        description="Whether an embedded field (name, price, unit) changed, "
+                    "so propagation will update the quotes",
+    )
+
+
+class ProductPartial(BaseModel):
+    """
+    Product restricted to the fields requested with ?fields=.
+
+    The ID is always returned; every other field is present only if requested.
+    """
+
+    id: str = Field(..., alias="_id", description="MongoDB document ID")
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    unit: Optional[str] = None
+    supplier_name: Optional[str] = None
+    category: Optional[str] = None
+    sku: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ProductImportError(BaseModel):
+    """A row of a bulk import that was not written."""
+
+    row: int = Field(..., description="1-based row number (CSV header not counted)")
+    sku: Optional[str] = Field(None, description="SKU of the row, if it could be read")
+    message: str = Field(..., description="Why the row was rejected")
+
+
+class ProductImportResult(BaseModel):
+    """Outcome of a bulk product import."""
+
+    received: int = Field(..., description="Rows read from the upload")
+    inserted: int = Field(..., description="Products created")
+    updated: int = Field(..., description="Existing products updated (upsert and diff modes)")
+    unchanged: int = Field(..., description="Rows identical to their product, not written (diff mode)")
+    failed: int = Field(..., description="Rows rejected by validation or by the database")
+    errors: List[ProductImportError] = Field(
+        ..., description="One entry per rejected row")
+
+
+class PriceAdjustment(BaseModel):
+    """
+    A price rule applied to every product of a supplier and/or category.
+
+    Exactly one of percent and amount is given, e.g. +6% for a supplier or
+    +$2 per unit for a category.
+    """
+
+    supplier_name: Optional[str] = Field(None, description="Only products of this supplier")
+    category: Optional[str] = Field(None, description="Only products in this category")
+    percent: Optional[float] = Field(
+        None, gt=-100, description="Relative change, e.g. 6 for +6%")
+    amount: Optional[float] = Field(
+        None, description="Absolute change per unit, e.g. 2 for +$2")
+
+    @model_validator(mode="after")
+    def check_rule(self) -> "PriceAdjustment":
+        """Require a product selector and exactly one kind of change."""
+        if self.supplier_name is None and self.category is None:
+            raise ValueError("supplier_name or category is required")
+        if (self.percent is None) == (self.amount is None):
+            raise ValueError("Exactly one of percent and amount is required")
+        return self
+
+
+class PriceAdjustmentResult(BaseModel):
+    """Outcome of a bulk price adjustment."""
+
+    matched: int = Field(..., description="Products selected by the rule")
+    modified: int = Field(
+        ..., description="Products whose price changed (prices are never "
+                         "lowered to zero or below; such products are left as they are)")
+    propagation_triggered: bool = Field(
+        ..., description="Whether one propagation task was queued for the affected quotes")
@@ -0,0 +1,20 @@
+"""
+Propagation data models for the landscape supply platform.
+
+Propagation keeps the product data denormalized into quotes up to date.
+"""
+from pydantic import BaseModel, Field
+
+
+class PropagationStats(BaseModel):
+    """Summary of the propagation outbox."""
+
+    pending: int = Field(..., description="Tasks waiting to run")
+    processing: int = Field(..., description="Tasks currently held by a worker")
+    done: int = Field(..., description="Completed tasks (kept for a week)")
+    updates_received: int = Field(...,
+                                  description="Product updates that queued propagation")
+    passes: int = Field(...,
+                        description="Propagation passes the updates resulted in")
+    passes_saved: int = Field(...,
+                              description="Passes avoided by coalescing updates of the same product")
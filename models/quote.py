@@ -102,3 +102,25 @@ class Quote(QuoteBase):
             }
         }
     )
+
+
+class QuotePartial(BaseModel):
+    """
+    Quote restricted to the fields requested with ?fields=.
+
+    The ID is always returned; every other field is present only if requested.
+    Summary screens typically ask for customer_name, status and total_amount,
+    which leaves out the embedded line items.
+    """
+
+    id: str = Field(..., alias="_id", description="MongoDB document ID")
+    customer_name: Optional[str] = None
+    customer_email: Optional[str] = None
+    project_name: Optional[str] = None
+    status: Optional[str] = None
+    line_items: Optional[List[QuoteLineItem]] = None
+    total_amount: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(populate_by_name=True)
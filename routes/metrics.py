@@ -0,0 +1,22 @@
+"""
+Metrics route for the landscape supply platform.
+
+Exposes the process's metrics for Prometheus to scrape.
+"""
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """
+    Report the metrics of this process in the Prometheus text format.
+
+    Returns:
+        The metrics exposition
+    """
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,90 @@
+"""
+Newline-delimited JSON (NDJSON) streaming for listing endpoints.
+
+Documents are encoded as they arrive from the MongoDB cursor and written to
+the client in small chunks, so memory use does not grow with the number of
+documents exported.
+"""
+from typing import AsyncIterator
+
+import anyio
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pymongo.asynchronous.cursor import AsyncCursor
+from starlette.types import Receive, Scope, Send
+
+from routes.responses import dump_json
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Number of documents encoded into one chunk written to the client
+DOCUMENTS_PER_CHUNK = 100
+
+
+def wants_ndjson(request: Request) -> bool:
+    """
+    Check whether the client asked for an NDJSON stream.
+
+    Args:
+        request: The incoming request
+
+    Returns:
+        True if the Accept header includes application/x-ndjson
+    """
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _encode_documents(cursor: AsyncCursor) -> AsyncIterator[bytes]:
+    """Encode documents from a cursor as NDJSON chunks, closing the cursor when done."""
+    try:
+        lines = []
+        async for document in cursor:
+            lines.append(dump_json(document))
+            if len(lines) == DOCUMENTS_PER_CHUNK:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    finally:
+        # Also runs when the client disconnects and the stream is cancelled,
+        # which releases the server-side cursor instead of draining it. The
+        # close is shielded, or the cancellation would stop it before
+        # killCursors is sent.
+        with anyio.CancelScope(shield=True):
+            await cursor.close()
+
+
+class NDJSONResponse(StreamingResponse):
+    """
+    Streaming response that closes its document stream however it ends.
+
+    When the client disconnects while a chunk is being sent, the stream is
+    cancelled between two documents and Starlette leaves the generator
+    suspended; closing it here runs its cleanup right away rather than
+    whenever it is garbage collected.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def ndjson_response(cursor: AsyncCursor) -> NDJSONResponse:
+    """
+    Stream the documents of a cursor as NDJSON, one document per line.
+
+    The cursor should project the fields of the listing's response model.
+
+    Args:
+        cursor: An open cursor over the documents to stream
+
+    Returns:
+        A streaming response
+    """
+    return NDJSONResponse(
+        _encode_documents(cursor),
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -2,18 +2,166 @@
 Product routes for the landscape supply platform.
 
 These endpoints manage product CRUD operations.
-The PATCH endpoint includes a TODO for implementing propagation to quotes.
+The PATCH endpoint propagates changes into the quotes that embed the product.
 """
-from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, status
+from pydantic import ValidationError
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database.filters import prefix_condition, range_condition
+from database.mongodb import get_database, utc_now
+from database.outbox import enqueue_bulk_propagation, enqueue_propagation
+from database.pagination import ID_SORT, SortSpec, fetch_page, page_query
+from database.product_cache import product_cache
+from database.product_import import (
+    MODE_DIFF,
+    MODE_INSERT,
+    insert_products,
+    upsert_products,
+)
+from database.propagation import DENORMALIZED_FIELDS, denormalized_fields_changed
+from models.product import (
+    PriceAdjustment,
+    PriceAdjustmentResult,
+    Product,
+    ProductCreate,
+    ProductImportResult,
+    ProductPartial,
+    ProductUpdate,
+    ProductUpdateResult,
+    ProductUpsert,
+)
+from routes.ndjson import NDJSON_MEDIA_TYPE, ndjson_response, wants_ndjson
+from routes.responses import (
+    MongoJSONResponse,
+    entity_tag,
+    fieldset_projection,
+    is_not_modified,
+    not_modified_response,
+    projection_for,
+    select_fields,
+)
+from routes.uploads import CSV_MEDIA_TYPE, iter_csv_records, iter_ndjson_records
+from settings import settings
+from timing import VALIDATION, TimedRoute, timed
+
+router = APIRouter(prefix="/products", tags=["products"], route_class=TimedRoute)
+
+# Fields returned by product endpoints, which serialize documents directly
+PRODUCT_PROJECTION = projection_for(Product)
+
+# Sort options of the product listing. Each ends with _id in the same
+# direction, so it can be read from a compound index in either direction.
+PRODUCT_SORTS: Dict[str, SortSpec] = {
+    "_id": ID_SORT,
+    "price": (("price", ASCENDING), ("_id", ASCENDING)),
+    "-price": (("price", DESCENDING), ("_id", DESCENDING)),
+    "name": (("name", ASCENDING), ("_id", ASCENDING)),
+    "-name": (("name", DESCENDING), ("_id", DESCENDING)),
+}
+ProductSort = Literal["_id", "price", "-price", "name", "-name"]
+
+
+def sku_conflict(sku: Optional[str]) -> HTTPException:
+    """
+    Build the error for a write that would give a second product a SKU.
 
-from database.mongodb import get_database
-from models.product import Product, ProductCreate, ProductUpdate
+    Args:
+        sku: The SKU that is already taken
 
-router = APIRouter(prefix="/products", tags=["products"])
+    Returns:
+        A 409 Conflict to raise
+    """
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"A product with SKU {sku} already exists"
+    )
+
+
+def build_product_filter(
+    category: Optional[str] = None,
+    supplier_name: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sku_prefix: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build the filter of the product listing.
+
+    Args:
+        category: Exact category
+        supplier_name: Exact supplier name
+        min_price: Lowest price, inclusive
+        max_price: Highest price, inclusive
+        sku_prefix: Required start of the SKU
+
+    Returns:
+        A filter document (empty when no filter is given)
+    """
+    query: Dict[str, Any] = {}
+    if category is not None:
+        query["category"] = category
+    if supplier_name is not None:
+        query["supplier_name"] = supplier_name
+    price = range_condition(min_price, max_price)
+    if price is not None:
+        query["price"] = price
+    if sku_prefix:
+        query["sku"] = prefix_condition(sku_prefix)
+    return query
+
+
+def build_adjusted_price_stages(adjustment: PriceAdjustment) -> List[Dict[str, Any]]:
+    """
+    Build the pipeline stages computing a price rule's new price as _new_price.
+
+    New prices are computed by the server and rounded to cents. A price the
+    rule would take to zero or below is kept as it is.
+
+    Args:
+        adjustment: The price rule
+
+    Returns:
+        Stages setting _new_price on each product
+    """
+    if adjustment.percent is not None:
+        new_price = {"$multiply": ["$price", 1 + adjustment.percent / 100]}
+    else:
+        new_price = {"$add": ["$price", adjustment.amount]}
+
+    return [
+        {"$set": {"_new_price": {"$round": [new_price, 2]}}},
+        {"$set": {"_new_price": {"$cond": [{"$gt": ["$_new_price", 0]}, "$_new_price", "$price"]}}},
+    ]
+
+
+def build_price_adjustment_pipeline(adjustment: PriceAdjustment) -> List[Dict[str, Any]]:
+    """
+    Build the update pipeline applying a price rule to the matched products.
+
+    The new price is computed by build_adjusted_price_stages, and updated_at
+    only moves on products whose price actually changes.
+
+    Args:
+        adjustment: The price rule
+
+    Returns:
+        An aggregation pipeline usable as the update of update_many
+    """
+    return [
+        *build_adjusted_price_stages(adjustment),
+        {"$set": {
+            "price": "$_new_price",
+            "updated_at": {"$cond": [
+                {"$eq": ["$_new_price", "$price"]}, "$updated_at", {"$literal": utc_now()},
+            ]},
+        }},
+        {"$unset": "_new_price"},
+    ]
 
 
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
@@ -26,55 +174,384 @@ async def create_product(product_data: ProductCreate) -> Product:
 
     Returns:
         The created product with generated ID and timestamps
+
+    Raises:
+        HTTPException: If another product already has the SKU
     """
     db = get_database()
     products_collection = db["products"]
 
     # Convert to dict and add timestamps
     product_dict = product_data.model_dump()
-    product_dict["created_at"] = datetime.now(timezone.utc)
-    product_dict["updated_at"] = datetime.now(timezone.utc)
+    product_dict["created_at"] = product_dict["updated_at"] = utc_now()
+
+    # Insert into database; the inserted document (now carrying its _id)
+    # is the response, so no read-back is needed
+    try:
+        await products_collection.insert_one(product_dict)
+    except DuplicateKeyError:
+        raise sku_conflict(product_data.sku)
+    product_cache.invalidate(str(product_dict["_id"]))
+
+    return MongoJSONResponse(product_dict, status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/", response_model=Union[List[Product], List[ProductPartial]])
+async def list_products(
+    request: Request,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE,
+                       description="Maximum number of products to return"),
+    after: Optional[str] = Query(None, description="Cursor from X-Next-Cursor of the previous page"),
+    category: Optional[str] = Query(None, description="Only products in this category"),
+    supplier_name: Optional[str] = Query(None, description="Only products from this supplier"),
+    min_price: Optional[float] = Query(None, ge=0, description="Lowest price, inclusive"),
+    max_price: Optional[float] = Query(None, ge=0, description="Highest price, inclusive"),
+    sku_prefix: Optional[str] = Query(None, min_length=1, description="Only SKUs starting with this"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; _id is always included"),
+    sort: ProductSort = Query("_id", description="Sort field, prefixed with - for descending"),
+) -> List[Product]:
+    """
+    List products one page at a time, optionally filtered and sorted.
+
+    Filters combine with AND. When more products follow, the X-Next-Cursor
+    response header carries an opaque cursor to pass as ?after= for the
+    next page, together with the same filters and sort.
+
+    With "Accept: application/x-ndjson" the products are instead streamed one
+    per line straight from the database cursor. The stream is not paged: it
+    covers every product after ?after=, up to ?limit= only when given.
+
+    With ?fields= only the listed fields (and _id) are read from the
+    database and returned, e.g. ?fields=name,price.
+
+    Args:
+        limit: Maximum number of products to return
+        after: Cursor of the previous page
+        category: Exact category
+        supplier_name: Exact supplier name
+        min_price: Lowest price, inclusive
+        max_price: Highest price, inclusive
+        sku_prefix: Required start of the SKU
+        fields: Fields to return instead of the whole document
+        sort: Sort option
+
+    Returns:
+        A page of products
+
+    Raises:
+        HTTPException: If the price range is empty, or the fields or cursor are invalid
+    """
+    db = get_database()
+    products_collection = db["products"]
+
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_price must not exceed max_price"
+        )
+
+    product_filter = build_product_filter(
+        category, supplier_name, min_price, max_price, sku_prefix)
+    sort_spec = PRODUCT_SORTS[sort]
+    try:
+        query = page_query(product_filter, sort_spec, after)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    projection = PRODUCT_PROJECTION
+    if fields is not None:
+        try:
+            projection = fieldset_projection(Product, fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+    if wants_ndjson(request):
+        cursor = products_collection.find(query, projection).sort(list(sort_spec))
+        if "limit" in request.query_params:
+            cursor = cursor.limit(limit)
+        return ndjson_response(cursor)
+
+    product_docs, next_cursor = await fetch_page(
+        products_collection, query, sort_spec, limit, projection)
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return MongoJSONResponse(product_docs, headers=headers)
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Summarize a validation error as "field: message" pairs."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    request: Request,
+    mode: Literal["insert", "upsert", "diff"] = Query(
+        MODE_INSERT,
+        description="insert: always create; upsert: update by sku or create; "
+                    "diff: like upsert, but only write rows that changed"),
+) -> ProductImportResult:
+    """
+    Import products in bulk from a CSV or NDJSON upload.
+
+    The body is sent as text/csv (a header line naming the product fields,
+    then one product per line) or application/x-ndjson (one JSON object per
+    line). It is read as a stream; rows are validated against ProductCreate
+    and written in batches of IMPORT_BATCH_SIZE with one unordered bulk
+    operation each. Rejected rows are listed in the response without
+    stopping the import.
+
+    In upsert mode, rows update the product with the same sku and queue
+    propagation to quotes if its name, price or unit changed. Diff mode is
+    meant for suppliers re-sending their whole catalog: rows are compared
+    with their product, unchanged rows are skipped and changed rows only
+    set the fields that differ.
+
+    Args:
+        mode: How rows are written
+
+    Returns:
+        Row counts and an error for every rejected row
+
+    Raises:
+        HTTPException: If the body is neither CSV nor NDJSON
+    """
+    db = get_database()
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == CSV_MEDIA_TYPE:
+        records = iter_csv_records(request)
+    elif content_type == NDJSON_MEDIA_TYPE:
+        records = iter_ndjson_records(request)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Upload {CSV_MEDIA_TYPE} or {NDJSON_MEDIA_TYPE}"
+        )
+    counts = {"received": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    errors = []
+    batch = []
+
+    async def flush() -> None:
+        if mode == MODE_INSERT:
+            batch_counts, batch_errors = await insert_products(db, batch)
+        else:
+            batch_counts, batch_errors = await upsert_products(
+                db, batch, skip_unchanged=mode == MODE_DIFF)
+        for name, count in batch_counts.items():
+            counts[name] += count
+        errors.extend(batch_errors)
+        batch.clear()
+
+    async for row_number, fields, parse_error in records:
+        counts["received"] += 1
+        if parse_error is not None:
+            errors.append({"row": row_number, "sku": None, "message": parse_error})
+            continue
+        try:
+            with timed(VALIDATION):
+                product = ProductCreate.model_validate(fields)
+        except ValidationError as e:
+            sku = fields.get("sku")
+            errors.append({
+                "row": row_number,
+                "sku": sku if isinstance(sku, str) else None,
+                "message": format_validation_error(e),
+            })
+            continue
+
+        batch.append((row_number, product.model_dump()))
+        if len(batch) == settings.IMPORT_BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    errors.sort(key=lambda error: error["row"])
+    return MongoJSONResponse({**counts, "failed": len(errors), "errors": errors})
+
+
+@router.post("/price-adjustments", response_model=PriceAdjustmentResult)
+async def adjust_prices(adjustment: PriceAdjustment) -> PriceAdjustmentResult:
+    """
+    Apply a price rule to every product of a supplier and/or category.
+
+    The new prices are written by one server-side update_many. The affected
+    quotes are brought up to date by a single propagation task covering the
+    products whose price changed, so each quote is rewritten once rather
+    than once per product it contains. The task is queued before the prices
+    are written, so a failed request never leaves them changed without it.
+
+    Args:
+        adjustment: The price rule
+
+    Returns:
+        How many products matched and changed, and whether propagation was queued
+    """
+    db = get_database()
+    products_collection = db["products"]
+
+    query = build_product_filter(
+        category=adjustment.category, supplier_name=adjustment.supplier_name)
+    # The server computes which prices the rule changes, so that only those
+    # products are queued for propagation before anything is written
+    matched = await (await products_collection.aggregate([
+        {"$match": query},
+        *build_adjusted_price_stages(adjustment),
+        {"$project": {"changed": {"$ne": ["$_new_price", "$price"]}}},
+    ])).to_list(None)
+    changed_ids = [product["_id"] for product in matched if product["changed"]]
+
+    modified = 0
+    if changed_ids:
+        await enqueue_bulk_propagation(db, [str(product_id) for product_id in changed_ids])
+        # Restricting to the IDs read keeps products that start matching
+        # the rule mid-request out of the adjustment and the propagation
+        result = await products_collection.update_many(
+            {**query, "_id": {"$in": changed_ids}},
+            build_price_adjustment_pipeline(adjustment),
+        )
+        modified = result.modified_count
+        for product_id in changed_ids:
+            product_cache.invalidate(str(product_id))
+
+    return MongoJSONResponse({
+        "matched": len(matched),
+        "modified": modified,
+        "propagation_triggered": bool(changed_ids),
+    })
+
+
+def product_response(request: Request, product_doc: Dict[str, Any]) -> MongoJSONResponse:
+    """
+    Build the response for a single product read, honouring If-None-Match.
+
+    Args:
+        request: The incoming request
+        product_doc: The product document
+
+    Returns:
+        The product with its ETag, or 304 Not Modified if the client has it
+    """
+    etag = entity_tag(product_doc)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    return MongoJSONResponse(
+        select_fields(product_doc, PRODUCT_PROJECTION), headers={"ETag": etag})
+
+
+@router.get("/by-sku/{sku}", response_model=Product)
+async def get_product_by_sku(sku: str, request: Request) -> Product:
+    """
+    Get a product by its SKU.
+
+    Served through the catalog cache, with an ETag like GET /products/{id}.
+
+    Args:
+        sku: The product SKU
+
+    Returns:
+        The product carrying the SKU
 
-    # Insert into database
-    result = await products_collection.insert_one(product_dict)
+    Raises:
+        HTTPException: If no product has the SKU
+    """
+    db = get_database()
 
-    # Fetch and return the created product
-    created_product = await products_collection.find_one({"_id": result.inserted_id})
-    if not created_product:
+    product_doc = await product_cache.get_by_sku(db["products"], sku)
+    if not product_doc:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve created product"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with SKU {sku} not found"
         )
 
-    # Convert ObjectId to string for response
-    created_product["_id"] = str(created_product["_id"])
-    return Product(**created_product)
+    return product_response(request, product_doc)
 
 
-@router.get("/", response_model=List[Product])
-async def list_products() -> List[Product]:
+@router.put("/by-sku/{sku}", response_model=ProductUpdateResult)
+async def upsert_product_by_sku(sku: str, product_data: ProductUpsert) -> ProductUpdateResult:
     """
-    List all products.
+    Create or replace the product with a SKU.
+
+    The body is the full product: fields left out of it, such as
+    description, are cleared. Sending the product as it already is writes
+    nothing, so repeating a request is safe and leaves updated_at (and the
+    ETag) unchanged. Like PATCH, propagation to quotes is queued only when
+    an embedded field changes.
+
+    Args:
+        sku: The product SKU
+        product_data: The product fields
 
     Returns:
-        List of all products in the database
+        The product and whether propagation was triggered, with status 201
+        if it was created and 200 otherwise
+
+    Raises:
+        HTTPException: If the body names a different SKU
     """
     db = get_database()
     products_collection = db["products"]
 
-    products = []
-    async for product_doc in products_collection.find():
-        product_doc["_id"] = str(product_doc["_id"])
-        products.append(Product(**product_doc))
+    if product_data.sku is not None and product_data.sku != sku:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="SKU in the body does not match the path"
+        )
+    fields = {**product_data.model_dump(), "sku": sku}
+
+    # Read the current state from the database, not the cache, so the
+    # comparison is against what is actually stored
+    existing_product = await products_collection.find_one({"sku": sku}, PRODUCT_PROJECTION)
+    if existing_product is not None and all(
+        existing_product.get(field) == value for field, value in fields.items()
+    ):
+        return MongoJSONResponse({**existing_product, "propagation_triggered": False})
+
+    # Queue propagation before writing, like PATCH, so a failed request
+    # cannot leave the product changed and its quotes stale
+    created = existing_product is None
+    propagation_triggered = not created and denormalized_fields_changed(existing_product, fields)
+    if propagation_triggered:
+        await enqueue_propagation(db, str(existing_product["_id"]))
+
+    # The unique SKU index makes concurrent upserts of a new SKU create one product
+    now = utc_now()
+    product_doc = await products_collection.find_one_and_update(
+        {"sku": sku},
+        {"$set": {**fields, "updated_at": now}, "$setOnInsert": {"created_at": now}},
+        projection=PRODUCT_PROJECTION,
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    product_id = str(product_doc["_id"])
+    product_cache.invalidate(product_id)
 
-    return products
+    return MongoJSONResponse(
+        {**product_doc, "propagation_triggered": propagation_triggered},
+        status_code=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+    )
 
 
 @router.get("/{product_id}", response_model=Product)
-async def get_product(product_id: str) -> Product:
+async def get_product(product_id: str, request: Request) -> Product:
     """
     Get a specific product by ID.
 
+    The response carries an ETag. When the client sends it back in
+    If-None-Match and the product is unchanged, 304 Not Modified is
+    returned without a body.
+
     Args:
         product_id: The product ID
 
@@ -94,34 +571,41 @@ async def get_product(product_id: str) -> Product:
             detail="Invalid product ID format"
         )
 
-    # Find product
-    product_doc = await products_collection.find_one({"_id": ObjectId(product_id)})
+    # Find product, through the in-process catalog cache
+    product_doc = await product_cache.get_one(products_collection, ObjectId(product_id))
     if not product_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product {product_id} not found"
         )
 
-    product_doc["_id"] = str(product_doc["_id"])
-    return Product(**product_doc)
+    return product_response(request, product_doc)
 
 
-@router.patch("/{product_id}", response_model=Product)
-async def update_product(product_id: str, product_update: ProductUpdate) -> Product:
+@router.patch("/{product_id}", response_model=ProductUpdateResult)
+async def update_product(product_id: str, product_update: ProductUpdate) -> ProductUpdateResult:
     """
     Update a product and propagate changes to quotes.
 
-    TODO: Implement propagation logic to update denormalized data in quotes.
+    Propagation is recorded as a task in the outbox collection and carried
+    out by the propagation worker, so the response time does not depend on
+    how many quotes reference the product. It is queued when the update
+    changes the value of a field embedded in quotes (name, price or unit),
+    before the product is written: if the request fails in between, the
+    task merely finds the quotes up to date, whereas a product written
+    without its task would leave them stale, as a retry would see no change
+    to propagate.
 
     Args:
         product_id: The product ID to update
         product_update: Fields to update (partial update supported)
 
     Returns:
-        The updated product
+        The updated product and whether propagation was triggered
 
     Raises:
-        HTTPException: If product not found or invalid ID format
+        HTTPException: If product not found, invalid ID format, or another
+            product already has the new SKU
     """
     db = get_database()
     products_collection = db["products"]
@@ -133,49 +617,60 @@ async def update_product(product_id: str, product_update: ProductUpdate) -> Prod
             detail="Invalid product ID format"
         )
 
-    # Check if product exists
-    existing_product = await products_collection.find_one({"_id": ObjectId(product_id)})
-    if not existing_product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product {product_id} not found"
-        )
-
     # Build update document (only include fields that were provided)
     update_data = product_update.model_dump(exclude_unset=True)
     if not update_data:
+        # Report a missing product ahead of the empty update
+        if not await products_collection.find_one({"_id": ObjectId(product_id)}, {"_id": 1}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product {product_id} not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No fields to update"
         )
 
-    # Always update the updated_at timestamp
-    update_data["updated_at"] = datetime.now(timezone.utc)
-
-    # Update the product
-    await products_collection.update_one(
-        {"_id": ObjectId(product_id)},
-        {"$set": update_data}
-    )
+    # The task only references the product; the worker reads its state when
+    # it runs. It is queued only when an embedded field changes value.
+    queued = False
+    if any(field in update_data for field in DENORMALIZED_FIELDS):
+        current = await products_collection.find_one(
+            {"_id": ObjectId(product_id)}, dict.fromkeys(DENORMALIZED_FIELDS, 1))
+        if not current:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product {product_id} not found"
+            )
+        if denormalized_fields_changed(current, {**current, **update_data}):
+            await enqueue_propagation(db, product_id)
+            queued = True
 
-    # Fetch the updated product
-    updated_product = await products_collection.find_one({"_id": ObjectId(product_id)})
-    if not updated_product:
+    # Always update the updated_at timestamp
+    update_data["updated_at"] = utc_now()
+
+    # Update the product in one round trip. The previous version is returned
+    # so embedded fields can be compared; applying the same $set to it gives
+    # the updated document without reading it back.
+    try:
+        existing_product = await products_collection.find_one_and_update(
+            {"_id": ObjectId(product_id)},
+            {"$set": update_data},
+            projection=PRODUCT_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        raise sku_conflict(update_data["sku"])
+    if not existing_product:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve updated product"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} not found"
         )
-
-    # TODO: IMPLEMENT PROPAGATION LOGIC HERE
-    # When a product is updated, all quotes that reference this product
-    # need to have their denormalized data updated.
-    #
-    # Consider:
-    # - How to find all affected quotes?
-    # - How to update denormalized fields (product_name, product_price, product_unit)?
-    # - How to recalculate line_total and total_amount?
-    # - How to ensure reliability and consistency?
-    # - Scalability: there could be a million quotes related to this product.
-
-    updated_product["_id"] = str(updated_product["_id"])
-    return Product(**updated_product)
+    product_cache.invalidate(product_id)
+    updated_product = {**existing_product, **update_data}
+
+    propagation_triggered = denormalized_fields_changed(existing_product, updated_product)
+    if propagation_triggered and not queued:
+        # A concurrent update changed the product since it was read
+        await enqueue_propagation(db, product_id)
+    return MongoJSONResponse({**updated_product, "propagation_triggered": propagation_triggered})
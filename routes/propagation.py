@@ -0,0 +1,25 @@
+"""
+Propagation routes for the landscape supply platform.
+
+These endpoints report on the propagation of product changes into quotes.
+"""
+from fastapi import APIRouter
+
+from database.mongodb import get_database
+from database.outbox import get_outbox_stats
+from models.propagation import PropagationStats
+from timing import TimedRoute
+
+router = APIRouter(prefix="/propagation", tags=["propagation"], route_class=TimedRoute)
+
+
+@router.get("/stats", response_model=PropagationStats)
+async def propagation_stats() -> PropagationStats:
+    """
+    Report outbox task counts and how many passes coalescing saved.
+
+    Returns:
+        Propagation statistics
+    """
+    db = get_database()
+    return PropagationStats(**await get_outbox_stats(db))
@@ -5,15 +5,92 @@ These endpoints manage quote CRUD operations.
 The POST endpoint demonstrates denormalization by embedding product data.
 """
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from pymongo import ASCENDING, DESCENDING
+
+from database.filters import range_condition
+from database.mongodb import get_database, utc_now
+from database.pagination import ID_SORT, SortSpec, fetch_page, page_query
+from database.product_cache import product_cache
+from models.quote import Quote, QuoteCreate, QuotePartial
+from routes.ndjson import ndjson_response, wants_ndjson
+from routes.responses import (
+    MongoJSONResponse,
+    entity_tag,
+    fieldset_projection,
+    is_not_modified,
+    not_modified_response,
+    projection_for,
+)
+from settings import settings
+from timing import TimedRoute
+
+router = APIRouter(prefix="/quotes", tags=["quotes"], route_class=TimedRoute)
+
+# Fields returned by quote endpoints, which serialize documents directly
+QUOTE_PROJECTION = projection_for(Quote)
+
+# Sort options of the quote listing, each ending with _id in the same direction
+QUOTE_SORTS: Dict[str, SortSpec] = {
+    "_id": ID_SORT,
+    "created_at": (("created_at", ASCENDING), ("_id", ASCENDING)),
+    "-created_at": (("created_at", DESCENDING), ("_id", DESCENDING)),
+}
+QuoteSort = Literal["_id", "created_at", "-created_at"]
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Read a query parameter datetime given without an offset as UTC.
 
-from database.mongodb import get_database
-from models.quote import Quote, QuoteCreate, QuoteLineItem
+    MongoDB stores UTC, so this is how the driver would treat it anyway;
+    doing it up front lets naive and aware bounds be compared.
 
-router = APIRouter(prefix="/quotes", tags=["quotes"])
+    Args:
+        value: The datetime, if given
+
+    Returns:
+        The datetime, timezone-aware
+    """
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def build_quote_filter(
+    customer_email: Optional[str] = None,
+    quote_status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    product_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Build the filter of the quote listing.
+
+    Args:
+        customer_email: Exact customer email
+        quote_status: Exact quote status
+        created_from: Earliest creation time, inclusive
+        created_to: Latest creation time, inclusive
+        product_id: Canonical ID of a product the quote must contain
+
+    Returns:
+        A filter document (empty when no filter is given)
+    """
+    query: Dict[str, Any] = {}
+    if customer_email is not None:
+        query["customer_email"] = customer_email
+    if quote_status is not None:
+        query["status"] = quote_status
+    created_at = range_condition(created_from, created_to)
+    if created_at is not None:
+        query["created_at"] = created_at
+    if product_id is not None:
+        query["line_items.product_id"] = product_id
+    return query
 
 
 @router.post("/", response_model=Quote, status_code=status.HTTP_201_CREATED)
@@ -22,7 +99,8 @@ async def create_quote(quote_data: QuoteCreate) -> Quote:
     Create a new quote with denormalized product data.
 
     This endpoint demonstrates the denormalization pattern:
-    - For each line item, look up the product by product_id
+    - Look up all referenced products through the catalog cache, reading
+      the uncached ones with a single query
     - Embed product data (product_name, product_price, product_unit) into the quote
     - Calculate line_total (quantity × price) for each item
     - Calculate total_amount (sum of all line totals)
@@ -34,26 +112,37 @@ async def create_quote(quote_data: QuoteCreate) -> Quote:
         The created quote with fully denormalized product data
 
     Raises:
-        HTTPException: If any referenced product is not found
+        HTTPException: If any product ID is malformed or any referenced product is not found
     """
     db = get_database()
     products_collection = db["products"]
     quotes_collection = db["quotes"]
 
-    # Build the line items with denormalized product data
-    denormalized_line_items = []
-    total_amount = 0.0
-
+    # Validate ObjectId format of every line item before querying
     for item in quote_data.line_items:
-        # Validate ObjectId format
         if not ObjectId.is_valid(item.product_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid product ID format: {item.product_id}"
             )
 
-        # Look up the product
-        product = await products_collection.find_one({"_id": ObjectId(item.product_id)})
+    # Look up all referenced products; only those missing from the cache
+    # are read, in one round trip. Another process may have changed a
+    # product this cache still holds; propagation of that change waits out
+    # the cache TTL (see database.outbox), so it also rewrites this quote.
+    products = await product_cache.get_many(
+        products_collection,
+        [ObjectId(item.product_id) for item in quote_data.line_items],
+    )
+
+    # Build the line items with denormalized product data
+    denormalized_line_items = []
+    total_amount = 0.0
+
+    for item in quote_data.line_items:
+        # Use the canonical (lowercase) form so propagation can match it
+        product_id = str(ObjectId(item.product_id))
+        product = products.get(product_id)
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -63,65 +152,142 @@ async def create_quote(quote_data: QuoteCreate) -> Quote:
         # Calculate line total
         line_total = item.quantity * product["price"]
 
-        # Create denormalized line item
-        denormalized_item = QuoteLineItem(
-            product_id=item.product_id,
-            product_name=product["name"],
-            product_price=product["price"],
-            product_unit=product["unit"],
-            quantity=item.quantity,
-            line_total=line_total
-        )
-        denormalized_line_items.append(denormalized_item.model_dump())
+        # Create denormalized line item; its values come from validated
+        # input and stored products, so it is built as a plain document
+        denormalized_line_items.append({
+            "product_id": product_id,
+            "product_name": product["name"],
+            "product_price": product["price"],
+            "product_unit": product["unit"],
+            "quantity": item.quantity,
+            "line_total": line_total,
+        })
         total_amount += line_total
 
     # Build the quote document
     quote_dict = quote_data.model_dump(exclude={"line_items"})
     quote_dict["line_items"] = denormalized_line_items
     quote_dict["total_amount"] = total_amount
-    quote_dict["created_at"] = datetime.now(timezone.utc)
-    quote_dict["updated_at"] = datetime.now(timezone.utc)
-
-    # Insert into database
-    result = await quotes_collection.insert_one(quote_dict)
+    quote_dict["created_at"] = quote_dict["updated_at"] = utc_now()
+
+    # Insert into database; the inserted document (now carrying its _id)
+    # is the response, so no read-back is needed
+    await quotes_collection.insert_one(quote_dict)
+
+    return MongoJSONResponse(quote_dict, status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/", response_model=Union[List[Quote], List[QuotePartial]])
+async def list_quotes(
+    request: Request,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE,
+                       description="Maximum number of quotes to return"),
+    after: Optional[str] = Query(None, description="Cursor from X-Next-Cursor of the previous page"),
+    customer_email: Optional[str] = Query(None, description="Only quotes for this customer"),
+    quote_status: Optional[str] = Query(None, alias="status", description="Only quotes in this status"),
+    created_from: Optional[datetime] = Query(None, description="Earliest creation time, inclusive"),
+    created_to: Optional[datetime] = Query(None, description="Latest creation time, inclusive"),
+    product_id: Optional[str] = Query(None, description="Only quotes containing this product"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; _id is always included"),
+    sort: QuoteSort = Query("_id", description="Sort field, prefixed with - for descending"),
+) -> List[Quote]:
+    """
+    List quotes one page at a time, optionally filtered and sorted.
 
-    # Fetch and return the created quote
-    created_quote = await quotes_collection.find_one({"_id": result.inserted_id})
-    if not created_quote:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to retrieve created quote"
-        )
+    Filters combine with AND. Customer and status listings are indexed for
+    sort=-created_at (newest first), the order summary screens show them in,
+    and status listings for the default sort too. Datetimes without an
+    offset are read as UTC.
+    When more quotes follow, the X-Next-Cursor response header carries an
+    opaque cursor to pass as ?after= for the next page, together with the
+    same filters and sort.
 
-    # Convert ObjectId to string for response
-    created_quote["_id"] = str(created_quote["_id"])
-    return Quote(**created_quote)
+    With "Accept: application/x-ndjson" the quotes are instead streamed one
+    per line straight from the database cursor. The stream is not paged: it
+    covers every quote after ?after=, up to ?limit= only when given.
 
+    With ?fields= only the listed fields (and _id) are read from the
+    database and returned, e.g. ?fields=customer_name,status,total_amount.
 
-@router.get("/", response_model=List[Quote])
-async def list_quotes() -> List[Quote]:
-    """
-    List all quotes.
+    Args:
+        limit: Maximum number of quotes to return
+        after: Cursor of the previous page
+        customer_email: Exact customer email
+        quote_status: Exact quote status
+        created_from: Earliest creation time, inclusive
+        created_to: Latest creation time, inclusive
+        product_id: ID of a product the quotes must contain
+        fields: Fields to return instead of the whole document
+        sort: Sort option
 
     Returns:
-        List of all quotes in the database with their denormalized product data
+        A page of quotes with their denormalized product data
+
+    Raises:
+        HTTPException: If the product ID, date range, fields or cursor are invalid
     """
     db = get_database()
     quotes_collection = db["quotes"]
 
-    quotes = []
-    async for quote_doc in quotes_collection.find():
-        quote_doc["_id"] = str(quote_doc["_id"])
-        quotes.append(Quote(**quote_doc))
+    if product_id is not None:
+        if not ObjectId.is_valid(product_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid product ID format: {product_id}"
+            )
+        # Line items store the canonical (lowercase) form
+        product_id = str(ObjectId(product_id))
+
+    created_from, created_to = as_utc(created_from), as_utc(created_to)
+    if created_from is not None and created_to is not None and created_from > created_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="created_from must not be after created_to"
+        )
+
+    quote_filter = build_quote_filter(
+        customer_email, quote_status, created_from, created_to, product_id)
+    sort_spec = QUOTE_SORTS[sort]
+    try:
+        query = page_query(quote_filter, sort_spec, after)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+    projection = QUOTE_PROJECTION
+    if fields is not None:
+        try:
+            projection = fieldset_projection(Quote, fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+    if wants_ndjson(request):
+        cursor = quotes_collection.find(query, projection).sort(list(sort_spec))
+        if "limit" in request.query_params:
+            cursor = cursor.limit(limit)
+        return ndjson_response(cursor)
 
-    return quotes
+    quote_docs, next_cursor = await fetch_page(
+        quotes_collection, query, sort_spec, limit, projection)
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return MongoJSONResponse(quote_docs, headers=headers)
 
 
 @router.get("/{quote_id}", response_model=Quote)
-async def get_quote(quote_id: str) -> Quote:
+async def get_quote(quote_id: str, request: Request) -> Quote:
     """
     Get a specific quote by ID.
 
+    The response carries an ETag. When the client sends it back in
+    If-None-Match, only the quote's updated_at is read first, and if the
+    quote is unchanged 304 Not Modified is returned without a body.
+
     Args:
         quote_id: The quote ID
 
@@ -141,13 +307,27 @@ async def get_quote(quote_id: str) -> Quote:
             detail="Invalid quote ID format"
         )
 
+    # A conditional request is answered from updated_at alone when the
+    # client's copy is current, which skips reading the line items
+    if "if-none-match" in request.headers:
+        stamp = await quotes_collection.find_one(
+            {"_id": ObjectId(quote_id)}, {"updated_at": 1})
+        if not stamp:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Quote {quote_id} not found"
+            )
+        etag = entity_tag(stamp)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+
     # Find quote
-    quote_doc = await quotes_collection.find_one({"_id": ObjectId(quote_id)})
+    quote_doc = await quotes_collection.find_one(
+        {"_id": ObjectId(quote_id)}, QUOTE_PROJECTION)
     if not quote_doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Quote {quote_id} not found"
         )
 
-    quote_doc["_id"] = str(quote_doc["_id"])
-    return Quote(**quote_doc)
+    return MongoJSONResponse(quote_doc, headers={"ETag": entity_tag(quote_doc)})
@@ -0,0 +1,157 @@
+"""
+Fast JSON responses for documents read from or written to MongoDB.
+
+Handlers normally build a Pydantic model from each document, and FastAPI
+then validates and serializes it a second time against the response model.
+Documents that come from the database were validated on the way in, so
+this module encodes them directly with pydantic-core's JSON serializer,
+which handles datetimes natively; ObjectIds are encoded as strings.
+"""
+from datetime import timezone
+from typing import Any, Dict, Type
+
+from bson import ObjectId
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from timing import JSON, timed
+
+
+def _encode_bson(value: Any) -> Any:
+    """Encode BSON types that JSON has no representation for."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Serialize documents to JSON without building models.
+
+    Args:
+        content: A document, a list of documents or any JSON-compatible value
+
+    Returns:
+        The encoded JSON
+    """
+    with timed(JSON):
+        return to_json(content, fallback=_encode_bson)
+
+
+def projection_for(model: Type[BaseModel]) -> Dict[str, int]:
+    """
+    Build a projection returning exactly the fields of a response model.
+
+    Keeps internal fields out of responses that skip model validation.
+
+    Args:
+        model: The response model
+
+    Returns:
+        A projection document keyed by the fields' aliases
+    """
+    return {field.alias or name: 1 for name, field in model.model_fields.items()}
+
+
+def fieldset_projection(model: Type[BaseModel], fields: str) -> Dict[str, int]:
+    """
+    Build the projection for a sparse fieldset requested with ?fields=.
+
+    Args:
+        model: The full response model
+        fields: Comma-separated field names, as they appear in responses
+
+    Returns:
+        A projection of _id and the requested fields
+
+    Raises:
+        ValueError: If a field is not part of the model
+    """
+    allowed = projection_for(model)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - allowed.keys()
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return {"_id": 1, **{field: 1 for field in sorted(requested)}}
+
+
+def select_fields(document: Dict[str, Any], projection: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Apply an inclusion projection to a document already in memory.
+
+    Args:
+        document: The full document
+        projection: A projection as built by projection_for
+
+    Returns:
+        A new document holding only the projected fields
+    """
+    return {field: document[field] for field in projection if field in document}
+
+
+class MongoJSONResponse(Response):
+    """JSON response that encodes trusted MongoDB documents directly."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def entity_tag(document: Dict[str, Any]) -> str:
+    """
+    Compute the strong ETag of a document from its _id and updated_at.
+
+    Every write to products and quotes sets updated_at, so the tag changes
+    whenever the document does. Only those two fields are needed, so the tag
+    can be computed from a projection.
+
+    Args:
+        document: A document with _id and updated_at
+
+    Returns:
+        The quoted entity tag
+    """
+    updated_at = document["updated_at"]
+    if updated_at.tzinfo is None:
+        # MongoDB stores UTC
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    millis = int(updated_at.timestamp() * 1000)
+    return f'"{document["_id"]}-{millis:x}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Check whether the client's If-None-Match header matches an entity tag.
+
+    Uses the weak comparison required for If-None-Match, so a W/ prefix on
+    the client's tags is ignored.
+
+    Args:
+        request: The incoming request
+        etag: The current entity tag of the resource
+
+    Returns:
+        True if the client already holds the current representation
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def not_modified_response(etag: str) -> Response:
+    """
+    Build a 304 Not Modified response, which carries no body.
+
+    Args:
+        etag: The current entity tag of the resource
+
+    Returns:
+        The response
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,155 @@
+"""
+Streaming parsers for uploaded CSV and NDJSON request bodies.
+
+The body is decoded and split into records as it arrives, so memory use
+does not grow with the size of the upload. Each record is yielded with its
+1-based row number (the header line of a CSV file is not counted) and
+either its fields or the reason it could not be parsed, so one malformed
+row does not abort the upload.
+"""
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+CSV_MEDIA_TYPE = "text/csv"
+
+# (row number, fields, parse error); exactly one of fields and error is None
+Record = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# Lines a CSV record may span through quoted line breaks before it is
+# reported as an error, which bounds the memory a stray quote can take
+MAX_CSV_RECORD_LINES = 100
+
+# Where the CSV quote scanner is within a record, following csv.reader's
+# default dialect: a quote only opens a quoted value at the start of a field
+_FIELD_START, _UNQUOTED, _QUOTED, _QUOTE_IN_QUOTED = range(4)
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Decode the request body as UTF-8 and yield it line by line, ends included."""
+    # utf-8-sig drops the byte order mark spreadsheet exports often start with
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        # Split on \n only: other line separators may appear inside values,
+        # and \r\n endings keep their \r, which both parsers accept
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _scan_quotes(line: str, state: int) -> int:
+    """
+    Advance the quote scanner over a line of CSV.
+
+    Args:
+        line: The line, with its line ending
+        state: The scanner state at the start of the line
+
+    Returns:
+        The state at the end of the line; _QUOTED if a quoted value
+        continues on the next line
+    """
+    if state != _QUOTED and '"' not in line:
+        return _FIELD_START if line.endswith("\n") else _UNQUOTED
+    for char in line:
+        if state == _QUOTED:
+            if char == '"':
+                state = _QUOTE_IN_QUOTED
+        elif char == '"':
+            # A doubled quote inside a quoted value is an escaped quote;
+            # one inside an unquoted value (3/4" Gravel) is taken literally
+            state = _QUOTED if state in (_FIELD_START, _QUOTE_IN_QUOTED) else _UNQUOTED
+        elif char in ",\r\n":
+            state = _FIELD_START
+        else:
+            state = _UNQUOTED
+    return state
+
+
+async def iter_ndjson_records(request: Request) -> AsyncIterator[Record]:
+    """
+    Parse an NDJSON request body into records, one JSON object per line.
+
+    Blank lines are skipped without being counted.
+
+    Args:
+        request: The incoming request
+
+    Yields:
+        A record per line
+    """
+    row_number = 0
+    async for line in _iter_lines(request):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(fields, dict):
+            yield row_number, None, "Expected a JSON object"
+            continue
+        yield row_number, fields, None
+
+
+async def iter_csv_records(request: Request) -> AsyncIterator[Record]:
+    """
+    Parse a CSV request body into records, using its first line as the header.
+
+    Quoted values may span lines, up to MAX_CSV_RECORD_LINES per record; a
+    longer record is reported as an error and parsing resumes on the next
+    line. Empty values are read as missing, so optional fields can be left
+    blank.
+
+    Args:
+        request: The incoming request
+
+    Yields:
+        A record per data row
+    """
+    header: Optional[List[str]] = None
+    row_number = 0
+    buffered: List[str] = []
+    state = _FIELD_START
+
+    async for line in _iter_lines(request):
+        buffered.append(line)
+        # A record is complete unless a quoted value continues past the line
+        state = _scan_quotes(line, state)
+        if state == _QUOTED:
+            if len(buffered) < MAX_CSV_RECORD_LINES:
+                continue
+            row_number += 1
+            yield row_number, None, (
+                f"Quoted value spans more than {MAX_CSV_RECORD_LINES} lines")
+            buffered = []
+            state = _FIELD_START
+            continue
+        values = next(csv.reader(buffered), [])
+        buffered = []
+
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row_number, {
+            name: value for name, value in zip(header, values) if value != ""
+        }, None
+
+    if buffered:
+        yield row_number + 1, None, "Unterminated quoted value"
@@ -0,0 +1,204 @@
+"""
+Benchmark API request latency and throughput against concurrency.
+
+Requests are sent to the application in-process (through httpx's ASGI
+transport, so no HTTP server is involved) against a scratch database, with
+the product cache disabled so every request reaches MongoDB. Each level of
+concurrency runs a mix of product reads, quote reads, quote creations and
+quote listings, and reports latency percentiles and requests per second.
+
+The MongoDB client the application uses can be chosen, to compare PyMongo's
+native asyncio client with Motor, which runs every operation on a thread
+pool. Motor is no longer a dependency of the application; install it
+(pip install motor) to measure the "before" numbers.
+
+The client is created with the pool, timeout and compression settings of
+the environment. The pool size and compressors can be overridden, to see
+how they affect throughput: a pool smaller than the concurrency makes
+requests queue for connections, and compression trades CPU for bytes on
+the wire, which pays off on large responses and slow networks.
+
+Usage:
+    python scripts/benchmark_client.py [--driver pymongo|motor]
+        [--requests N] [--max-pool-size N] [--min-pool-size N]
+        [--compressors zstd,snappy,zlib|none] [concurrency ...]
+
+Example:
+    python scripts/benchmark_client.py --driver motor 1 10 50
+    python scripts/benchmark_client.py --driver pymongo 1 10 50
+    python scripts/benchmark_client.py --max-pool-size 5 1 10 50
+    python scripts/benchmark_client.py --compressors zstd 1 10 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from httpx import ASGITransport, AsyncClient
+
+# Add parent directory to path to import from project
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from database.indexes import ensure_indexes  # noqa: E402
+from database.mongodb import client_options, create_client, mongodb  # noqa: E402
+from database.product_cache import product_cache  # noqa: E402
+from main import app  # noqa: E402
+
+
+DEFAULT_CONCURRENCY = [1, 10, 50]
+DEFAULT_REQUESTS = 2_000
+PRODUCT_COUNT = 100
+QUOTE_COUNT = 100
+
+
+def create_benchmark_client(driver, mongodb_url, overrides):
+    """Create a client of the chosen driver, configured like the application's."""
+    if driver == "pymongo":
+        return create_client(mongodb_url, **overrides)
+
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+    except ImportError:
+        sys.exit("Motor is not installed; run pip install motor to benchmark it")
+    return AsyncIOMotorClient(mongodb_url, tz_aware=True, **{**client_options(), **overrides})
+
+
+async def close_client(client):
+    """Close a client of either driver (only PyMongo's close is a coroutine)."""
+    result = client.close()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+async def seed(http):
+    """Create the products and quotes the benchmark requests read."""
+    product_ids = []
+    for i in range(PRODUCT_COUNT):
+        response = await http.post("/products/", json={
+            "name": f"Benchmark Product {i}",
+            "price": 10.0 + i,
+            "unit": "yard",
+            "supplier_name": "Benchmark Supplier",
+            "category": "Mulch",
+            "sku": f"BENCH-{i:04d}",
+        })
+        product_ids.append(response.json()["_id"])
+
+    quote_ids = []
+    for i in range(QUOTE_COUNT):
+        response = await http.post("/quotes/", json=quote_body(product_ids, i))
+        quote_ids.append(response.json()["_id"])
+    return product_ids, quote_ids
+
+
+def quote_body(product_ids, i):
+    """Build a quote creation request with five line items."""
+    return {
+        "customer_name": f"Customer {i}",
+        "customer_email": f"customer{i}@example.com",
+        "line_items": [
+            {"product_id": product_ids[(i + offset) % len(product_ids)], "quantity": 2.0}
+            for offset in range(5)
+        ],
+    }
+
+
+async def run_level(http, product_ids, quote_ids, concurrency, total):
+    """Send total requests with the given number in flight; return the latencies."""
+    latencies = []
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request
+        while next_request < total:
+            i = next_request
+            next_request += 1
+            kind = i % 4
+            started = time.perf_counter()
+            if kind == 0:
+                response = await http.get(f"/products/{product_ids[i % len(product_ids)]}")
+            elif kind == 1:
+                response = await http.get(f"/quotes/{quote_ids[i % len(quote_ids)]}")
+            elif kind == 2:
+                response = await http.post("/quotes/", json=quote_body(product_ids, i))
+            else:
+                response = await http.get("/quotes/", params={"limit": QUOTE_COUNT})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    """Return the value below which the given fraction of the values fall."""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_benchmark(driver, concurrency_levels, total, overrides):
+    """Measure latency and throughput at each level of concurrency."""
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "landscape_supply") + "_benchmark"
+
+    print(f"Connecting to MongoDB at {mongodb_url}, database: {db_name} ({driver})")
+    print(f"Client options: {client_options() | overrides}")
+    client = create_benchmark_client(driver, mongodb_url, overrides)
+    mongodb.client = client
+    mongodb.database = client[db_name]
+    product_cache.max_size = 0
+
+    try:
+        await client.admin.command('ping')
+        await client.drop_database(db_name)
+        await ensure_indexes(mongodb.database)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as http:
+            product_ids, quote_ids = await seed(http)
+            # Warm up connections before measuring
+            await run_level(http, product_ids, quote_ids, max(concurrency_levels), 300)
+
+            print(f"\n{'concurrency':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                  f"{'mean ms':>8} {'req/s':>8}")
+            for concurrency in concurrency_levels:
+                latencies, elapsed = await run_level(
+                    http, product_ids, quote_ids, concurrency, total)
+                latencies.sort()
+                print(f"{concurrency:>11} "
+                      f"{percentile(latencies, 0.50) * 1000:>8.2f} "
+                      f"{percentile(latencies, 0.95) * 1000:>8.2f} "
+                      f"{percentile(latencies, 0.99) * 1000:>8.2f} "
+                      f"{statistics.fmean(latencies) * 1000:>8.2f} "
+                      f"{len(latencies) / elapsed:>8.0f}")
+
+    finally:
+        await client.drop_database(db_name)
+        await close_client(client)
+        mongodb.client = None
+        mongodb.database = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--driver", choices=["pymongo", "motor"], default="pymongo")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS,
+                        help="requests sent at each level of concurrency")
+    parser.add_argument("--max-pool-size", type=int, help="override MONGODB_MAX_POOL_SIZE")
+    parser.add_argument("--min-pool-size", type=int, help="override MONGODB_MIN_POOL_SIZE")
+    parser.add_argument("--compressors",
+                        help="override MONGODB_COMPRESSORS (comma-separated, or none)")
+    parser.add_argument("concurrency", type=int, nargs="*", default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.max_pool_size is not None:
+        overrides["maxPoolSize"] = args.max_pool_size
+    if args.min_pool_size is not None:
+        overrides["minPoolSize"] = args.min_pool_size
+    if args.compressors is not None:
+        # An empty list turns compression off
+        overrides["compressors"] = [] if args.compressors == "none" else args.compressors.split(",")
+    asyncio.run(run_benchmark(args.driver, args.concurrency, args.requests, overrides))
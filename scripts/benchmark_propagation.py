@@ -0,0 +1,116 @@
+"""
+Benchmark propagation latency against the number of quotes per product.
+
+For each fan-out, the script fills a scratch database with that many quotes
+referencing one product, changes the product and times a single propagation
+pass. The scratch database is dropped afterwards.
+
+Usage:
+    python scripts/benchmark_propagation.py [fan_out ...]
+
+Example:
+    python scripts/benchmark_propagation.py 1000 10000 100000
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+
+# Add parent directory to path to import from project
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from database.propagation import propagate_product_to_quotes  # noqa: E402
+
+
+DEFAULT_FAN_OUTS = [1_000, 10_000, 100_000]
+INSERT_BATCH_SIZE = 10_000
+LINE_ITEMS_PER_QUOTE = 5
+
+
+def build_quote(product, other_product_ids):
+    """Build a quote with one line item for the product and some filler items."""
+    line_items = [{
+        "product_id": str(product["_id"]),
+        "product_name": product["name"],
+        "product_price": product["price"],
+        "product_unit": product["unit"],
+        "quantity": 2.0,
+        "line_total": 2.0 * product["price"],
+    }]
+    for other_id in other_product_ids:
+        line_items.append({
+            "product_id": other_id,
+            "product_name": "Filler Product",
+            "product_price": 10.0,
+            "product_unit": "bag",
+            "quantity": 1.0,
+            "line_total": 10.0,
+        })
+
+    return {
+        "customer_name": "Benchmark Customer",
+        "customer_email": "benchmark@example.com",
+        "status": "draft",
+        "line_items": line_items,
+        "total_amount": sum(item["line_total"] for item in line_items),
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+async def seed_quotes(db, product, fan_out):
+    """Insert fan_out quotes that reference the product."""
+    other_product_ids = [str(ObjectId())
+                         for _ in range(LINE_ITEMS_PER_QUOTE - 1)]
+    remaining = fan_out
+    while remaining > 0:
+        batch_size = min(remaining, INSERT_BATCH_SIZE)
+        await db["quotes"].insert_many(
+            [build_quote(product, other_product_ids) for _ in range(batch_size)],
+            ordered=False,
+        )
+        remaining -= batch_size
+
+
+async def run_benchmark(fan_outs):
+    """Time one propagation pass for each fan-out."""
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    db_name = os.getenv("MONGODB_DB_NAME", "landscape_supply") + "_benchmark"
+
+    print(f"Connecting to MongoDB at {mongodb_url}, database: {db_name}")
+    client = AsyncMongoClient(mongodb_url)
+    db = client[db_name]
+
+    try:
+        await client.admin.command('ping')
+
+        print(f"\n{'quotes':>10} {'modified':>10} {'seconds':>10} {'quotes/s':>12}")
+        for fan_out in fan_outs:
+            await client.drop_database(db_name)
+            await db["quotes"].create_index("line_items.product_id")
+
+            product = {"_id": ObjectId(), "name": "Premium Mulch",
+                       "price": 35.50, "unit": "yard"}
+            await seed_quotes(db, product, fan_out)
+
+            product.update(name="Premium Mulch (2024)", price=37.25)
+            started = time.perf_counter()
+            modified = await propagate_product_to_quotes(db, product)
+            elapsed = time.perf_counter() - started
+
+            print(f"{fan_out:>10} {modified:>10} {elapsed:>10.3f} "
+                  f"{modified / elapsed:>12.0f}")
+
+    finally:
+        await client.drop_database(db_name)
+        await client.close()
+
+
+if __name__ == "__main__":
+    fan_outs = [int(arg) for arg in sys.argv[1:]] or DEFAULT_FAN_OUTS
+    asyncio.run(run_benchmark(fan_outs))
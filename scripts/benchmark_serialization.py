@@ -0,0 +1,108 @@
+"""
+Benchmark quote response serialization against the number of line items.
+
+Compares the model path (building a Quote from the document, then letting
+FastAPI validate it against the response model and encode it) with the
+direct path used by the routes (routes.responses.dump_json). No database
+is needed: the quotes are built in memory as MongoDB would return them.
+
+Usage:
+    python scripts/benchmark_serialization.py [line_items ...]
+
+Example:
+    python scripts/benchmark_serialization.py 1 100 1000
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+# Add parent directory to path to import from project
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from models.quote import Quote  # noqa: E402
+from routes.responses import dump_json  # noqa: E402
+
+
+DEFAULT_LINE_ITEM_COUNTS = [1, 100, 1000]
+# Roughly constant work per measurement, whatever the quote size
+LINE_ITEMS_PER_MEASUREMENT = 200_000
+
+
+def build_quote(line_item_count):
+    """Build a quote document as it is read from MongoDB."""
+    line_items = [
+        {
+            "product_id": str(ObjectId()),
+            "product_name": f"Product {i}",
+            "product_price": 35.50,
+            "product_unit": "yard",
+            "quantity": 2.0,
+            "line_total": 71.00,
+        }
+        for i in range(line_item_count)
+    ]
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(),
+        "customer_name": "Benchmark Customer",
+        "customer_email": "benchmark@example.com",
+        "project_name": "Benchmark Project",
+        "status": "draft",
+        "line_items": line_items,
+        "total_amount": 71.00 * line_item_count,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def model_path(field, document):
+    """Serialize the way handlers returning Quote models are serialized."""
+    document = {**document, "_id": str(document["_id"])}
+    content = await serialize_response(field=field, response_content=Quote(**document))
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False,
+                      separators=(",", ":")).encode()
+
+
+async def direct_path(field, document):
+    """Serialize the way the routes serialize documents."""
+    return dump_json(document)
+
+
+async def time_path(path, field, document, iterations):
+    """Return the mean seconds per serialization."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await path(field, document)
+    return (time.perf_counter() - started) / iterations
+
+
+async def run_benchmark(line_item_counts):
+    """Time both serialization paths for each quote size."""
+    field = create_model_field(name="Response_get_quote", type_=Quote, mode="serialization")
+
+    print(f"{'line items':>10} {'model ms':>10} {'direct ms':>10} {'speedup':>8}")
+    for count in line_item_counts:
+        document = build_quote(count)
+        assert json.loads(await model_path(field, document)) == \
+            json.loads(await direct_path(field, document))
+
+        iterations = max(LINE_ITEMS_PER_MEASUREMENT // count, 10)
+        model_seconds = await time_path(model_path, field, document, iterations)
+        direct_seconds = await time_path(direct_path, field, document, iterations)
+
+        print(f"{count:>10} {model_seconds * 1000:>10.3f} "
+              f"{direct_seconds * 1000:>10.3f} {model_seconds / direct_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_LINE_ITEM_COUNTS
+    asyncio.run(run_benchmark(counts))
@@ -0,0 +1,47 @@
+"""
+Propagation worker that drains the outbox of product change tasks.
+
+Each task is applied to quotes in _id-ordered chunks with a checkpoint after
+every chunk. If the worker is stopped mid-task, the task's lease expires and
+the next worker resumes it from the last checkpoint.
+
+Usage:
+    python scripts/propagation_worker.py
+"""
+import asyncio
+import os
+import socket
+import sys
+
+# Add parent directory to path to import from project
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')))
+
+from database.mongodb import close_mongodb_connection, connect_to_mongodb, get_database  # noqa: E402
+from database.outbox import drain_outbox  # noqa: E402
+from settings import settings  # noqa: E402
+
+
+async def run_worker():
+    """Drain the outbox, then poll for new tasks until stopped."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    await connect_to_mongodb()
+    db = get_database()
+    print(f"Propagation worker {worker_id} started")
+
+    try:
+        while True:
+            completed = await drain_outbox(db, worker_id)
+            if completed:
+                print(f"Completed {completed} propagation task(s)")
+            await asyncio.sleep(settings.PROPAGATION_POLL_INTERVAL_SECONDS)
+    finally:
+        await close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_worker())
+    except KeyboardInterrupt:
+        print("Propagation worker stopped")
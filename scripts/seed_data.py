@@ -4,7 +4,7 @@ Seed script to populate initial product data for testing.
 Usage:
     python scripts/seed_data.py
 """
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 import asyncio
 import os
 import sys
@@ -135,7 +135,7 @@ async def seed_database():
     db_name = os.getenv("MONGODB_DB_NAME", "landscape_supply")
 
     print(f"Connecting to MongoDB at {mongodb_url}")
-    client = AsyncIOMotorClient(mongodb_url)
+    client = AsyncMongoClient(mongodb_url)
     db = client[db_name]
 
     try:
@@ -164,7 +164,7 @@ async def seed_database():
         print(f"❌ Error seeding database: {e}")
         raise
     finally:
-        client.close()
+        await client.close()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import os
 from enum import Enum
 from functools import lru_cache
+from typing import Literal
 
 # Use pydantic_settings for better validation and type hints
 from pydantic_settings import BaseSettings as PydanticBaseSettings
@@ -36,9 +37,77 @@ class BaseSettings(PydanticBaseSettings):
     MONGODB_URL: str | None = None
     MONGODB_DB_NAME: str | None = None
 
+    # MongoDB client settings, per API or worker process. None leaves the
+    # option to the driver (or to the connection string).
+    # Connections kept per server: the pool never grows past the maximum and
+    # keeps at least the minimum open, so bursts do not wait for handshakes
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    # How long a connection may sit idle in the pool before it is closed
+    MONGODB_MAX_IDLE_TIME_MS: int | None = None
+    # How long an operation waits for a reachable server before failing
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30_000
+    # How long a read from the server may block before the operation fails
+    MONGODB_SOCKET_TIMEOUT_MS: int | None = None
+    # How long an operation waits for a connection when the pool is exhausted
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int | None = None
+    # Wire compressors offered to the server, in order of preference. zstd
+    # needs backports.zstd before Python 3.14 and snappy needs python-snappy;
+    # the driver warns about and skips compressors it cannot load.
+    MONGODB_COMPRESSORS: list[Literal["zstd", "snappy", "zlib"]] = []
+    # Commands taking at least this long are logged with their query shape
+    # (None turns the log off; latencies are recorded in /metrics regardless)
+    MONGODB_SLOW_COMMAND_MS: float | None = 100.0
+
+    # Report where each request's time went (MongoDB, validation,
+    # serialization) in a Server-Timing header on every response
+    SERVER_TIMING: bool = False
+    # Also report it for requests sending an X-Debug-Timing header
+    SERVER_TIMING_DEBUG_HEADER: bool = True
+
     # CORS settings - can still be overridden
     CORS_ORIGINS: list[str] = ["*"]
 
+    # Listing pagination settings
+    DEFAULT_PAGE_SIZE: int = 100
+    # Hard upper bound on ?limit= so no request can load a whole collection
+    MAX_PAGE_SIZE: int = 1000
+
+    # Bulk product import settings
+    # Number of validated rows written with one bulk operation
+    IMPORT_BATCH_SIZE: int = 1000
+
+    # Product cache settings
+    # Maximum number of products cached per API process
+    PRODUCT_CACHE_MAX_SIZE: int = 10_000
+    # How long a cached product is served before it is read again. Writes
+    # only invalidate the cache of the process that made them, so this bounds
+    # how stale other processes can be; propagation waits at least this long.
+    PRODUCT_CACHE_TTL_SECONDS: float = 60.0
+
+    # Propagation outbox settings
+    # Number of quotes rewritten between two worker checkpoints
+    PROPAGATION_CHUNK_SIZE: int = 1000
+    # How long a claimed task stays locked before another worker may resume it
+    PROPAGATION_LEASE_SECONDS: float = 60.0
+    # How long the worker sleeps when the outbox is empty
+    PROPAGATION_POLL_INTERVAL_SECONDS: float = 1.0
+    # How long a queued propagation waits for further updates of the same
+    # product to merge into it before it becomes runnable (at least the
+    # product cache TTL after the latest of them)
+    PROPAGATION_COALESCE_WINDOW_SECONDS: float = 30.0
+    # Added to the cache TTL wait: tasks are queued before the product is
+    # written, and other processes may cache the old state until the write
+    PROPAGATION_WRITE_MARGIN_SECONDS: float = 10.0
+    # Longest a task is pushed back by updates merging into it; a product
+    # updated continuously is still propagated at least this often
+    PROPAGATION_MAX_DELAY_SECONDS: float = 300.0
+    # Quote statuses that still receive product changes. Accepted and rejected
+    # quotes keep the pricing they were closed with. The partial index backing
+    # propagation is built from this list, so changing it requires dropping the
+    # line_items_product_id_open index and restarting.
+    PROPAGATION_OPEN_STATUSES: list[str] = ["draft", "sent"]
+
     # Add other common base settings here
     # pydantic-settings automatically loads this from the EXAMPLE_API_KEY environment variable.
     # It's optional (str | None) here, so it defaults to None if the env var isn't set.
@@ -93,6 +162,19 @@ class ProductionSettings(BaseSettings):
     MONGODB_URL: str
     MONGODB_DB_NAME: str
     CORS_ORIGINS: list[str] = ["https://your-production-domain.com"]
+    # Bound each process's pool so several API and worker processes stay
+    # within the server's connection limit, keep warm connections for
+    # bursts, fail fast when MongoDB is unreachable or the pool is saturated
+    # rather than holding requests, and compress traffic to the database
+    MONGODB_MAX_POOL_SIZE: int = 50
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int | None = 300_000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5_000
+    MONGODB_SOCKET_TIMEOUT_MS: int | None = 30_000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int | None = 5_000
+    MONGODB_COMPRESSORS: list[Literal["zstd", "snappy", "zlib"]] = ["zstd", "zlib"]
+    # Timings reveal internals; keep them out of public responses
+    SERVER_TIMING_DEBUG_HEADER: bool = False
 
 
 class TestingSettings(BaseSettings):
@@ -107,6 +189,8 @@ class TestingSettings(BaseSettings):
     # MongoDB defaults for testing (runs in Docker with service name 'mongodb')
     MONGODB_URL: str = "mongodb://mongodb:27017"
     MONGODB_DB_NAME: str = "landscape_supply_test"
+    # Make queued propagations runnable immediately
+    PROPAGATION_COALESCE_WINDOW_SECONDS: float = 0.0
 
 
 @lru_cache()  # Cache the settings object for performance
@@ -4,31 +4,72 @@ Pytest configuration and fixtures for integration tests.
 import os
 import pytest
 from httpx import ASGITransport, AsyncClient
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 
 # Import app and settings - ENVIRONMENT is controlled by .env file
 from main import app
-from database.mongodb import mongodb
+from database.indexes import ensure_indexes
+from database.mongodb import create_client, mongodb
+from database.product_cache import product_cache
 from settings import settings
 
 
+class CommandRecorder(monitoring.CommandListener):
+    """Records the MongoDB commands sent by the test client."""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(
+            (event.command_name, event.command.get(event.command_name)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def clear(self):
+        self.commands.clear()
+
+    def count(self, command_name, collection=None):
+        """Count recorded commands by name, optionally for one collection."""
+        return sum(
+            1 for name, target in self.commands
+            if name == command_name and (collection is None or target == collection)
+        )
+
+
 @pytest.fixture
-async def client():
+def command_recorder():
+    """Record the MongoDB commands issued during a test."""
+    return CommandRecorder()
+
+
+@pytest.fixture
+async def client(command_recorder):
     """
     Create an async test client for each test.
     Manually handles MongoDB connection for testing.
     """
     # Create MongoDB connection manually in this loop
-    mongo_client = AsyncIOMotorClient(settings.MONGODB_URL)
+    mongo_client = create_client(
+        settings.MONGODB_URL, event_listeners=[command_recorder])
     db = mongo_client[settings.MONGODB_DB_NAME]
 
     # Set the global mongodb instance for the app to use
     mongodb.client = mongo_client
     mongodb.database = db
 
+    # Indexes are normally ensured by the app lifespan, which is not run here
+    await ensure_indexes(db)
+
     # Clean database before test
     await db["products"].delete_many({})
     await db["quotes"].delete_many({})
+    await db["outbox"].delete_many({})
+    product_cache.clear()
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
@@ -36,8 +77,19 @@ async def client():
     # Clean database after test
     await db["products"].delete_many({})
     await db["quotes"].delete_many({})
+    await db["outbox"].delete_many({})
 
     # Close connection
-    mongo_client.close()
+    await mongo_client.close()
     mongodb.client = None
     mongodb.database = None
+
+
+@pytest.fixture
+def no_coalesce_window(monkeypatch):
+    """Make queued propagation tasks runnable immediately."""
+    monkeypatch.setattr(settings, "PROPAGATION_COALESCE_WINDOW_SECONDS", 0.0)
+    # Tasks also wait out the product cache TTL of other processes; the
+    # cache of this one keeps the TTL it was created with
+    monkeypatch.setattr(settings, "PRODUCT_CACHE_TTL_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "PROPAGATION_WRITE_MARGIN_SECONDS", 0.0)
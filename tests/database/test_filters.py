@@ -0,0 +1,39 @@
+"""
+Unit tests for listing filter conditions.
+"""
+import sys
+
+from database.filters import prefix_condition, range_condition
+
+
+def test_range_condition_bounds():
+    """Test inclusive bounds, open-ended ranges and no range at all."""
+    assert range_condition(1, 5) == {"$gte": 1, "$lte": 5}
+    assert range_condition(lower=1) == {"$gte": 1}
+    assert range_condition(upper=5) == {"$lte": 5}
+    assert range_condition() is None
+
+
+def test_range_condition_keeps_zero_bounds():
+    """Test that a bound of zero is not mistaken for a missing bound."""
+    assert range_condition(0, 0) == {"$gte": 0, "$lte": 0}
+
+
+def test_prefix_condition_matches_exactly_the_prefixed_strings():
+    """Test that the half-open range selects the strings with the prefix."""
+    condition = prefix_condition("MUL-")
+    values = ["MUL-", "MUL-001", "MUL-zzz", "MUL", "MUL.", "MULCH", "STN-001"]
+
+    matched = [v for v in values if condition["$gte"] <= v < condition["$lt"]]
+
+    assert matched == ["MUL-", "MUL-001", "MUL-zzz"]
+
+
+def test_prefix_condition_with_regex_characters():
+    """Test that characters special to regular expressions need no escaping."""
+    assert prefix_condition("A.*") == {"$gte": "A.*", "$lt": "A.+"}
+
+
+def test_prefix_condition_with_highest_code_point():
+    """Test that a prefix ending in the last code point has no upper bound."""
+    assert prefix_condition("A" + chr(sys.maxunicode)) == {"$gte": "A" + chr(sys.maxunicode)}
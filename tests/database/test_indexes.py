@@ -0,0 +1,372 @@
+"""
+Integration tests for index definitions and the query plans they enable.
+
+These tests use a real MongoDB connection (no mocking).
+"""
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from database.indexes import INDEXES, IndexMigrationError, ensure_indexes
+from database.mongodb import get_database
+from database.propagation import build_propagation_filter, build_propagation_pipeline
+from routes.products import PRODUCT_SORTS, build_product_filter
+from routes.quotes import QUOTE_SORTS, build_quote_filter
+
+
+def collect_plan(node, stages, index_names):
+    """Recursively collect stage and index names from an explain plan."""
+    if isinstance(node, dict):
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "indexName" in node:
+            index_names.append(node["indexName"])
+        for value in node.values():
+            collect_plan(value, stages, index_names)
+    elif isinstance(node, list):
+        for value in node:
+            collect_plan(value, stages, index_names)
+
+
+def winning_plan(explain):
+    """Return the stage names and index names used by an explain's winning plan."""
+    stages, index_names = [], []
+    collect_plan(explain["queryPlanner"]["winningPlan"], stages, index_names)
+    return stages, index_names
+
+
+async def insert_quotes(db, product_ids, status="draft"):
+    """Insert one single-line quote per product ID."""
+    await db["quotes"].insert_many([
+        {
+            "customer_name": "Test Customer",
+            "customer_email": "test@example.com",
+            "status": status,
+            "line_items": [{
+                "product_id": product_id,
+                "product_name": "Mulch",
+                "product_price": 20.00,
+                "product_unit": "yard",
+                "quantity": 1.0,
+                "line_total": 20.00,
+            }],
+            "total_amount": 20.00,
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
+        }
+        for product_id in product_ids
+    ])
+
+
+async def test_ensure_indexes_creates_declared_indexes(client):
+    """Test that every declared index exists after ensure_indexes."""
+    db = get_database()
+
+    await ensure_indexes(db)
+
+    for collection_name, indexes in INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index in indexes:
+            assert index.document["name"] in existing
+
+
+async def test_ensure_indexes_is_idempotent(client):
+    """Test that ensuring indexes twice does not fail."""
+    db = get_database()
+
+    await ensure_indexes(db)
+    await ensure_indexes(db)
+
+
+async def test_ensure_indexes_replaces_non_unique_sku_index(client):
+    """Test that the former non-unique SKU index is dropped for the unique one."""
+    db = get_database()
+    await db["products"].drop_index("sku_unique")
+    await db["products"].create_index([("sku", ASCENDING)], name="sku")
+
+    await ensure_indexes(db)
+
+    existing = await db["products"].index_information()
+    assert "sku" not in existing
+    assert existing["sku_unique"]["unique"]
+
+
+async def test_ensure_indexes_keeps_sku_index_when_skus_are_duplicated(client):
+    """Test that duplicate SKUs stop the migration before the old index is dropped."""
+    db = get_database()
+    await db["products"].drop_index("sku_unique")
+    await db["products"].create_index([("sku", ASCENDING)], name="sku")
+    await db["products"].insert_many([
+        {"name": "Mulch", "sku": "MUL-001"},
+        {"name": "Other Mulch", "sku": "MUL-001"},
+        {"name": "No SKU"},
+        {"name": "Still no SKU"},
+    ])
+
+    with pytest.raises(IndexMigrationError, match="MUL-001"):
+        await ensure_indexes(db)
+
+    existing = await db["products"].index_information()
+    assert "sku" in existing
+    assert "sku_unique" not in existing
+    # Restore the declared indexes for the tests that follow
+    await db["products"].delete_many({"sku": "MUL-001"})
+    await ensure_indexes(db)
+
+
+async def test_product_sku_is_unique(client):
+    """Test that two products cannot share a SKU."""
+    db = get_database()
+    await db["products"].insert_one({"name": "Mulch", "sku": "MUL-001"})
+
+    with pytest.raises(DuplicateKeyError):
+        await db["products"].insert_one({"name": "Other Mulch", "sku": "MUL-001"})
+
+
+async def test_propagation_update_uses_index(client):
+    """Test that the propagation update finds open quotes through the partial index."""
+    db = get_database()
+    product = {"_id": ObjectId(), "name": "Mulch", "price": 25.00, "unit": "yard"}
+    await insert_quotes(db, [str(ObjectId()) for _ in range(20)] + [str(product["_id"])])
+    await insert_quotes(db, [str(product["_id"])] * 5, status="accepted")
+
+    explain = await db.command(
+        "explain",
+        {
+            "update": "quotes",
+            "updates": [{
+                "q": build_propagation_filter(product),
+                "u": build_propagation_pipeline(product),
+                "multi": True,
+            }],
+        },
+        verbosity="queryPlanner",
+    )
+
+    stages, index_names = winning_plan(explain)
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+    assert "line_items_product_id_open" in index_names
+
+
+async def test_propagation_chunk_scan_is_ordered_by_index(client):
+    """Test that walking a product's quotes in _id order needs no collection scan or sort."""
+    db = get_database()
+    product = {"_id": ObjectId(), "name": "Mulch", "price": 25.00, "unit": "yard"}
+    await insert_quotes(db, [str(ObjectId()) for _ in range(20)] + [str(product["_id"])] * 3)
+
+    explain = await (
+        db["quotes"]
+        .find(build_propagation_filter(product), {"_id": 1})
+        .sort("_id", 1)
+        .explain()
+    )
+
+    stages, _ = winning_plan(explain)
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
+
+
+async def test_open_quotes_index_excludes_closed_quotes(client):
+    """Test that the partial index only holds keys for open quotes."""
+    db = get_database()
+    product_id = str(ObjectId())
+    await insert_quotes(db, [product_id] * 2, status="sent")
+    await insert_quotes(db, [product_id] * 3, status="accepted")
+    await insert_quotes(db, [product_id] * 4, status="rejected")
+    query = {"line_items.product_id": product_id, "status": {"$in": ["draft", "sent"]}}
+
+    open_explain = await db["quotes"].find(query).hint("line_items_product_id_open").explain()
+    full_explain = await db["quotes"].find(query).hint("line_items_product_id").explain()
+
+    assert open_explain["executionStats"]["totalKeysExamined"] == 2
+    assert full_explain["executionStats"]["totalKeysExamined"] == 9
+
+
+async def insert_products(db, count=50):
+    """Insert a catalog spread over a few categories and suppliers."""
+    await db["products"].insert_many([
+        {
+            "name": f"Product {i:03d}",
+            "price": float(10 + i),
+            "unit": "yard",
+            "supplier_name": f"Supplier {i % 3}",
+            "category": ["Mulch", "Stone", "Soil"][i % 3],
+            "sku": f"{['MUL', 'STN', 'SOL'][i % 3]}-{i:03d}",
+        }
+        for i in range(count)
+    ])
+
+
+async def test_product_category_filter_sorted_by_price_uses_index(client):
+    """Test a category listing in a price range, sorted by price, needs no sort stage."""
+    db = get_database()
+    await insert_products(db)
+    query = build_product_filter(category="Mulch", min_price=20.00, max_price=40.00)
+
+    explain = await (
+        db["products"].find(query).sort(list(PRODUCT_SORTS["-price"])).limit(10).explain()
+    )
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["category_price"]
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
+
+
+async def test_product_supplier_filter_sorted_by_price_uses_index(client):
+    """Test a supplier listing sorted by price needs no sort stage."""
+    db = get_database()
+    await insert_products(db)
+    query = build_product_filter(supplier_name="Supplier 1")
+
+    explain = await (
+        db["products"].find(query).sort(list(PRODUCT_SORTS["price"])).limit(10).explain()
+    )
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["supplier_name_price"]
+    assert "SORT" not in stages
+
+
+async def test_product_sku_prefix_uses_bounded_index_scan(client):
+    """Test a SKU prefix search only examines the keys with that prefix."""
+    db = get_database()
+    await insert_products(db, count=60)
+
+    explain = await db["products"].find(build_product_filter(sku_prefix="STN-")).explain()
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["sku_unique"]
+    assert "COLLSCAN" not in stages
+    assert explain["executionStats"]["totalKeysExamined"] <= 21
+    assert explain["executionStats"]["nReturned"] == 20
+
+
+async def insert_quote_history(db, customers=10, quotes_per_customer=10):
+    """Insert quotes for several customers, spread over statuses and days."""
+    statuses = ["draft", "sent", "accepted", "rejected"]
+    await db["quotes"].insert_many([
+        {
+            "customer_name": f"Customer {c}",
+            "customer_email": f"customer{c}@example.com",
+            "status": statuses[(c + q) % len(statuses)],
+            "line_items": [{
+                "product_id": str(ObjectId()),
+                "product_name": "Mulch",
+                "product_price": 20.00,
+                "product_unit": "yard",
+                "quantity": 1.0,
+                "line_total": 20.00,
+            }],
+            "total_amount": 20.00,
+            "created_at": datetime(2024, 1, 1 + q, c, tzinfo=timezone.utc),
+            "updated_at": datetime(2024, 1, 1 + q, c, tzinfo=timezone.utc),
+        }
+        for c in range(customers)
+        for q in range(quotes_per_customer)
+    ])
+
+
+async def test_quote_customer_listing_newest_first_uses_index(client):
+    """Test a customer's quotes, newest first, are read in index order."""
+    db = get_database()
+    await insert_quote_history(db)
+    query = build_quote_filter(customer_email="customer3@example.com")
+
+    explain = await (
+        db["quotes"].find(query).sort(list(QUOTE_SORTS["-created_at"])).limit(10).explain()
+    )
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["customer_email_created_at"]
+    assert "SORT" not in stages
+    assert explain["executionStats"]["totalDocsExamined"] == 10
+
+
+async def test_quote_customer_and_status_listing_uses_customer_index(client):
+    """Test status within a customer's quotes is filtered on the customer index."""
+    db = get_database()
+    await insert_quote_history(db)
+    query = build_quote_filter(customer_email="customer3@example.com", quote_status="sent")
+
+    explain = await (
+        db["quotes"].find(query).sort(list(QUOTE_SORTS["-created_at"])).limit(10).explain()
+    )
+
+    stages, _ = winning_plan(explain)
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
+
+
+async def test_quote_status_date_range_uses_index(client):
+    """Test quotes in a status within a date range are an index range scan."""
+    db = get_database()
+    await insert_quote_history(db)
+    query = build_quote_filter(
+        quote_status="sent",
+        created_from=datetime(2024, 1, 3, tzinfo=timezone.utc),
+        created_to=datetime(2024, 1, 5, tzinfo=timezone.utc),
+    )
+
+    explain = await (
+        db["quotes"].find(query).sort(list(QUOTE_SORTS["-created_at"])).explain()
+    )
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["status_created_at"]
+    assert "SORT" not in stages
+    stats = explain["executionStats"]
+    assert stats["totalKeysExamined"] <= stats["nReturned"] + 1
+
+
+async def test_quote_status_listing_default_sort_uses_index(client):
+    """Test a status listing in the default _id order is read in index order."""
+    db = get_database()
+    await insert_quote_history(db)
+    query = build_quote_filter(quote_status="sent")
+
+    explain = await db["quotes"].find(query).sort(list(QUOTE_SORTS["_id"])).limit(10).explain()
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["status_id"]
+    assert "SORT" not in stages
+    assert explain["executionStats"]["totalDocsExamined"] == 10
+
+
+async def test_quote_date_range_uses_index(client):
+    """Test a creation date range across all quotes is an index range scan."""
+    db = get_database()
+    await insert_quote_history(db)
+    query = build_quote_filter(
+        created_from=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        created_to=datetime(2024, 1, 2, 23, 59, tzinfo=timezone.utc),
+    )
+
+    explain = await db["quotes"].find(query).sort(list(QUOTE_SORTS["created_at"])).explain()
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["created_at"]
+    assert "SORT" not in stages
+    assert explain["executionStats"]["nReturned"] == 10
+
+
+async def test_quote_product_listing_uses_index(client):
+    """Test quotes containing a product are found through the multikey index."""
+    db = get_database()
+    product_id = str(ObjectId())
+    await insert_quotes(db, [str(ObjectId()) for _ in range(20)])
+    await insert_quotes(db, [product_id] * 2, status="accepted")
+
+    explain = await (
+        db["quotes"].find(build_quote_filter(product_id=product_id)).sort("_id", 1).explain()
+    )
+
+    stages, index_names = winning_plan(explain)
+    assert index_names == ["line_items_product_id"]
+    assert "SORT" not in stages
+    assert explain["executionStats"]["nReturned"] == 2
@@ -2,7 +2,8 @@
 Tests for MongoDB connection setup.
 """
 import pytest
-from database.mongodb import get_database, mongodb
+from database.mongodb import client_options, create_client, get_database, mongodb
+from settings import settings
 
 
 def test_get_database_raises_error_when_not_connected():
@@ -24,3 +25,33 @@ def test_mongodb_singleton_exists():
     """Test that mongodb singleton object exists and has expected attributes."""
     assert hasattr(mongodb, 'client')
     assert hasattr(mongodb, 'database')
+
+
+def test_client_options_leave_out_unset_settings(monkeypatch):
+    """Test that unset pool and timeout settings fall back to driver defaults."""
+    monkeypatch.setattr(settings, "MONGODB_MAX_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "MONGODB_SOCKET_TIMEOUT_MS", None)
+    monkeypatch.setattr(settings, "MONGODB_COMPRESSORS", [])
+
+    options = client_options()
+
+    assert options["maxPoolSize"] == 20
+    assert "socketTimeoutMS" not in options
+    assert "compressors" not in options
+
+
+async def test_create_client_applies_settings_and_overrides(monkeypatch):
+    """Test that clients are configured from settings, with overrides taking precedence."""
+    monkeypatch.setattr(settings, "MONGODB_MAX_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "MONGODB_MIN_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "MONGODB_WAIT_QUEUE_TIMEOUT_MS", 1_500)
+
+    # No connection is made until the first operation
+    client = create_client("mongodb://localhost:27017", maxPoolSize=5)
+    try:
+        pool_options = client.options.pool_options
+        assert pool_options.max_pool_size == 5
+        assert pool_options.min_pool_size == 2
+        assert pool_options.wait_queue_timeout == 1.5
+    finally:
+        await client.close()
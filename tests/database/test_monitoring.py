@@ -0,0 +1,213 @@
+"""
+Tests for MongoDB command monitoring.
+"""
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+import database.monitoring
+from database.monitoring import (
+    SHAPE_MAX_ITEMS,
+    CommandCounter,
+    CommandMetrics,
+    CommandTimer,
+    RequestRoundTrips,
+    command_counter,
+    command_metrics,
+    command_target,
+    current_round_trips,
+    query_shape,
+)
+from database.mongodb import get_database
+from main import MongoRoundTripMiddleware
+from settings import settings
+from timing import DB, RequestTimings, current_timings
+
+
+def command_events(command_name, command, duration_micros, request_id=1):
+    """Build the started and finished events of a command, as the driver reports them."""
+    started = SimpleNamespace(
+        command_name=command_name, command=command, connection_id=("db", 27017),
+        request_id=request_id)
+    finished = SimpleNamespace(
+        command_name=command_name, connection_id=("db", 27017), request_id=request_id,
+        duration_micros=duration_micros)
+    return started, finished
+
+
+def test_command_counter_starts_at_zero():
+    """Test that a new counter has not seen any commands."""
+    assert CommandCounter().total == 0
+
+
+async def test_command_counter_counts_round_trips(client):
+    """Test that every command sent through the app's client is counted."""
+    db = get_database()
+    before = command_counter.total
+
+    await db["products"].find_one({})
+    await db["products"].insert_one({"name": "Counted"})
+
+    assert command_counter.total - before == 2
+
+
+def test_command_counter_counts_for_the_request_in_context():
+    """Test that commands count towards the request in context as well as the total."""
+    counter = CommandCounter()
+    started, _ = command_events("find", {"find": "products"}, 1_000)
+    counter.started(started)
+
+    round_trips = RequestRoundTrips()
+    token = current_round_trips.set(round_trips)
+    try:
+        counter.started(started)
+        counter.started(started)
+    finally:
+        current_round_trips.reset(token)
+
+    assert (counter.total, round_trips.count) == (3, 2)
+
+
+async def test_round_trip_header_is_exact_for_overlapping_requests():
+    """Test that concurrent requests each report only the commands they started."""
+    counter = CommandCounter()
+    started, _ = command_events("find", {"find": "products"}, 1_000)
+    app = FastAPI()
+
+    @app.get("/commands/{count}")
+    async def run_commands(count: int) -> dict:
+        for _ in range(count):
+            counter.started(started)
+            # Let the other requests start their commands in between
+            await asyncio.sleep(0)
+        return {}
+
+    app.add_middleware(MongoRoundTripMiddleware)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        responses = await asyncio.gather(*(ac.get(f"/commands/{count}") for count in (1, 5, 3)))
+
+    assert [r.headers["X-Mongo-Round-Trips"] for r in responses] == ["1", "5", "3"]
+    assert counter.total == 9
+
+
+def test_query_shape_replaces_values():
+    """Test that shapes keep fields and operators but no values."""
+    query = {
+        "status": {"$in": ["draft", "sent"]},
+        "$or": [{"customer_email": "a@example.com"}, {"total_amount": {"$gt": 100}}],
+    }
+
+    assert query_shape(query) == {
+        "status": {"$in": "?"},
+        "$or": [{"customer_email": "?"}, {"total_amount": {"$gt": "?"}}],
+    }
+
+
+def test_command_target_reads_collection():
+    """Test that commands are attributed to their collection."""
+    assert command_target("find", {"find": "quotes"}) == "quotes"
+    assert command_target("getMore", {"getMore": 123, "collection": "quotes"}) == "quotes"
+    assert command_target("ping", {"ping": 1}) == ""
+
+
+def test_command_metrics_record_latency_and_failures():
+    """Test that durations are recorded per collection and command, and failures counted."""
+    listener = CommandMetrics(registry=[])
+    started, finished = command_events("find", {"find": "quotes", "filter": {}}, 2_000)
+    listener.started(started)
+    listener.succeeded(finished)
+    started, finished = command_events("find", {"find": "quotes", "filter": {}}, 4_000, 2)
+    listener.started(started)
+    listener.failed(finished)
+
+    histogram = listener.durations.labels("quotes", "find")
+    assert histogram.count == 2
+    assert histogram.sum == 0.006
+    assert listener.failures.value("quotes", "find") == 1
+
+
+def test_slow_commands_are_logged_with_query_shape(monkeypatch, caplog):
+    """Test that commands over the threshold are logged without their values."""
+    monkeypatch.setattr(settings, "MONGODB_SLOW_COMMAND_MS", 100.0)
+    listener = CommandMetrics(registry=[])
+    command = {"find": "quotes", "filter": {"customer_email": "a@example.com"}}
+
+    with caplog.at_level(logging.WARNING, logger="database.monitoring"):
+        for request_id, duration_micros in ((1, 99_000), (2, 150_000)):
+            started, finished = command_events("find", command, duration_micros, request_id)
+            listener.started(started)
+            listener.succeeded(finished)
+
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "find on quotes took 150.0 ms" in message
+    assert '{"filter": {"customer_email": "?"}}' in message
+    assert "a@example.com" not in message
+
+
+def test_abandoned_commands_are_dropped(monkeypatch):
+    """Test that commands cancelled without an end event are not kept past the socket timeout."""
+    monkeypatch.setattr(settings, "MONGODB_SOCKET_TIMEOUT_MS", 1_000)
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(database.monitoring, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    listener = CommandMetrics(registry=[])
+    cancelled, cancelled_end = command_events(
+        "getMore", {"getMore": 1, "collection": "quotes"}, 2_000_000, 1)
+    listener.started(cancelled)
+
+    clock.now = 2.0
+    started, finished = command_events("getMore", {"getMore": 2, "collection": "quotes"}, 1_000, 2)
+    listener.started(started)
+    listener.succeeded(finished)
+    listener.succeeded(cancelled_end)
+
+    assert listener.durations.labels("quotes", "getMore").count == 1
+    assert listener._in_flight == {}
+
+
+def test_slow_command_shape_keeps_the_first_statements(monkeypatch, caplog):
+    """Test that the shape of a long list of statements is bounded."""
+    monkeypatch.setattr(settings, "MONGODB_SLOW_COMMAND_MS", 100.0)
+    listener = CommandMetrics(registry=[])
+    updates = [{"q": {"_id": i}, "u": {"$set": {"price": i}}} for i in range(1_000)]
+    started, finished = command_events("update", {"update": "products", "updates": updates}, 150_000)
+
+    with caplog.at_level(logging.WARNING, logger="database.monitoring"):
+        listener.started(started)
+        listener.succeeded(finished)
+
+    message = caplog.records[0].getMessage()
+    assert message.count('"q"') == SHAPE_MAX_ITEMS
+
+
+async def test_command_metrics_observe_app_commands(client):
+    """Test that the app's client reports its commands to the metrics listener."""
+    histogram = command_metrics.durations.labels("products", "insert")
+    before = histogram.count
+
+    await get_database()["products"].insert_one({"name": "Measured"})
+
+    assert histogram.count == before + 1
+
+
+def test_command_timer_adds_durations_to_the_timed_request():
+    """Test that command durations add up in the timings of the request in context."""
+    listener = CommandTimer()
+    _, succeeded = command_events("find", {"find": "quotes"}, 2_000)
+    _, failed = command_events("insert", {"insert": "quotes"}, 500, 2)
+    # Outside a timed request there is nothing to record into
+    listener.succeeded(succeeded)
+
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        listener.succeeded(succeeded)
+        listener.failed(failed)
+    finally:
+        current_timings.reset(token)
+
+    assert timings.seconds[DB] == 0.0025
@@ -0,0 +1,393 @@
+"""
+Integration tests for the propagation outbox and worker.
+
+These tests use a real MongoDB connection (no mocking).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.mongodb import get_database
+from database.outbox import (
+    OUTBOX_COLLECTION,
+    STATUS_DONE,
+    STATUS_PENDING,
+    STATUS_PROCESSING,
+    claim_task,
+    drain_outbox,
+    enqueue_bulk_propagation,
+    enqueue_propagation,
+    enqueue_propagations,
+    get_outbox_stats,
+    process_task,
+)
+from settings import settings
+
+pytestmark = pytest.mark.usefixtures("no_coalesce_window")
+
+
+async def create_product(db, price=20.00, sku="MUL-001"):
+    """Insert a product and return its document."""
+    product = {
+        "name": "Premium Mulch",
+        "description": "Test",
+        "price": price,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": sku,
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+    }
+    result = await db["products"].insert_one(product)
+    product["_id"] = result.inserted_id
+    return product
+
+
+async def create_quotes(db, product, count, price):
+    """Insert quotes holding one line item for the product at the given price."""
+    quotes = [
+        {
+            "customer_name": f"Customer {i}",
+            "customer_email": f"customer{i}@example.com",
+            "status": "draft",
+            "line_items": [{
+                "product_id": str(product["_id"]),
+                "product_name": product["name"],
+                "product_price": price,
+                "product_unit": product["unit"],
+                "quantity": 2.0,
+                "line_total": 2.0 * price,
+            }],
+            "total_amount": 2.0 * price,
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
+        }
+        for i in range(count)
+    ]
+    result = await db["quotes"].insert_many(quotes)
+    return sorted(result.inserted_ids)
+
+
+async def test_enqueue_creates_pending_task(client):
+    """Test that enqueueing records a pending task for the product."""
+    db = get_database()
+    product = await create_product(db)
+
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+
+    task = await db[OUTBOX_COLLECTION].find_one({"_id": task_id})
+    assert task["product_id"] == str(product["_id"])
+    assert task["status"] == STATUS_PENDING
+    assert task["last_quote_id"] is None
+
+
+async def test_drain_propagates_in_chunks(client):
+    """Test that the worker rewrites every quote across several chunks."""
+    db = get_database()
+    product = await create_product(db, price=25.00)
+    await create_quotes(db, product, 5, price=20.00)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+
+    assert await drain_outbox(db, "worker-1", chunk_size=2) == 1
+
+    async for quote in db["quotes"].find():
+        assert quote["line_items"][0]["product_price"] == 25.00
+        assert quote["total_amount"] == 50.00
+
+    task = await db[OUTBOX_COLLECTION].find_one({"_id": task_id})
+    assert task["status"] == STATUS_DONE
+    assert task["quotes_modified"] == 5
+
+
+async def test_drain_resumes_from_checkpoint(client):
+    """Test that a task abandoned mid-way resumes after its last checkpoint."""
+    db = get_database()
+    product = await create_product(db, price=25.00)
+    quote_ids = await create_quotes(db, product, 4, price=20.00)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+
+    # Simulate a worker that checkpointed the first two quotes and then died
+    await db[OUTBOX_COLLECTION].update_one(
+        {"_id": task_id},
+        {"$set": {
+            "status": STATUS_PROCESSING,
+            "worker_id": "crashed-worker",
+            "last_quote_id": quote_ids[1],
+            "locked_until": datetime.now(timezone.utc) - timedelta(seconds=1),
+        }},
+    )
+
+    assert await drain_outbox(db, "worker-2", chunk_size=2) == 1
+
+    prices = []
+    for quote_id in quote_ids:
+        quote = await db["quotes"].find_one({"_id": quote_id})
+        prices.append(quote["line_items"][0]["product_price"])
+
+    # Quotes before the checkpoint are not visited again
+    assert prices == [20.00, 20.00, 25.00, 25.00]
+
+
+async def test_claim_skips_task_with_active_lease(client):
+    """Test that a task held by a live worker cannot be claimed by another."""
+    db = get_database()
+    product = await create_product(db)
+    await enqueue_propagation(db, str(product["_id"]))
+
+    assert await claim_task(db, "worker-1") is not None
+    assert await claim_task(db, "worker-2") is None
+
+
+async def test_process_stops_when_lease_is_lost(client):
+    """Test that a worker stops checkpointing once another worker took over."""
+    db = get_database()
+    product = await create_product(db, price=25.00)
+    await create_quotes(db, product, 3, price=20.00)
+    await enqueue_propagation(db, str(product["_id"]))
+
+    task = await claim_task(db, "worker-1")
+    await db[OUTBOX_COLLECTION].update_one(
+        {"_id": task["_id"]}, {"$set": {"worker_id": "worker-2"}}
+    )
+
+    assert await process_task(db, task, "worker-1", chunk_size=1) is False
+
+
+async def test_task_for_deleted_product_completes(client):
+    """Test that a task whose product no longer exists is marked done."""
+    db = get_database()
+    product = await create_product(db)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+    await db["products"].delete_one({"_id": product["_id"]})
+
+    assert await drain_outbox(db, "worker-1") == 1
+
+    task = await db[OUTBOX_COLLECTION].find_one({"_id": task_id})
+    assert task["status"] == STATUS_DONE
+    assert task["quotes_modified"] == 0
+
+
+async def test_enqueue_coalesces_pending_updates(client, monkeypatch):
+    """Test that repeated updates of a product merge into one pending task."""
+    monkeypatch.setattr(settings, "PROPAGATION_COALESCE_WINDOW_SECONDS", 60.0)
+    db = get_database()
+    product = await create_product(db)
+
+    first_id = await enqueue_propagation(db, str(product["_id"]))
+    second_id = await enqueue_propagation(db, str(product["_id"]))
+    third_id = await enqueue_propagation(db, str(product["_id"]))
+
+    assert first_id == second_id == third_id
+    assert await db[OUTBOX_COLLECTION].count_documents({}) == 1
+    task = await db[OUTBOX_COLLECTION].find_one({"_id": first_id})
+    assert task["update_count"] == 3
+
+
+async def test_pending_task_waits_for_coalescing_window(client, monkeypatch):
+    """Test that a pending task is not claimed before its window has passed."""
+    monkeypatch.setattr(settings, "PROPAGATION_COALESCE_WINDOW_SECONDS", 60.0)
+    db = get_database()
+    product = await create_product(db)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+
+    assert await claim_task(db, "worker-1") is None
+
+    await db[OUTBOX_COLLECTION].update_one(
+        {"_id": task_id},
+        {"$set": {"available_at": datetime.now(timezone.utc) - timedelta(seconds=1)}},
+    )
+    assert (await claim_task(db, "worker-1"))["_id"] == task_id
+
+
+async def test_pending_task_waits_for_other_processes_caches(client, monkeypatch):
+    """Test that a task runs no sooner than the cache TTL and margin after its latest update."""
+    monkeypatch.setattr(settings, "PRODUCT_CACHE_TTL_SECONDS", 60.0)
+    monkeypatch.setattr(settings, "PROPAGATION_WRITE_MARGIN_SECONDS", 10.0)
+    db = get_database()
+    product = await create_product(db)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+
+    # Other processes may still serve the old product, and build quotes
+    # from it, until their cache entries expire; entries filled between
+    # the enqueue and the product write expire up to the margin later
+    assert await claim_task(db, "worker-1") is None
+    task = await db[OUTBOX_COLLECTION].find_one({"_id": task_id})
+    assert task["available_at"] >= task["created_at"] + timedelta(seconds=69)
+
+    # A later update merged into the task pushes it back by the TTL again
+    await db[OUTBOX_COLLECTION].update_one(
+        {"_id": task_id},
+        {"$set": {"available_at": datetime.now(timezone.utc) - timedelta(seconds=1)}},
+    )
+    await enqueue_propagation(db, str(product["_id"]))
+    assert await claim_task(db, "worker-1") is None
+
+
+async def test_pending_task_delay_is_capped(client, monkeypatch):
+    """Test that merged updates push a task back no further than the maximum delay."""
+    monkeypatch.setattr(settings, "PRODUCT_CACHE_TTL_SECONDS", 60.0)
+    monkeypatch.setattr(settings, "PROPAGATION_MAX_DELAY_SECONDS", 60.0)
+    db = get_database()
+    product = await create_product(db)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+
+    # A product updated continuously since the task was created
+    await db[OUTBOX_COLLECTION].update_one(
+        {"_id": task_id},
+        {"$set": {"created_at": datetime.now(timezone.utc) - timedelta(seconds=61)}},
+    )
+    await enqueue_propagation(db, str(product["_id"]))
+
+    assert (await claim_task(db, "worker-1"))["_id"] == task_id
+
+
+async def test_task_run_before_settling_queues_follow_up(client, monkeypatch):
+    """Test that a task run at its maximum delay queues one pass after the cache TTL."""
+    monkeypatch.setattr(settings, "PRODUCT_CACHE_TTL_SECONDS", 60.0)
+    monkeypatch.setattr(settings, "PROPAGATION_MAX_DELAY_SECONDS", 60.0)
+    db = get_database()
+    product = await create_product(db)
+    task_id = await enqueue_propagation(db, str(product["_id"]))
+    await db[OUTBOX_COLLECTION].update_one(
+        {"_id": task_id},
+        {"$set": {"created_at": datetime.now(timezone.utc) - timedelta(seconds=61)}},
+    )
+    await enqueue_propagation(db, str(product["_id"]))
+    task = await claim_task(db, "worker-1")
+
+    assert await process_task(db, task, "worker-1")
+
+    follow_up = await db[OUTBOX_COLLECTION].find_one({"status": STATUS_PENDING})
+    assert follow_up["product_id"] == str(product["_id"])
+    assert follow_up["update_count"] == 0
+    assert follow_up["available_at"] == task["settled_at"]
+    assert await claim_task(db, "worker-1") is None
+
+
+async def test_settled_task_queues_no_follow_up(client):
+    """Test that a task run after it settled completes without another pass."""
+    db = get_database()
+    product = await create_product(db)
+    await enqueue_propagation(db, str(product["_id"]))
+
+    assert await drain_outbox(db, "worker-1") == 1
+    assert await db[OUTBOX_COLLECTION].count_documents({"status": STATUS_PENDING}) == 0
+
+
+async def test_coalesced_task_applies_latest_product_state(client):
+    """Test that one pass over quotes applies the product state at run time."""
+    db = get_database()
+    product = await create_product(db, price=20.00)
+    await create_quotes(db, product, 2, price=20.00)
+
+    for price in (21.00, 22.00, 23.00):
+        await db["products"].update_one(
+            {"_id": product["_id"]}, {"$set": {"price": price}})
+        await enqueue_propagation(db, str(product["_id"]))
+
+    assert await drain_outbox(db, "worker-1") == 1
+
+    async for quote in db["quotes"].find():
+        assert quote["line_items"][0]["product_price"] == 23.00
+
+
+async def test_update_during_processing_queues_new_task(client):
+    """Test that an update arriving while a task runs is not merged into it."""
+    db = get_database()
+    product = await create_product(db)
+    first_id = await enqueue_propagation(db, str(product["_id"]))
+    await claim_task(db, "worker-1")
+
+    second_id = await enqueue_propagation(db, str(product["_id"]))
+
+    assert second_id != first_id
+
+
+async def test_outbox_stats_report_passes_saved(client):
+    """Test that the stats count updates, passes and passes saved."""
+    db = get_database()
+    mulch = await create_product(db)
+    stone = await create_product(db, sku="STN-001")
+
+    for _ in range(3):
+        await enqueue_propagation(db, str(mulch["_id"]))
+    await enqueue_propagation(db, str(stone["_id"]))
+    await drain_outbox(db, "worker-1")
+
+    stats = await get_outbox_stats(db)
+
+    assert stats["done"] == 2
+    assert stats["pending"] == 0
+    assert stats["updates_received"] == 4
+    assert stats["passes"] == 2
+    assert stats["passes_saved"] == 2
+
+
+async def test_enqueue_propagations_coalesces_in_one_round_trip(client, command_recorder):
+    """Test bulk enqueueing creates or merges one pending task per product."""
+    db = get_database()
+    await enqueue_propagation(db, "product-a")
+
+    command_recorder.clear()
+    enqueued = await enqueue_propagations(db, ["product-a", "product-b", "product-b"])
+
+    assert enqueued == 2
+    assert command_recorder.count("update", OUTBOX_COLLECTION) == 1
+    tasks = {
+        task["product_id"]: task
+        async for task in db[OUTBOX_COLLECTION].find({"status": STATUS_PENDING})
+    }
+    assert set(tasks) == {"product-a", "product-b"}
+    assert tasks["product-a"]["update_count"] == 2
+    assert tasks["product-b"]["update_count"] == 1
+
+
+async def test_enqueue_propagations_with_no_products(client, command_recorder):
+    """Test nothing is written when no product changed."""
+    command_recorder.clear()
+
+    assert await enqueue_propagations(get_database(), []) == 0
+    assert command_recorder.commands == []
+
+
+async def test_enqueue_bulk_propagation_merges_into_one_task(client):
+    """Test bulk changes share one pending task listing every product."""
+    db = get_database()
+
+    first_id = await enqueue_bulk_propagation(db, ["product-a", "product-b"])
+    second_id = await enqueue_bulk_propagation(db, ["product-b", "product-c"])
+
+    assert first_id == second_id
+    task = await db[OUTBOX_COLLECTION].find_one({"_id": first_id})
+    assert task["product_id"] is None
+    assert task["product_ids"] == ["product-a", "product-b", "product-c"]
+    assert task["update_count"] == 4
+
+
+async def test_enqueue_bulk_propagation_with_no_products(client, command_recorder):
+    """Test nothing is written when no product changed."""
+    command_recorder.clear()
+
+    assert await enqueue_bulk_propagation(get_database(), []) is None
+    assert command_recorder.commands == []
+
+
+async def test_drain_propagates_bulk_task_in_chunks(client):
+    """Test a bulk task rewrites the quotes of all its products, chunk by chunk."""
+    db = get_database()
+    mulch = await create_product(db, price=25.00)
+    stone = await create_product(db, price=60.00, sku="STN-001")
+    mulch_quotes = await create_quotes(db, mulch, 3, price=20.00)
+    stone_quotes = await create_quotes(db, stone, 2, price=55.00)
+
+    await enqueue_bulk_propagation(db, [str(mulch["_id"]), str(stone["_id"])])
+    assert await drain_outbox(db, "worker-1", chunk_size=2) == 1
+
+    task = await db[OUTBOX_COLLECTION].find_one({})
+    assert task["status"] == STATUS_DONE
+    assert task["quotes_modified"] == 5
+    async for quote in db["quotes"].find({"_id": {"$in": mulch_quotes}}):
+        assert quote["total_amount"] == 50.00
+    async for quote in db["quotes"].find({"_id": {"$in": stone_quotes}}):
+        assert quote["total_amount"] == 120.00
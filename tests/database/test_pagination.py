@@ -0,0 +1,109 @@
+"""
+Tests for keyset pagination helpers.
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+from database.mongodb import get_database
+from database.pagination import (
+    ID_SORT,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    keyset_filter,
+    page_query,
+)
+
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes to the sort values it was built from."""
+    sort = (("created_at", DESCENDING), ("_id", ASCENDING))
+    # Documents read from MongoDB carry naive UTC datetimes
+    document = {"_id": ObjectId(), "created_at": datetime(2024, 1, 15, 10, 30)}
+
+    values = decode_cursor(sort, encode_cursor(sort, document))
+
+    assert values[0] == document["created_at"]
+    assert values[1] == document["_id"]
+
+
+def test_decode_cursor_rejects_garbage():
+    """Test that malformed cursor tokens raise ValueError."""
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(ID_SORT, "not-a-cursor")
+
+
+def test_decode_cursor_rejects_cursor_for_other_sort():
+    """Test that a cursor issued for one sort cannot be used with another."""
+    sort = (("price", ASCENDING), ("_id", ASCENDING))
+    token = encode_cursor(sort, {"_id": ObjectId(), "price": 10.0})
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(ID_SORT, token)
+
+
+def test_keyset_filter_on_id():
+    """Test that an _id-only sort continues strictly after the last _id."""
+    last_id = ObjectId()
+
+    assert keyset_filter(ID_SORT, [last_id]) == {"_id": {"$gt": last_id}}
+
+
+def test_keyset_filter_on_compound_sort():
+    """Test that ties on the first sort field are broken by _id."""
+    last_id = ObjectId()
+    sort = (("price", DESCENDING), ("_id", DESCENDING))
+
+    assert keyset_filter(sort, [10.0, last_id]) == {
+        "$or": [
+            {"price": {"$lt": 10.0}},
+            {"price": 10.0, "_id": {"$lt": last_id}},
+        ]
+    }
+
+
+def test_page_query_combines_filter_and_cursor():
+    """Test that the listing filter is kept alongside the keyset condition."""
+    last_id = ObjectId()
+    token = encode_cursor(ID_SORT, {"_id": last_id})
+
+    assert page_query({}, ID_SORT, None) == {}
+    assert page_query({"category": "Mulch"}, ID_SORT, token) == {
+        "$and": [{"category": "Mulch"}, {"_id": {"$gt": last_id}}]
+    }
+
+
+async def test_fetch_page_walks_collection(client):
+    """Test that following next cursors visits every document exactly once."""
+    db = get_database()
+    await db["products"].insert_many([{"name": f"Product {i}"} for i in range(5)])
+
+    names, after, pages = [], None, 0
+    while True:
+        query = page_query({}, ID_SORT, after)
+        documents, after = await fetch_page(db["products"], query, ID_SORT, 2)
+        names.extend(doc["name"] for doc in documents)
+        pages += 1
+        if after is None:
+            break
+
+    assert names == [f"Product {i}" for i in range(5)]
+    assert pages == 3
+
+
+async def test_fetch_page_reads_sort_fields_outside_projection(client):
+    """Test that sort fields not projected still yield a cursor but are not returned."""
+    db = get_database()
+    await db["products"].insert_many(
+        [{"name": f"Product {i}", "price": float(i)} for i in range(3)])
+    sort = (("price", DESCENDING), ("_id", DESCENDING))
+
+    documents, after = await fetch_page(
+        db["products"], {}, sort, 2, projection={"_id": 1, "name": 1})
+
+    assert [doc["name"] for doc in documents] == ["Product 2", "Product 1"]
+    assert all(set(doc) == {"_id", "name"} for doc in documents)
+    assert decode_cursor(sort, after)[0] == 1.0
@@ -0,0 +1,151 @@
+"""
+Tests for the in-process product cache.
+
+The read-through tests use a real MongoDB connection (no mocking).
+"""
+from bson import ObjectId
+
+from database.mongodb import get_database
+from database.product_cache import ProductCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_counts_hits_and_misses():
+    """Test that lookups count a hit for cached products and a miss otherwise."""
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+    cache.put("a", {"name": "Mulch"})
+
+    assert cache.get("a") == {"name": "Mulch"}
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl():
+    """Test that entries are no longer served once their TTL has passed."""
+    clock = FakeClock()
+    cache = ProductCache(max_size=10, ttl_seconds=60, clock=clock)
+    cache.put("a", {"name": "Mulch"})
+
+    clock.now = 59.0
+    assert cache.get("a") is not None
+
+    clock.now = 60.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Test that a full cache evicts the entry used least recently."""
+    cache = ProductCache(max_size=2, ttl_seconds=60)
+    cache.put("a", {"name": "A"})
+    cache.put("b", {"name": "B"})
+    cache.get("a")
+
+    cache.put("c", {"name": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_zero_size_disables_caching():
+    """Test that a cache with no room stores nothing."""
+    cache = ProductCache(max_size=0, ttl_seconds=60)
+    cache.put("a", {"name": "A"})
+
+    assert cache.get("a") is None
+
+
+def test_invalidate_drops_entry():
+    """Test that an invalidated product is read again."""
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+    cache.put("a", {"name": "A"})
+
+    cache.invalidate("a")
+
+    assert cache.get("a") is None
+
+
+def test_sku_index_follows_cached_entries():
+    """Test that products are found by SKU only while they are cached."""
+    cache = ProductCache(max_size=1, ttl_seconds=60)
+    cache.put("a", {"name": "A", "sku": "SKU-A"})
+    assert cache._skus == {"SKU-A": "a"}
+
+    cache.put("a", {"name": "A", "sku": "SKU-B"})
+    assert cache._skus == {"SKU-B": "a"}
+
+    cache.put("b", {"name": "B", "sku": "SKU-C"})
+    assert cache._skus == {"SKU-C": "b"}
+
+    cache.invalidate("b")
+    assert cache._skus == {}
+
+
+async def test_get_by_sku_reads_through_cache(client, command_recorder):
+    """Test that a product read by SKU is then served from the cache, by SKU or ID."""
+    db = get_database()
+    result = await db["products"].insert_one({"name": "Mulch", "sku": "MUL-001"})
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+
+    command_recorder.clear()
+    first = await cache.get_by_sku(db["products"], "MUL-001")
+    second = await cache.get_by_sku(db["products"], "MUL-001")
+
+    assert first["_id"] == second["_id"] == result.inserted_id
+    assert await cache.get_one(db["products"], result.inserted_id) is first
+    assert command_recorder.count("find", "products") == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+async def test_get_by_sku_returns_none_for_unknown_sku(client):
+    """Test that an unknown SKU returns None and caches nothing."""
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+
+    assert await cache.get_by_sku(get_database()["products"], "MISSING") is None
+    assert len(cache) == 0
+
+
+async def test_get_many_reads_only_uncached_products(client, command_recorder):
+    """Test that only products missing from the cache are queried, in one find."""
+    db = get_database()
+    result = await db["products"].insert_many(
+        [{"name": f"Product {i}", "price": 10.00, "unit": "yard"} for i in range(3)])
+    product_ids = result.inserted_ids
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+
+    command_recorder.clear()
+    first = await cache.get_many(db["products"], product_ids[:2])
+    second = await cache.get_many(db["products"], product_ids)
+
+    assert set(first) == {str(product_id) for product_id in product_ids[:2]}
+    assert set(second) == {str(product_id) for product_id in product_ids}
+    assert command_recorder.count("find", "products") == 2
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+async def test_get_many_leaves_out_missing_products(client):
+    """Test that products that do not exist are neither returned nor cached."""
+    db = get_database()
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+
+    products = await cache.get_many(db["products"], [ObjectId()])
+
+    assert products == {}
+    assert len(cache) == 0
+
+
+async def test_get_one_returns_none_for_missing_product(client):
+    """Test that reading one unknown product returns None."""
+    cache = ProductCache(max_size=10, ttl_seconds=60)
+
+    assert await cache.get_one(get_database()["products"], ObjectId()) is None
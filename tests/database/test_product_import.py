@@ -0,0 +1,129 @@
+"""
+Integration tests for bulk product import writes.
+
+These tests use a real MongoDB connection (no mocking).
+"""
+from database.mongodb import get_database
+from database.outbox import OUTBOX_COLLECTION
+from database.product_import import insert_products, upsert_products
+
+
+def make_row(row_number, sku, price=20.00, **fields):
+    """Build a validated import row."""
+    return row_number, {
+        "name": f"Product {sku}",
+        "description": None,
+        "price": price,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": sku,
+        **fields,
+    }
+
+
+async def test_insert_products_writes_batch(client, command_recorder):
+    """Test a batch is inserted with one insert command and timestamps."""
+    db = get_database()
+
+    command_recorder.clear()
+    counts, errors = await insert_products(db, [make_row(1, "A"), make_row(2, "B")])
+
+    assert counts == {"inserted": 2, "updated": 0, "unchanged": 0}
+    assert errors == []
+    assert command_recorder.count("insert", "products") == 1
+    product = await db["products"].find_one({"sku": "A"})
+    assert product["created_at"] == product["updated_at"]
+
+
+async def test_upsert_products_inserts_and_updates_by_sku(client):
+    """Test upserting creates new SKUs and updates existing ones in place."""
+    db = get_database()
+    await insert_products(db, [make_row(1, "A", price=20.00)])
+    existing = await db["products"].find_one({"sku": "A"})
+
+    counts, errors = await upsert_products(
+        db, [make_row(1, "A", price=25.00), make_row(2, "B")])
+
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 0}
+    assert errors == []
+    updated = await db["products"].find_one({"sku": "A"})
+    assert updated["_id"] == existing["_id"]
+    assert updated["price"] == 25.00
+    assert updated["created_at"] == existing["created_at"]
+    assert await db["products"].count_documents({}) == 2
+
+
+async def test_upsert_products_queues_propagation_only_for_embedded_changes(client):
+    """Test propagation is queued for price changes but not description changes."""
+    db = get_database()
+    await insert_products(db, [make_row(1, "A"), make_row(2, "B")])
+    product_a = await db["products"].find_one({"sku": "A"})
+
+    await upsert_products(db, [
+        make_row(1, "A", price=30.00),
+        make_row(2, "B", description="Now described"),
+    ])
+
+    tasks = [task async for task in db[OUTBOX_COLLECTION].find()]
+    assert [task["product_id"] for task in tasks] == [str(product_a["_id"])]
+
+
+async def test_upsert_products_repeated_sku_in_batch(client):
+    """Test a SKU repeated within a batch creates one product holding the last row."""
+    db = get_database()
+
+    counts, errors = await upsert_products(
+        db, [make_row(1, "A", price=20.00), make_row(2, "A", price=22.00)])
+
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 0}
+    products = [product async for product in db["products"].find({"sku": "A"})]
+    assert len(products) == 1
+    assert products[0]["price"] == 22.00
+
+
+async def test_diff_skips_unchanged_rows(client, command_recorder):
+    """Test re-sending an identical catalog writes nothing."""
+    db = get_database()
+    rows = [make_row(1, "A"), make_row(2, "B")]
+    await insert_products(db, rows)
+
+    command_recorder.clear()
+    counts, errors = await upsert_products(db, rows, skip_unchanged=True)
+
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 2}
+    assert errors == []
+    assert command_recorder.count("update", "products") == 0
+    assert command_recorder.count("update", OUTBOX_COLLECTION) == 0
+
+
+async def test_diff_updates_changed_rows(client):
+    """Test a row differing from its product in one field updates it."""
+    db = get_database()
+    await insert_products(db, [make_row(1, "A")])
+
+    counts, _ = await upsert_products(
+        db, [make_row(1, "A", description="Described")], skip_unchanged=True)
+
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": 0}
+    product = await db["products"].find_one({"sku": "A"})
+    assert product["description"] == "Described"
+    assert product["updated_at"] > product["created_at"]
+
+
+async def test_diff_queues_propagation_only_for_embedded_changes(client):
+    """Test only rows changing name, price or unit queue propagation."""
+    db = get_database()
+    await insert_products(db, [make_row(1, "A"), make_row(2, "B"), make_row(3, "C")])
+    product_b = await db["products"].find_one({"sku": "B"})
+
+    counts, _ = await upsert_products(db, [
+        make_row(1, "A", category="Stone"),
+        make_row(2, "B", unit="ton"),
+        make_row(3, "C"),
+        make_row(4, "D"),
+    ], skip_unchanged=True)
+
+    assert counts == {"inserted": 1, "updated": 2, "unchanged": 1}
+    tasks = [task async for task in db[OUTBOX_COLLECTION].find()]
+    assert [task["product_id"] for task in tasks] == [str(product_b["_id"])]
@@ -0,0 +1,235 @@
+"""
+Integration tests for propagating product changes into quotes.
+
+These tests use a real MongoDB connection (no mocking).
+"""
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from database.mongodb import get_database
+from database.propagation import (
+    build_products_propagation_pipeline,
+    build_propagation_pipeline,
+    denormalized_fields_changed,
+    propagate_product_to_quotes,
+    propagate_products_to_quotes,
+)
+
+
+def make_product(**overrides):
+    """Build a product document as stored in the products collection."""
+    product = {
+        "_id": ObjectId(),
+        "name": "Premium Mulch",
+        "price": 40.00,
+        "unit": "yard",
+    }
+    product.update(overrides)
+    return product
+
+
+def make_line_item(product, quantity, price=None, name=None):
+    """Build a denormalized line item for a product."""
+    price = product["price"] if price is None else price
+    return {
+        "product_id": str(product["_id"]),
+        "product_name": name or product["name"],
+        "product_price": price,
+        "product_unit": product["unit"],
+        "quantity": quantity,
+        "line_total": quantity * price,
+    }
+
+
+def make_quote(line_items):
+    """Build a quote document holding the given line items."""
+    return {
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "status": "draft",
+        "line_items": line_items,
+        "total_amount": sum(item["line_total"] for item in line_items),
+        "created_at": datetime.now(timezone.utc),
+        "updated_at": datetime.now(timezone.utc),
+    }
+
+
+async def test_propagate_rewrites_line_items_and_totals(client):
+    """Test that matching line items and the quote total are recomputed."""
+    db = get_database()
+    mulch = make_product()
+    stone = make_product(name="River Rock", price=65.00, unit="ton")
+
+    stale_mulch = make_line_item(mulch, 10.0, price=35.50, name="Old Mulch")
+    result = await db["quotes"].insert_one(
+        make_quote([stale_mulch, make_line_item(stone, 2.0)])
+    )
+
+    modified = await propagate_product_to_quotes(db, mulch)
+
+    assert modified == 1
+    quote = await db["quotes"].find_one({"_id": result.inserted_id})
+
+    mulch_item, stone_item = quote["line_items"]
+    assert mulch_item["product_name"] == "Premium Mulch"
+    assert mulch_item["product_price"] == 40.00
+    assert mulch_item["quantity"] == 10.0
+    assert mulch_item["line_total"] == 400.00
+
+    # Line items for other products are left as they were
+    assert stone_item["product_name"] == "River Rock"
+    assert stone_item["line_total"] == 130.00
+
+    assert quote["total_amount"] == 530.00
+
+
+async def test_propagate_updates_repeated_line_items(client):
+    """Test that every line item for the product is rewritten, not just the first."""
+    db = get_database()
+    mulch = make_product(price=10.00)
+
+    result = await db["quotes"].insert_one(make_quote([
+        make_line_item(mulch, 1.0, price=5.00),
+        make_line_item(mulch, 3.0, price=5.00),
+    ]))
+
+    await propagate_product_to_quotes(db, mulch)
+
+    quote = await db["quotes"].find_one({"_id": result.inserted_id})
+    assert [item["line_total"] for item in quote["line_items"]] == [10.00, 30.00]
+    assert quote["total_amount"] == 40.00
+
+
+async def test_propagate_skips_up_to_date_quotes(client):
+    """Test that quotes already carrying the current product state are not modified."""
+    db = get_database()
+    mulch = make_product()
+
+    await db["quotes"].insert_one(make_quote([make_line_item(mulch, 1.0)]))
+    await db["quotes"].insert_one(
+        make_quote([make_line_item(mulch, 1.0, price=30.00)]))
+
+    assert await propagate_product_to_quotes(db, mulch) == 1
+    assert await propagate_product_to_quotes(db, mulch) == 0
+
+
+async def test_propagate_ignores_unrelated_quotes(client):
+    """Test that quotes without the product are not modified."""
+    db = get_database()
+    mulch = make_product()
+    stone = make_product(name="River Rock", price=65.00, unit="ton")
+
+    await db["quotes"].insert_one(
+        make_quote([make_line_item(stone, 1.0, price=60.00)]))
+
+    assert await propagate_product_to_quotes(db, mulch) == 0
+
+
+def test_pipeline_treats_product_values_as_literals():
+    """Test that values beginning with '$' are not interpreted as field paths."""
+    product = make_product(name="$5 Bag Special")
+
+    pipeline = build_propagation_pipeline(product)
+
+    merged = pipeline[0]["$set"]["line_items"]["$map"]["in"]["$cond"][1]["$mergeObjects"][1]
+    assert merged["product_name"] == {"$literal": "$5 Bag Special"}
+
+
+def test_denormalized_fields_changed_detects_embedded_changes():
+    """Test that a changed name, price or unit requires propagation."""
+    product = make_product()
+
+    assert denormalized_fields_changed(product, {**product, "name": "New Name"})
+    assert denormalized_fields_changed(product, {**product, "price": 41.00})
+    assert denormalized_fields_changed(product, {**product, "unit": "bag"})
+
+
+def test_denormalized_fields_changed_ignores_other_fields():
+    """Test that changes to fields quotes do not embed need no propagation."""
+    product = make_product(supplier_name="Supplier", category="Mulch", sku="MUL-001")
+    updated = {**product, "supplier_name": "Other", "category": "Bark",
+               "sku": "BRK-001", "description": "New"}
+
+    assert not denormalized_fields_changed(product, updated)
+    assert not denormalized_fields_changed(product, dict(product))
+
+
+async def test_propagate_leaves_closed_quotes_untouched(client):
+    """Test that accepted and rejected quotes keep their committed pricing."""
+    db = get_database()
+    mulch = make_product()
+    stale_item = make_line_item(mulch, 2.0, price=30.00)
+
+    quote_ids = {}
+    for quote_status in ("draft", "sent", "accepted", "rejected"):
+        result = await db["quotes"].insert_one(
+            {**make_quote([stale_item]), "status": quote_status})
+        quote_ids[quote_status] = result.inserted_id
+
+    assert await propagate_product_to_quotes(db, mulch) == 2
+
+    for quote_status, expected_price in (
+        ("draft", 40.00), ("sent", 40.00), ("accepted", 30.00), ("rejected", 30.00)
+    ):
+        quote = await db["quotes"].find_one({"_id": quote_ids[quote_status]})
+        assert quote["line_items"][0]["product_price"] == expected_price
+
+
+async def test_propagate_products_rewrites_each_product_in_one_pass(client):
+    """Test several products are propagated together, each to its own line items."""
+    db = get_database()
+    mulch = make_product()
+    stone = make_product(name="River Rock", price=65.00, unit="ton")
+    soil = make_product(name="Topsoil", price=30.00)
+
+    both = await db["quotes"].insert_one(make_quote([
+        make_line_item(mulch, 2.0, price=35.00),
+        make_line_item(soil, 1.0),
+        make_line_item(stone, 1.0, price=60.00),
+    ]))
+    stone_only = await db["quotes"].insert_one(
+        make_quote([make_line_item(stone, 2.0, price=60.00)]))
+
+    assert await propagate_products_to_quotes(db, [mulch, stone]) == 2
+
+    quote = await db["quotes"].find_one({"_id": both.inserted_id})
+    assert [item["line_total"] for item in quote["line_items"]] == [80.00, 30.00, 65.00]
+    assert quote["total_amount"] == 175.00
+    quote = await db["quotes"].find_one({"_id": stone_only.inserted_id})
+    assert quote["total_amount"] == 130.00
+
+
+async def test_propagate_products_skips_up_to_date_quotes(client):
+    """Test quotes already carrying every product's current state are not modified."""
+    db = get_database()
+    mulch = make_product()
+    stone = make_product(name="River Rock", price=65.00, unit="ton")
+
+    up_to_date = await db["quotes"].insert_one(
+        make_quote([make_line_item(mulch, 1.0), make_line_item(stone, 1.0)]))
+    before = await db["quotes"].find_one({"_id": up_to_date.inserted_id})
+    await db["quotes"].insert_one(make_quote([
+        make_line_item(mulch, 1.0),
+        make_line_item(stone, 1.0, price=60.00),
+    ]))
+
+    assert await propagate_products_to_quotes(db, [mulch, stone]) == 1
+    assert await propagate_products_to_quotes(db, [mulch, stone]) == 0
+    assert await db["quotes"].find_one({"_id": up_to_date.inserted_id}) == before
+
+
+async def test_propagate_products_with_no_products(client):
+    """Test an empty product list modifies nothing."""
+    assert await propagate_products_to_quotes(get_database(), []) == 0
+
+
+def test_products_pipeline_treats_product_values_as_literals():
+    """Test that values beginning with '$' are not interpreted as field paths."""
+    product = make_product(name="$5 Bag Special")
+
+    pipeline = build_products_propagation_pipeline([product])
+
+    lookup = pipeline[0]["$set"]["line_items"]["$map"]["in"]["$let"]
+    states = lookup["in"]["$cond"][2]["$let"]["vars"]["product"]["$arrayElemAt"][0]
+    assert states == {"$literal": [{"name": "$5 Bag Special", "price": 40.00, "unit": "yard"}]}
@@ -5,7 +5,7 @@ import pytest
 from datetime import datetime, timezone
 from pydantic import ValidationError
 
-from models.product import ProductBase, ProductCreate, ProductUpdate, Product
+from models.product import PriceAdjustment, ProductBase, ProductCreate, ProductUpdate, Product
 
 
 def test_product_create_valid():
@@ -66,6 +66,14 @@ def test_product_update_all_fields_optional():
     assert update2.price is None
 
 
+def test_product_update_rejects_null_sku():
+    """Test that ProductUpdate refuses to clear the SKU."""
+    assert ProductUpdate(price=30.00).sku is None
+
+    with pytest.raises(ValidationError):
+        ProductUpdate(sku=None)
+
+
 def test_product_model_with_id_and_timestamps():
     """Test that Product model includes MongoDB _id and timestamps."""
     product_data = {
@@ -102,3 +110,19 @@ def test_product_model_accepts_id_alias():
     }
     product = Product(**product_data)
     assert product.id == "507f1f77bcf86cd799439011"
+
+
+def test_price_adjustment_accepts_percent_or_amount():
+    """Test a rule with a selector and one kind of change is valid."""
+    assert PriceAdjustment(supplier_name="Stone Works", percent=6).percent == 6
+    assert PriceAdjustment(category="Mulch", amount=2).amount == 2
+
+
+def test_price_adjustment_requires_one_change_and_a_selector():
+    """Test rules without a selector, or with zero or two changes, are rejected."""
+    with pytest.raises(ValidationError, match="supplier_name or category"):
+        PriceAdjustment(percent=6)
+    with pytest.raises(ValidationError, match="Exactly one"):
+        PriceAdjustment(category="Mulch")
+    with pytest.raises(ValidationError, match="Exactly one"):
+        PriceAdjustment(category="Mulch", percent=6, amount=2)
@@ -5,7 +5,7 @@ import pytest
 from datetime import datetime, timezone
 from pydantic import ValidationError
 
-from models.quote import QuoteLineItem, QuoteLineItemCreate, QuoteBase, QuoteCreate, Quote
+from models.quote import QuoteLineItem, QuoteLineItemCreate, QuoteBase, QuoteCreate, Quote, QuotePartial
 
 
 def test_quote_line_item_valid():
@@ -134,3 +134,14 @@ def test_quote_denormalized_structure():
     assert hasattr(line_item, 'product_name')
     assert hasattr(line_item, 'product_price')
     assert hasattr(line_item, 'product_unit')
+
+
+def test_quote_partial_accepts_subset_of_fields():
+    """Test that a partial quote needs only the ID."""
+    quote = QuotePartial(_id="507f1f77bcf86cd799439012", status="sent", total_amount=355.00)
+
+    assert quote.status == "sent"
+    assert quote.line_items is None
+    assert quote.model_dump(by_alias=True, exclude_unset=True) == {
+        "_id": "507f1f77bcf86cd799439012", "status": "sent", "total_amount": 355.00,
+    }
@@ -0,0 +1,109 @@
+"""
+Tests for the metrics primitives and the /metrics endpoint.
+"""
+from fastapi.testclient import TestClient
+
+from main import (
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_FLIGHT,
+    UNMATCHED_ROUTE,
+    app,
+)
+from metrics import CounterFamily, GaugeFamily, HistogramFamily, render_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that observations land in the first bucket bounding them, cumulatively."""
+    registry = []
+    family = HistogramFamily("latency_seconds", "Latency.", ("route",),
+                             buckets=(0.1, 1.0), registry=registry)
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        family.labels("/quotes").observe(value)
+
+    assert render_metrics(registry).splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/quotes",le="0.1"} 2',
+        'latency_seconds_bucket{route="/quotes",le="1"} 3',
+        'latency_seconds_bucket{route="/quotes",le="+Inf"} 4',
+        'latency_seconds_sum{route="/quotes"} 3.65',
+        'latency_seconds_count{route="/quotes"} 4',
+    ]
+
+
+def test_counter_and_gauge_render_one_line_per_series():
+    """Test that counters and gauges render each label combination, sorted."""
+    registry = []
+    requests = CounterFamily("requests_total", "Requests.", ("method",), registry=registry)
+    in_flight = GaugeFamily("in_flight", "In flight.", registry=registry)
+
+    requests.inc("POST")
+    requests.inc("GET", amount=2)
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    lines = render_metrics(registry).splitlines()
+    assert lines[2:4] == ['requests_total{method="GET"} 2', 'requests_total{method="POST"} 1']
+    assert lines[-1] == "in_flight 1"
+
+
+def test_label_values_are_escaped():
+    """Test that quotes, backslashes and newlines in label values are escaped."""
+    registry = []
+    family = CounterFamily("errors_total", "Errors.", ("message",), registry=registry)
+
+    family.inc('a "b"\\\n')
+
+    assert render_metrics(registry).splitlines()[-1] == 'errors_total{message="a \\"b\\"\\\\\\n"} 1'
+
+
+async def test_metrics_endpoint_serves_text_format(client):
+    """Test GET /metrics reports MongoDB command latencies in the text format."""
+    await client.get("/products/")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE mongodb_command_duration_seconds histogram" in response.text
+    assert 'mongodb_command_duration_seconds_count{collection="products",command="find"}' \
+        in response.text
+
+
+def test_http_metrics_label_requests_by_route_template():
+    """Test that requests are counted and timed per route template and status class."""
+    client = TestClient(app)
+    before = HTTP_REQUESTS.value("GET", "/health", "2xx")
+    observed = HTTP_REQUEST_DURATION.labels("GET", "/health").count
+
+    client.get("/health")
+
+    assert HTTP_REQUESTS.value("GET", "/health", "2xx") == before + 1
+    assert HTTP_REQUEST_DURATION.labels("GET", "/health").count == observed + 1
+    assert HTTP_REQUESTS_IN_FLIGHT.value() == 0
+
+
+def test_http_metrics_do_not_label_unmatched_paths():
+    """Test that requests matching no route share one label instead of their path."""
+    client = TestClient(app)
+    before = HTTP_REQUESTS.value("GET", UNMATCHED_ROUTE, "4xx")
+
+    client.get("/no-such-page/12345")
+
+    assert HTTP_REQUESTS.value("GET", UNMATCHED_ROUTE, "4xx") == before + 1
+    assert "/no-such-page" not in client.get("/metrics").text
+
+
+async def test_http_metrics_use_path_templates(client):
+    """Test that requests for different IDs are recorded under one template."""
+    before = HTTP_REQUESTS.value("GET", "/quotes/{quote_id}", "4xx")
+
+    await client.get("/quotes/not-an-id")
+    await client.get("/quotes/507f1f77bcf86cd799439011")
+
+    assert HTTP_REQUESTS.value("GET", "/quotes/{quote_id}", "4xx") == before + 2
+    metrics = (await client.get("/metrics")).text
+    assert 'http_request_duration_seconds_count{method="GET",route="/quotes/{quote_id}"}' in metrics
@@ -0,0 +1,96 @@
+"""
+Unit tests for NDJSON streaming of listings.
+"""
+import asyncio
+import json
+
+from routes.ndjson import DOCUMENTS_PER_CHUNK, ndjson_response
+
+
+class FakeCursor:
+    """Cursor yielding numbered documents, each fetch and the close taking a round trip."""
+
+    def __init__(self, count=None):
+        self.count = count
+        self.fetched = 0
+        self.close_started = False
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        if self.count is not None and self.fetched == self.count:
+            raise StopAsyncIteration
+        self.fetched += 1
+        return {"n": self.fetched}
+
+    async def close(self):
+        self.close_started = True
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+async def stream(cursor, send, disconnected):
+    """Run an NDJSON response over a cursor, the client disconnecting once the event is set."""
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    # The response is returned, so its stream is not closed by being
+    # garbage collected
+    response = ndjson_response(cursor)
+    scope = {"type": "http", "asgi": {"spec_version": "2.0"}}
+    await response(scope, receive, send)
+    return response
+
+
+async def test_ndjson_streams_every_document_and_closes_cursor():
+    """Test that a complete stream writes one line per document and closes the cursor."""
+    cursor = FakeCursor(count=DOCUMENTS_PER_CHUNK + 1)
+    body = []
+
+    async def send(message):
+        body.append(message.get("body", b""))
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    await ndjson_response(cursor)(scope, None, send)
+
+    lines = b"".join(body).splitlines()
+    assert [json.loads(line)["n"] for line in lines] == list(range(1, DOCUMENTS_PER_CHUNK + 2))
+    assert cursor.closed
+
+
+async def test_ndjson_closes_cursor_when_client_disconnects_while_fetching():
+    """Test that a disconnect cancelling a fetch still lets the cursor close finish."""
+    cursor = FakeCursor()
+    disconnected = asyncio.Event()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            disconnected.set()
+
+    response = await stream(cursor, send, disconnected)
+
+    assert response.body_iterator is not None
+    assert cursor.fetched < 10 * DOCUMENTS_PER_CHUNK
+    assert cursor.closed
+
+
+async def test_ndjson_closes_cursor_when_client_disconnects_while_sending():
+    """Test that a disconnect cancelling a write closes the suspended stream's cursor."""
+    cursor = FakeCursor()
+    disconnected = asyncio.Event()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            # The client goes away; the write never completes
+            disconnected.set()
+            await asyncio.Event().wait()
+
+    response = await stream(cursor, send, disconnected)
+
+    assert response.body_iterator is not None
+    assert cursor.fetched == DOCUMENTS_PER_CHUNK
+    assert cursor.closed
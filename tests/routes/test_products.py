@@ -4,6 +4,14 @@ Integration tests for Product routes.
 These tests use a real MongoDB connection (no mocking) and test the
 pre-implemented CRUD endpoints.
 """
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from database.mongodb import get_database
+from database.outbox import OUTBOX_COLLECTION, drain_outbox
+from settings import settings
 
 
 async def test_create_product(client):
@@ -248,3 +256,891 @@ async def test_update_product_validation_error(client):
     response = await client.patch(f"/products/{product_id}", json=update_data)
 
     assert response.status_code == 422  # Validation error
+
+
+async def test_update_product_propagates_to_quotes(client, no_coalesce_window):
+    """Test PATCH /products/{id} queues propagation that rewrites existing quotes."""
+    # Create a product
+    product_data = {
+        "name": "Original Mulch",
+        "description": "Test",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    # Create a quote referencing the product
+    quote_data = {
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 4.0}]
+    }
+    quote_response = await client.post("/quotes/", json=quote_data)
+    quote_id = quote_response.json()["_id"]
+
+    # Update the product
+    update_data = {"name": "Renamed Mulch", "price": 25.00, "unit": "bag"}
+    response = await client.patch(f"/products/{product_id}", json=update_data)
+    assert response.status_code == 200
+
+    # Run the propagation worker over the queued task
+    assert await drain_outbox(get_database(), "test-worker") == 1
+
+    # Verify the quote carries the new product data and totals
+    quote = (await client.get(f"/quotes/{quote_id}")).json()
+    line_item = quote["line_items"][0]
+
+    assert line_item["product_name"] == "Renamed Mulch"
+    assert line_item["product_price"] == 25.00
+    assert line_item["product_unit"] == "bag"
+    assert line_item["line_total"] == 100.00  # 4.0 * 25.00
+    assert quote["total_amount"] == 100.00
+
+
+async def test_update_product_skips_propagation_for_non_embedded_fields(client):
+    """Test PATCH /products/{id} does not queue propagation for fields quotes don't embed."""
+    product_data = {
+        "name": "Test Mulch",
+        "description": "Test",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    update_data = {
+        "description": "New description",
+        "supplier_name": "New Supplier",
+        "category": "Bark",
+        "sku": "BRK-001"
+    }
+    response = await client.patch(f"/products/{product_id}", json=update_data)
+
+    assert response.status_code == 200
+    assert response.json()["propagation_triggered"] is False
+    assert await get_database()["outbox"].count_documents({}) == 0
+
+
+async def test_update_product_skips_propagation_for_unchanged_values(client):
+    """Test PATCH /products/{id} does not queue propagation when embedded values stay the same."""
+    product_data = {
+        "name": "Test Mulch",
+        "description": "Test",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    update_data = {"name": "Test Mulch", "price": 20.00, "unit": "yard"}
+    response = await client.patch(f"/products/{product_id}", json=update_data)
+
+    assert response.status_code == 200
+    assert response.json()["propagation_triggered"] is False
+    assert await get_database()["outbox"].count_documents({}) == 0
+
+
+async def test_update_missing_product_queues_no_propagation(client):
+    """Test PATCH of a missing product returns 404 without queueing propagation."""
+    response = await client.patch(
+        "/products/507f1f77bcf86cd799439011", json={"price": 21.00})
+
+    assert response.status_code == 404
+    assert await get_database()["outbox"].count_documents({}) == 0
+
+
+async def test_update_product_reports_triggered_propagation(client):
+    """Test PATCH /products/{id} reports and queues propagation when the price changes."""
+    product_data = {
+        "name": "Test Mulch",
+        "description": "Test",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    response = await client.patch(f"/products/{product_id}", json={"price": 21.00})
+
+    assert response.status_code == 200
+    assert response.json()["propagation_triggered"] is True
+    assert await get_database()["outbox"].count_documents({"product_id": product_id}) == 1
+
+
+async def test_update_product_is_not_written_when_enqueue_fails(client, monkeypatch):
+    """Test a failed enqueue leaves the product unchanged, so a retry still propagates."""
+    product_data = {
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    async def failing_enqueue(db, product_id):
+        raise ConnectionError("outbox unavailable")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("routes.products.enqueue_propagation", failing_enqueue)
+        with pytest.raises(ConnectionError):
+            await client.patch(f"/products/{product_id}", json={"price": 21.00})
+
+    assert (await get_database()["products"].find_one({}))["price"] == 20.00
+    assert await get_database()["outbox"].count_documents({}) == 0
+
+    retry = await client.patch(f"/products/{product_id}", json={"price": 21.00})
+
+    assert retry.json()["propagation_triggered"] is True
+    assert await get_database()["outbox"].count_documents({"product_id": product_id}) == 1
+
+
+async def test_list_products_paginates_with_cursor(client):
+    """Test GET /products returns pages linked by X-Next-Cursor."""
+    for i in range(3):
+        await client.post("/products/", json={
+            "name": f"Product {i}",
+            "price": 10.00,
+            "unit": "yard",
+            "supplier_name": "Supplier",
+            "category": "Mulch",
+            "sku": f"SKU-00{i}"
+        })
+
+    first = await client.get("/products/", params={"limit": 2})
+    assert first.status_code == 200
+    assert [p["name"] for p in first.json()] == ["Product 0", "Product 1"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = await client.get("/products/", params={"limit": 2, "after": cursor})
+    assert second.status_code == 200
+    assert [p["name"] for p in second.json()] == ["Product 2"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+async def test_list_products_invalid_cursor(client):
+    """Test GET /products returns 400 for a malformed cursor."""
+    response = await client.get("/products/", params={"after": "garbage"})
+
+    assert response.status_code == 400
+    assert "invalid cursor" in response.json()["detail"].lower()
+
+
+async def test_list_products_limit_is_capped(client):
+    """Test GET /products rejects page sizes above the server maximum."""
+    response = await client.get("/products/", params={"limit": 1_000_000})
+
+    assert response.status_code == 422
+
+
+async def test_list_products_streams_ndjson(client):
+    """Test GET /products streams one product per line for Accept: application/x-ndjson."""
+    for i in range(3):
+        await client.post("/products/", json={
+            "name": f"Product {i}",
+            "price": 10.00,
+            "unit": "yard",
+            "supplier_name": "Supplier",
+            "category": "Mulch",
+            "sku": f"SKU-00{i}"
+        })
+
+    response = await client.get(
+        "/products/", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["name"] for line in lines] == ["Product 0", "Product 1", "Product 2"]
+    assert all("_id" in line for line in lines)
+
+
+async def test_list_products_ndjson_is_not_capped_by_page_size(client):
+    """Test the NDJSON stream returns every product rather than one default page."""
+    await get_database()["products"].insert_many([
+        {
+            "name": f"Product {i}",
+            "price": 10.00,
+            "unit": "yard",
+            "supplier_name": "Supplier",
+            "category": "Mulch",
+            "sku": f"SKU-{i:04d}",
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc),
+        }
+        for i in range(settings.DEFAULT_PAGE_SIZE + 5)
+    ])
+
+    response = await client.get(
+        "/products/", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == settings.DEFAULT_PAGE_SIZE + 5
+
+
+async def test_create_product_uses_one_round_trip(client):
+    """Test POST /products writes the product without reading it back."""
+    product_data = {
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+
+    response = await client.post("/products/", json=product_data)
+
+    assert response.status_code == 201
+    assert response.headers["X-Mongo-Round-Trips"] == "1"
+
+    # The response built from the inserted document matches what is stored
+    stored = await client.get(f"/products/{response.json()['_id']}")
+    assert stored.json() == response.json()
+
+
+async def test_update_product_uses_one_round_trip(client):
+    """Test PATCH /products/{id} updates in one round trip when nothing is propagated."""
+    product_data = {
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    response = await client.patch(
+        f"/products/{product_id}", json={"supplier_name": "Other Supplier"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Mongo-Round-Trips"] == "1"
+
+    stored = await client.get(f"/products/{product_id}")
+    expected = {k: v for k, v in response.json().items() if k != "propagation_triggered"}
+    assert stored.json() == expected
+
+
+async def test_update_product_with_propagation_uses_three_round_trips(client):
+    """Test PATCH /products/{id} adds the embedded fields read and the outbox write."""
+    product_data = {
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    response = await client.patch(f"/products/{product_id}", json={"price": 22.00})
+
+    assert response.status_code == 200
+    assert response.headers["X-Mongo-Round-Trips"] == "3"
+
+
+async def test_get_product_returns_only_model_fields(client):
+    """Test that stored fields outside the Product model are not returned."""
+    result = await get_database()["products"].insert_one({
+        "name": "Test Mulch",
+        "description": None,
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001",
+        "internal_note": "not for customers",
+        "created_at": datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc),
+        "updated_at": datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc),
+    })
+
+    response = await client.get(f"/products/{result.inserted_id}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["_id"] == str(result.inserted_id)
+    assert "internal_note" not in data
+    assert data["created_at"] == "2024-01-15T10:30:00Z"
+
+
+async def test_get_product_is_served_from_cache(client):
+    """Test that repeated reads of a product are served without a database read."""
+    create_response = await client.post("/products/", json={
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    })
+    product_id = create_response.json()["_id"]
+
+    first = await client.get(f"/products/{product_id}")
+    second = await client.get(f"/products/{product_id}")
+
+    assert first.headers["X-Mongo-Round-Trips"] == "1"
+    assert second.headers["X-Mongo-Round-Trips"] == "0"
+    assert second.json() == create_response.json()
+
+
+async def test_get_product_after_update_is_fresh(client):
+    """Test that a product read after PATCH reflects the update."""
+    create_response = await client.post("/products/", json={
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    })
+    product_id = create_response.json()["_id"]
+    await client.get(f"/products/{product_id}")
+
+    await client.patch(f"/products/{product_id}", json={"name": "Renamed Mulch"})
+    response = await client.get(f"/products/{product_id}")
+
+    assert response.json()["name"] == "Renamed Mulch"
+
+
+async def test_get_product_not_modified(client):
+    """Test If-None-Match with the current ETag returns 304 without a body."""
+    create_response = await client.post("/products/", json={
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    })
+    product_id = create_response.json()["_id"]
+    etag = (await client.get(f"/products/{product_id}")).headers["ETag"]
+
+    response = await client.get(
+        f"/products/{product_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+async def test_get_product_etag_changes_after_update(client):
+    """Test an updated product no longer matches its old ETag."""
+    create_response = await client.post("/products/", json={
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    })
+    product_id = create_response.json()["_id"]
+    etag = (await client.get(f"/products/{product_id}")).headers["ETag"]
+
+    await client.patch(f"/products/{product_id}", json={"description": "Updated"})
+    response = await client.get(
+        f"/products/{product_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["description"] == "Updated"
+
+
+CATALOG = [
+    ("Hardwood Mulch", 35.00, "Green Supplies", "Mulch", "MUL-HW-001"),
+    ("Cedar Mulch", 42.00, "Green Supplies", "Mulch", "MUL-CD-001"),
+    ("Black Mulch", 28.00, "Stone Works", "Mulch", "MUL-BK-001"),
+    ("River Rock", 65.00, "Stone Works", "Stone", "STN-RR-001"),
+    ("Pea Gravel", 48.00, "Stone Works", "Stone", "STN-PG-001"),
+]
+
+
+async def create_catalog(client):
+    """Create the CATALOG products through the API."""
+    for name, price, supplier_name, category, sku in CATALOG:
+        response = await client.post("/products/", json={
+            "name": name,
+            "price": price,
+            "unit": "yard",
+            "supplier_name": supplier_name,
+            "category": category,
+            "sku": sku,
+        })
+        assert response.status_code == 201
+
+
+async def test_list_products_filters_by_category_and_supplier(client):
+    """Test equality filters on category and supplier combine with AND."""
+    await create_catalog(client)
+
+    response = await client.get(
+        "/products/", params={"category": "Mulch", "supplier_name": "Stone Works"})
+
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json()] == ["Black Mulch"]
+
+
+async def test_list_products_filters_by_price_range(client):
+    """Test the price range is inclusive at both ends."""
+    await create_catalog(client)
+
+    response = await client.get(
+        "/products/", params={"min_price": 35.00, "max_price": 48.00, "sort": "price"})
+
+    assert [p["price"] for p in response.json()] == [35.00, 42.00, 48.00]
+
+
+async def test_list_products_rejects_empty_price_range(client):
+    """Test a minimum price above the maximum is rejected."""
+    response = await client.get("/products/", params={"min_price": 50, "max_price": 10})
+
+    assert response.status_code == 400
+
+
+async def test_list_products_filters_by_sku_prefix(client):
+    """Test only SKUs starting with the prefix are returned."""
+    await create_catalog(client)
+
+    response = await client.get("/products/", params={"sku_prefix": "STN-"})
+
+    assert sorted(p["sku"] for p in response.json()) == ["STN-PG-001", "STN-RR-001"]
+
+
+async def test_list_products_sorts(client):
+    """Test the sort options, including descending ones."""
+    await create_catalog(client)
+
+    by_price_desc = await client.get(
+        "/products/", params={"category": "Mulch", "sort": "-price"})
+    by_name = await client.get("/products/", params={"sort": "name"})
+
+    assert [p["price"] for p in by_price_desc.json()] == [42.00, 35.00, 28.00]
+    assert [p["name"] for p in by_name.json()] == sorted(name for name, *_ in CATALOG)
+
+
+async def test_list_products_rejects_unknown_sort(client):
+    """Test sorting is limited to the supported options."""
+    response = await client.get("/products/", params={"sort": "supplier_name"})
+
+    assert response.status_code == 422
+
+
+async def test_list_products_paginates_filtered_sorted_listing(client):
+    """Test cursor pagination follows the chosen sort within the filter."""
+    await create_catalog(client)
+    params = {"supplier_name": "Stone Works", "sort": "-price", "limit": 2}
+
+    first = await client.get("/products/", params=params)
+    second = await client.get(
+        "/products/", params={**params, "after": first.headers["X-Next-Cursor"]})
+
+    assert [p["price"] for p in first.json()] == [65.00, 48.00]
+    assert [p["price"] for p in second.json()] == [28.00]
+    assert "X-Next-Cursor" not in second.headers
+
+
+async def test_list_products_cursor_is_tied_to_sort(client):
+    """Test a cursor issued for one sort is rejected for another."""
+    await create_catalog(client)
+    first = await client.get("/products/", params={"sort": "price", "limit": 2})
+
+    response = await client.get(
+        "/products/", params={"sort": "name", "after": first.headers["X-Next-Cursor"]})
+
+    assert response.status_code == 400
+
+
+async def test_list_products_returns_requested_fields_only(client):
+    """Test ?fields= on products returns _id and the listed fields."""
+    await create_catalog(client)
+
+    response = await client.get(
+        "/products/", params={"fields": "name,price", "category": "Stone", "sort": "price"})
+
+    assert response.status_code == 200
+    assert [set(p) for p in response.json()] == [{"_id", "name", "price"}] * 2
+    assert [p["name"] for p in response.json()] == ["Pea Gravel", "River Rock"]
+
+
+async def test_import_products_from_csv(client):
+    """Test a CSV import writes valid rows and reports invalid ones by row."""
+    body = (
+        "name,description,price,unit,supplier_name,category,sku\n"
+        "Hardwood Mulch,Dark brown,35.50,yard,Green Supplies,Mulch,MUL-HW-001\n"
+        "Cedar Mulch,,-4,yard,Green Supplies,Mulch,MUL-CD-001\n"
+        "River Rock,,65.00,ton,Stone Works,Stone,STN-RR-001\n"
+    )
+
+    response = await client.post(
+        "/products/import", content=body, headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["received"] == 3
+    assert result["inserted"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert result["errors"][0]["sku"] == "MUL-CD-001"
+    assert "price" in result["errors"][0]["message"]
+
+    listed = await client.get("/products/", params={"sort": "name"})
+    assert [p["name"] for p in listed.json()] == ["Hardwood Mulch", "River Rock"]
+    assert listed.json()[1]["description"] is None
+
+
+async def test_import_products_ndjson_upsert_updates_and_propagates(client, no_coalesce_window):
+    """Test an NDJSON upsert updates products by sku and queues propagation."""
+    product = await client.post("/products/", json={
+        "name": "Test Mulch",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    })
+    product_id = product.json()["_id"]
+    quote = await client.post("/quotes/", json={
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 2.0}]
+    })
+    rows = [
+        {"name": "Test Mulch", "price": 24.00, "unit": "yard",
+         "supplier_name": "Supplier", "category": "Mulch", "sku": "MUL-001"},
+        {"name": "New Stone", "price": 50.00, "unit": "ton",
+         "supplier_name": "Supplier", "category": "Stone", "sku": "STN-001"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n"
+
+    response = await client.post(
+        "/products/import", params={"mode": "upsert"}, content=body,
+        headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.json() == {
+        "received": 2, "inserted": 1, "updated": 1, "unchanged": 0, "failed": 0, "errors": []}
+    assert (await client.get(f"/products/{product_id}")).json()["price"] == 24.00
+
+    await drain_outbox(get_database(), "test-worker")
+    updated_quote = await client.get(f"/quotes/{quote.json()['_id']}")
+    assert updated_quote.json()["total_amount"] == 48.00
+
+
+async def test_import_products_reports_malformed_rows(client):
+    """Test malformed NDJSON lines are reported without stopping the import."""
+    body = (
+        '{"name": "Mulch", "price": 10, "unit": "bag", "supplier_name": "S", '
+        '"category": "Mulch", "sku": "A"}\n'
+        'not json\n'
+    )
+
+    response = await client.post(
+        "/products/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    result = response.json()
+    assert result["inserted"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert result["errors"][0]["message"].startswith("Invalid JSON")
+
+
+async def test_import_products_rejects_other_media_types(client):
+    """Test uploads that are neither CSV nor NDJSON are rejected."""
+    response = await client.post(
+        "/products/import", content=b"{}", headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 415
+
+
+async def test_import_products_diff_writes_only_changed_rows(client):
+    """Test a diff import of a re-sent catalog reports unchanged rows."""
+    header = "name,price,unit,supplier_name,category,sku\n"
+    catalog = (
+        "Hardwood Mulch,35.50,yard,Green Supplies,Mulch,MUL-HW-001\n"
+        "River Rock,65.00,ton,Stone Works,Stone,STN-RR-001\n"
+    )
+    await client.post(
+        "/products/import", content=header + catalog, headers={"Content-Type": "text/csv"})
+    resent = catalog.replace("65.00", "68.00") + "Pea Gravel,48.00,ton,Stone Works,Stone,STN-PG-001\n"
+
+    response = await client.post(
+        "/products/import", params={"mode": "diff"}, content=header + resent,
+        headers={"Content-Type": "text/csv"})
+
+    result = response.json()
+    assert (result["inserted"], result["updated"], result["unchanged"]) == (1, 1, 1)
+    stats = await client.get("/propagation/stats")
+    assert stats.json()["updates_received"] == 1
+
+
+async def test_adjust_prices_by_supplier_percent(client):
+    """Test a percentage rule changes only the supplier's products, rounded to cents."""
+    await create_catalog(client)
+
+    response = await client.post("/products/price-adjustments", json={
+        "supplier_name": "Stone Works", "percent": 6})
+
+    assert response.status_code == 200
+    assert response.json() == {"matched": 3, "modified": 3, "propagation_triggered": True}
+    listing = await client.get("/products/", params={"sort": "name"})
+    prices = {p["name"]: p["price"] for p in listing.json()}
+    assert prices == {
+        "Black Mulch": 29.68, "Cedar Mulch": 42.00, "Hardwood Mulch": 35.00,
+        "Pea Gravel": 50.88, "River Rock": 68.90,
+    }
+
+
+async def test_adjust_prices_by_category_amount(client):
+    """Test a fixed amount per unit applies to a whole category."""
+    await create_catalog(client)
+
+    response = await client.post("/products/price-adjustments", json={
+        "category": "Mulch", "amount": 2})
+
+    assert response.json()["modified"] == 3
+    listing = await client.get("/products/", params={"category": "Mulch", "sort": "price"})
+    assert [p["price"] for p in listing.json()] == [30.00, 37.00, 44.00]
+
+
+async def test_adjust_prices_never_reaches_zero(client):
+    """Test products a rule would price at zero or below are left unchanged."""
+    await create_catalog(client)
+
+    response = await client.post("/products/price-adjustments", json={
+        "supplier_name": "Stone Works", "amount": -30})
+
+    assert response.json() == {"matched": 3, "modified": 2, "propagation_triggered": True}
+    listing = await client.get("/products/", params={"supplier_name": "Stone Works", "sort": "price"})
+    assert [p["price"] for p in listing.json()] == [18.00, 28.00, 35.00]
+
+
+async def test_adjust_prices_queues_only_changed_products(client):
+    """Test products whose price the rule leaves as it is are not propagated."""
+    await create_catalog(client)
+    listing = await client.get("/products/", params={"supplier_name": "Stone Works"})
+    changed_ids = {p["_id"] for p in listing.json() if p["price"] > 30}
+
+    await client.post("/products/price-adjustments", json={
+        "supplier_name": "Stone Works", "amount": -30})
+
+    task = await get_database()[OUTBOX_COLLECTION].find_one({"product_id": None})
+    assert set(task["product_ids"]) == changed_ids
+
+
+async def test_adjust_prices_changing_nothing_queues_nothing(client):
+    """Test a rule leaving every price as it is queues no propagation."""
+    await create_catalog(client)
+
+    response = await client.post("/products/price-adjustments", json={
+        "supplier_name": "Stone Works", "amount": -1000})
+
+    assert response.json() == {"matched": 3, "modified": 0, "propagation_triggered": False}
+    assert await get_database()[OUTBOX_COLLECTION].count_documents({}) == 0
+
+
+async def test_adjust_prices_rejects_incomplete_rules(client):
+    """Test rules need a selector and exactly one of percent and amount."""
+    for rule in (
+        {"percent": 5},
+        {"category": "Mulch"},
+        {"category": "Mulch", "percent": 5, "amount": 1},
+        {"category": "Mulch", "percent": -100},
+    ):
+        response = await client.post("/products/price-adjustments", json=rule)
+        assert response.status_code == 422, rule
+
+
+async def test_adjust_prices_invalidates_cached_products(client):
+    """Test adjusted products are not served stale from the cache."""
+    response = await client.post("/products/", json={
+        "name": "Mulch", "price": 10.00, "unit": "yard",
+        "supplier_name": "Supplier", "category": "Mulch", "sku": "MUL-001"})
+    product_id = response.json()["_id"]
+    await client.get(f"/products/{product_id}")
+
+    await client.post("/products/price-adjustments", json={"category": "Mulch", "percent": 10})
+
+    assert (await client.get(f"/products/{product_id}")).json()["price"] == 11.00
+
+
+async def test_adjust_prices_propagates_in_one_pass(client, no_coalesce_window, command_recorder):
+    """Test quotes holding several adjusted products are rewritten by one task."""
+    await create_catalog(client)
+    listing = await client.get("/products/", params={"category": "Mulch", "sort": "price"})
+    mulch_ids = [p["_id"] for p in listing.json()]
+    quote = await client.post("/quotes/", json={
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 1.0} for product_id in mulch_ids],
+    })
+
+    await client.post("/products/price-adjustments", json={"category": "Mulch", "amount": 1})
+
+    command_recorder.clear()
+    assert await drain_outbox(get_database(), "test-worker") == 1
+    assert command_recorder.count("update", "quotes") == 1
+    updated_quote = (await client.get(f"/quotes/{quote.json()['_id']}")).json()
+    assert [item["product_price"] for item in updated_quote["line_items"]] == [29.00, 36.00, 43.00]
+    assert updated_quote["total_amount"] == 108.00
+    stats = (await client.get("/propagation/stats")).json()
+    assert (stats["updates_received"], stats["passes"], stats["passes_saved"]) == (3, 1, 2)
+
+
+SKU_PRODUCT = {
+    "name": "Hardwood Mulch",
+    "description": "Dark brown",
+    "price": 35.50,
+    "unit": "yard",
+    "supplier_name": "Green Supplies",
+    "category": "Mulch",
+}
+
+
+async def test_get_product_by_sku(client):
+    """Test GET /products/by-sku/{sku} returns the product with an ETag."""
+    created = await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+
+    response = await client.get("/products/by-sku/MUL-HW-001")
+
+    assert response.status_code == 200
+    assert response.json() == created.json()
+    not_modified = await client.get(
+        "/products/by-sku/MUL-HW-001", headers={"If-None-Match": response.headers["ETag"]})
+    assert not_modified.status_code == 304
+
+
+async def test_get_product_by_sku_not_found(client):
+    """Test an unknown SKU returns 404."""
+    response = await client.get("/products/by-sku/MISSING")
+
+    assert response.status_code == 404
+
+
+async def test_get_product_by_sku_is_served_from_cache(client, command_recorder):
+    """Test repeated SKU lookups, and lookups by ID after them, skip the database."""
+    await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+    first = await client.get("/products/by-sku/MUL-HW-001")
+
+    command_recorder.clear()
+    await client.get("/products/by-sku/MUL-HW-001")
+    await client.get(f"/products/{first.json()['_id']}")
+
+    assert command_recorder.count("find", "products") == 0
+
+
+async def test_upsert_product_by_sku_creates_then_is_idempotent(client, command_recorder):
+    """Test PUT creates a product once and repeating it writes nothing."""
+    created = await client.put("/products/by-sku/MUL-HW-001", json=SKU_PRODUCT)
+
+    assert created.status_code == 201
+    assert created.json()["sku"] == "MUL-HW-001"
+    assert created.json()["propagation_triggered"] is False
+
+    command_recorder.clear()
+    repeated = await client.put("/products/by-sku/MUL-HW-001", json=SKU_PRODUCT)
+
+    assert repeated.status_code == 200
+    assert repeated.json() == created.json()
+    assert command_recorder.count("findAndModify", "products") == 0
+    listing = await client.get("/products/")
+    assert len(listing.json()) == 1
+
+
+async def test_upsert_product_by_sku_replaces_and_propagates(client, no_coalesce_window):
+    """Test PUT replaces the product, clearing omitted fields and updating quotes."""
+    created = await client.put("/products/by-sku/MUL-HW-001", json=SKU_PRODUCT)
+    product_id = created.json()["_id"]
+    await client.get(f"/products/{product_id}")
+    quote = await client.post("/quotes/", json={
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 2.0}]
+    })
+    replacement = {**SKU_PRODUCT, "price": 38.00}
+    del replacement["description"]
+
+    response = await client.put("/products/by-sku/MUL-HW-001", json=replacement)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["_id"] == product_id
+    assert result["description"] is None
+    assert result["propagation_triggered"] is True
+    assert (await client.get(f"/products/{product_id}")).json()["price"] == 38.00
+    await drain_outbox(get_database(), "test-worker")
+    updated_quote = await client.get(f"/quotes/{quote.json()['_id']}")
+    assert updated_quote.json()["total_amount"] == 76.00
+
+
+async def test_upsert_product_by_sku_rejects_mismatched_sku(client):
+    """Test a body naming another SKU is rejected."""
+    response = await client.put(
+        "/products/by-sku/MUL-HW-001", json={**SKU_PRODUCT, "sku": "MUL-HW-002"})
+
+    assert response.status_code == 400
+
+
+async def test_import_products_insert_reports_existing_sku(client):
+    """Test inserting a SKU that already exists fails for that row only."""
+    await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+    body = (
+        "name,price,unit,supplier_name,category,sku\n"
+        "Hardwood Mulch,35.50,yard,Green Supplies,Mulch,MUL-HW-001\n"
+        "River Rock,65.00,ton,Stone Works,Stone,STN-RR-001\n"
+    )
+
+    response = await client.post(
+        "/products/import", content=body, headers={"Content-Type": "text/csv"})
+
+    result = response.json()
+    assert (result["inserted"], result["failed"]) == (1, 1)
+    assert result["errors"][0]["sku"] == "MUL-HW-001"
+    assert "E11000" in result["errors"][0]["message"]
+
+
+async def test_create_product_with_existing_sku_conflicts(client):
+    """Test POST /products/ returns 409 when the SKU is taken."""
+    await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+
+    response = await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+
+    assert response.status_code == 409
+    assert "MUL-HW-001" in response.json()["detail"]
+
+
+async def test_update_product_to_existing_sku_conflicts(client):
+    """Test PATCH returns 409 when another product has the new SKU, and writes nothing."""
+    await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+    other = await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-002"})
+    product_id = other.json()["_id"]
+
+    response = await client.patch(
+        f"/products/{product_id}", json={"sku": "MUL-HW-001", "price": 40.00})
+
+    assert response.status_code == 409
+    product = (await client.get(f"/products/{product_id}")).json()
+    assert (product["sku"], product["price"]) == ("MUL-HW-002", 35.50)
+
+
+async def test_update_product_rejects_null_sku(client):
+    """Test PATCH cannot clear a SKU, which the unique index would allow only once."""
+    created = await client.post("/products/", json={**SKU_PRODUCT, "sku": "MUL-HW-001"})
+
+    response = await client.patch(f"/products/{created.json()['_id']}", json={"sku": None})
+
+    assert response.status_code == 422
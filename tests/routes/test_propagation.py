@@ -0,0 +1,48 @@
+"""
+Integration tests for Propagation routes.
+
+These tests use a real MongoDB connection (no mocking).
+"""
+
+
+async def test_propagation_stats_count_coalesced_updates(client):
+    """Test GET /propagation/stats reports passes saved by coalescing."""
+    product_data = {
+        "name": "Test Mulch",
+        "description": "Test",
+        "price": 20.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "MUL-001"
+    }
+    create_response = await client.post("/products/", json=product_data)
+    product_id = create_response.json()["_id"]
+
+    # Two quick updates of the same product share one pending pass
+    await client.patch(f"/products/{product_id}", json={"name": "Tset Mulch"})
+    await client.patch(f"/products/{product_id}", json={"name": "Test Mulch", "price": 22.00})
+
+    response = await client.get("/propagation/stats")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pending"] == 1
+    assert data["updates_received"] == 2
+    assert data["passes"] == 1
+    assert data["passes_saved"] == 1
+
+
+async def test_propagation_stats_empty(client):
+    """Test GET /propagation/stats returns zeros when nothing was queued."""
+    response = await client.get("/propagation/stats")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "pending": 0,
+        "processing": 0,
+        "done": 0,
+        "updates_received": 0,
+        "passes": 0,
+        "passes_saved": 0,
+    }
@@ -7,6 +7,11 @@ pre-implemented quote endpoints including initial denormalization.
 NOTE: These tests do NOT test propagation of product updates to quotes.
 That is the candidate's challenge to implement.
 """
+import json
+from datetime import datetime, timezone
+
+from database.mongodb import get_database
+from database.outbox import drain_outbox
 
 
 async def test_create_quote_with_denormalization(client):
@@ -333,3 +338,483 @@ async def test_get_quote_invalid_id_format(client):
 
     assert response.status_code == 400
     assert "invalid" in response.json()["detail"].lower()
+
+
+async def test_list_quotes_paginates_with_cursor(client):
+    """Test GET /quotes returns pages linked by X-Next-Cursor."""
+    product_data = {
+        "name": "Test Product",
+        "description": "Test",
+        "price": 15.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    }
+    product_response = await client.post("/products/", json=product_data)
+    product_id = product_response.json()["_id"]
+
+    for i in range(3):
+        await client.post("/quotes/", json={
+            "customer_name": f"Customer {i}",
+            "customer_email": f"customer{i}@example.com",
+            "line_items": [{"product_id": product_id, "quantity": 1.0}]
+        })
+
+    first = await client.get("/quotes/", params={"limit": 2})
+    assert first.status_code == 200
+    assert [q["customer_name"] for q in first.json()] == ["Customer 0", "Customer 1"]
+
+    second = await client.get(
+        "/quotes/", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    assert [q["customer_name"] for q in second.json()] == ["Customer 2"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+async def test_list_quotes_limit_is_capped(client):
+    """Test GET /quotes rejects page sizes above the server maximum."""
+    response = await client.get("/quotes/", params={"limit": 1_000_000})
+
+    assert response.status_code == 422
+
+
+async def test_list_quotes_streams_ndjson(client):
+    """Test GET /quotes streams one quote per line for Accept: application/x-ndjson."""
+    product_data = {
+        "name": "Test Product",
+        "description": "Test",
+        "price": 15.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    }
+    product_response = await client.post("/products/", json=product_data)
+    product_id = product_response.json()["_id"]
+
+    for i in range(3):
+        await client.post("/quotes/", json={
+            "customer_name": f"Customer {i}",
+            "customer_email": f"customer{i}@example.com",
+            "line_items": [{"product_id": product_id, "quantity": 2.0}]
+        })
+
+    response = await client.get(
+        "/quotes/", headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["customer_name"] for line in lines] == ["Customer 0", "Customer 1", "Customer 2"]
+    assert lines[0]["line_items"][0]["line_total"] == 30.00
+
+
+async def test_list_quotes_ndjson_honours_explicit_limit(client):
+    """Test the NDJSON stream stops after ?limit= quotes when a limit is given."""
+    product_data = {
+        "name": "Test Product",
+        "description": "Test",
+        "price": 15.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    }
+    product_response = await client.post("/products/", json=product_data)
+    product_id = product_response.json()["_id"]
+
+    for i in range(3):
+        await client.post("/quotes/", json={
+            "customer_name": f"Customer {i}",
+            "customer_email": f"customer{i}@example.com",
+            "line_items": [{"product_id": product_id, "quantity": 2.0}]
+        })
+
+    response = await client.get(
+        "/quotes/", params={"limit": 2}, headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+
+
+async def test_create_quote_looks_up_products_in_one_query(client, command_recorder):
+    """Test POST /quotes resolves every line item's product with a single query."""
+    product_ids = []
+    for i in range(3):
+        response = await client.post("/products/", json={
+            "name": f"Product {i}",
+            "price": 10.00 * (i + 1),
+            "unit": "yard",
+            "supplier_name": "Supplier",
+            "category": "Mulch",
+            "sku": f"SKU-00{i}"
+        })
+        product_ids.append(response.json()["_id"])
+
+    # Duplicate product IDs within the quote are resolved by the same query
+    quote_data = {
+        "customer_name": "Batch Customer",
+        "customer_email": "batch@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 1.0}
+                       for product_id in product_ids + product_ids[:1]]
+    }
+
+    command_recorder.clear()
+    response = await client.post("/quotes/", json=quote_data)
+
+    assert response.status_code == 201
+    assert command_recorder.count("find", "products") == 1
+    assert command_recorder.count("getMore") == 0
+
+    data = response.json()
+    assert [item["product_id"] for item in data["line_items"]] == product_ids + product_ids[:1]
+    assert data["total_amount"] == 70.00  # 10 + 20 + 30 + 10
+
+
+async def test_create_quote_missing_product_among_many(client):
+    """Test POST /quotes returns 404 naming the product that does not exist."""
+    product_response = await client.post("/products/", json={
+        "name": "Test Product",
+        "price": 10.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    })
+    product_id = product_response.json()["_id"]
+    missing_id = "507f1f77bcf86cd799439011"
+
+    response = await client.post("/quotes/", json={
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [
+            {"product_id": product_id, "quantity": 1.0},
+            {"product_id": missing_id, "quantity": 1.0}
+        ]
+    })
+
+    assert response.status_code == 404
+    assert missing_id in response.json()["detail"]
+
+
+async def test_create_quote_round_trips(client):
+    """Test POST /quotes needs one product lookup and one insert, with no read-back."""
+    product_response = await client.post("/products/", json={
+        "name": "Test Product",
+        "price": 10.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    })
+    product_id = product_response.json()["_id"]
+
+    response = await client.post("/quotes/", json={
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 1.0}]
+    })
+
+    assert response.status_code == 201
+    assert response.headers["X-Mongo-Round-Trips"] == "2"
+
+    stored = await client.get(f"/quotes/{response.json()['_id']}")
+    assert stored.json() == response.json()
+
+
+async def test_create_quote_reads_cached_products(client):
+    """Test that a second quote for the same product skips the product lookup."""
+    product_response = await client.post("/products/", json={
+        "name": "Test Product",
+        "price": 10.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    })
+    quote_data = {
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_response.json()["_id"], "quantity": 1.0}]
+    }
+
+    first = await client.post("/quotes/", json=quote_data)
+    second = await client.post("/quotes/", json=quote_data)
+
+    assert first.headers["X-Mongo-Round-Trips"] == "2"
+    assert second.headers["X-Mongo-Round-Trips"] == "1"
+    assert second.json()["line_items"] == first.json()["line_items"]
+
+
+async def test_create_quote_sees_product_update(client):
+    """Test that updating a product invalidates its cached version."""
+    product_response = await client.post("/products/", json={
+        "name": "Test Product",
+        "price": 10.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": "TEST-001"
+    })
+    product_id = product_response.json()["_id"]
+    quote_data = {
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_id, "quantity": 2.0}]
+    }
+    await client.post("/quotes/", json=quote_data)
+
+    await client.patch(f"/products/{product_id}", json={"price": 12.50})
+    response = await client.post("/quotes/", json=quote_data)
+
+    assert response.status_code == 201
+    assert response.json()["line_items"][0]["product_price"] == 12.50
+    assert response.json()["total_amount"] == 25.00
+
+
+async def create_test_quote(client, sku="TEST-001"):
+    """Create a product and a single-line quote for it, returning the quote."""
+    product_response = await client.post("/products/", json={
+        "name": "Test Product",
+        "price": 10.00,
+        "unit": "yard",
+        "supplier_name": "Supplier",
+        "category": "Mulch",
+        "sku": sku
+    })
+    response = await client.post("/quotes/", json={
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "line_items": [{"product_id": product_response.json()["_id"], "quantity": 1.0}]
+    })
+    return response.json()
+
+
+async def test_get_quote_returns_etag(client):
+    """Test GET /quotes/{id} returns a strong ETag that is stable across reads."""
+    quote = await create_test_quote(client)
+
+    first = await client.get(f"/quotes/{quote['_id']}")
+    second = await client.get(f"/quotes/{quote['_id']}")
+
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+    assert second.headers["ETag"] == etag
+
+
+async def test_get_quote_not_modified(client, command_recorder):
+    """Test If-None-Match with the current ETag returns 304 from a projected read."""
+    quote = await create_test_quote(client)
+    etag = (await client.get(f"/quotes/{quote['_id']}")).headers["ETag"]
+
+    command_recorder.clear()
+    response = await client.get(
+        f"/quotes/{quote['_id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert response.headers["X-Mongo-Round-Trips"] == "1"
+
+
+async def test_get_quote_modified_after_propagation(client, no_coalesce_window):
+    """Test a quote rewritten by propagation no longer matches its old ETag."""
+    quote = await create_test_quote(client)
+    product_id = quote["line_items"][0]["product_id"]
+    etag = (await client.get(f"/quotes/{quote['_id']}")).headers["ETag"]
+
+    await client.patch(f"/products/{product_id}", json={"price": 12.00})
+    await drain_outbox(get_database(), "test-worker")
+    response = await client.get(
+        f"/quotes/{quote['_id']}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["line_items"][0]["product_price"] == 12.00
+
+
+async def test_get_quote_not_modified_missing_quote(client):
+    """Test a conditional GET for a missing quote still returns 404."""
+    response = await client.get(
+        "/quotes/507f1f77bcf86cd799439011", headers={"If-None-Match": '"x"'})
+
+    assert response.status_code == 404
+
+
+def make_quote_document(customer_email, quote_status, created_at, product_id):
+    """Build a stored quote with one line item."""
+    return {
+        "customer_name": "Test Customer",
+        "customer_email": customer_email,
+        "project_name": None,
+        "status": quote_status,
+        "line_items": [{
+            "product_id": product_id,
+            "product_name": "Mulch",
+            "product_price": 10.00,
+            "product_unit": "yard",
+            "quantity": 1.0,
+            "line_total": 10.00,
+        }],
+        "total_amount": 10.00,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+MULCH_ID = "65a000000000000000000001"
+STONE_ID = "65a000000000000000000002"
+
+
+async def insert_quote_history():
+    """Insert quotes for two customers over three days."""
+    await get_database()["quotes"].insert_many([
+        make_quote_document("a@example.com", "draft", datetime(2024, 1, 1, tzinfo=timezone.utc), MULCH_ID),
+        make_quote_document("a@example.com", "sent", datetime(2024, 1, 2, tzinfo=timezone.utc), STONE_ID),
+        make_quote_document("a@example.com", "accepted", datetime(2024, 1, 3, tzinfo=timezone.utc), MULCH_ID),
+        make_quote_document("b@example.com", "sent", datetime(2024, 1, 2, tzinfo=timezone.utc), MULCH_ID),
+    ])
+
+
+async def test_list_quotes_filters_by_customer_newest_first(client):
+    """Test a customer's quotes are listed newest first."""
+    await insert_quote_history()
+
+    response = await client.get(
+        "/quotes/", params={"customer_email": "a@example.com", "sort": "-created_at"})
+
+    assert response.status_code == 200
+    assert [q["status"] for q in response.json()] == ["accepted", "sent", "draft"]
+
+
+async def test_list_quotes_filters_by_status(client):
+    """Test the status filter, combined with a customer."""
+    await insert_quote_history()
+
+    sent = await client.get("/quotes/", params={"status": "sent"})
+    customer_sent = await client.get(
+        "/quotes/", params={"status": "sent", "customer_email": "b@example.com"})
+
+    assert len(sent.json()) == 2
+    assert [q["customer_email"] for q in customer_sent.json()] == ["b@example.com"]
+
+
+async def test_list_quotes_filters_by_created_at_range(client):
+    """Test the creation date range is inclusive at both ends."""
+    await insert_quote_history()
+
+    response = await client.get("/quotes/", params={
+        "created_from": "2024-01-02T00:00:00Z",
+        "created_to": "2024-01-03T00:00:00Z",
+        "sort": "created_at",
+    })
+
+    assert [q["created_at"] for q in response.json()] == [
+        "2024-01-02T00:00:00Z", "2024-01-02T00:00:00Z", "2024-01-03T00:00:00Z"]
+
+
+async def test_list_quotes_rejects_reversed_date_range(client):
+    """Test a range ending before it starts is rejected."""
+    response = await client.get("/quotes/", params={
+        "created_from": "2024-01-03T00:00:00Z",
+        "created_to": "2024-01-01T00:00:00Z",
+    })
+
+    assert response.status_code == 400
+
+
+async def test_list_quotes_reads_naive_dates_as_utc(client):
+    """Test a range mixing bounds with and without an offset is compared in UTC."""
+    await insert_quote_history()
+
+    response = await client.get("/quotes/", params={
+        "created_from": "2024-01-02T00:00:00",
+        "created_to": "2024-01-03T00:00:00Z",
+        "sort": "created_at",
+    })
+    reversed_range = await client.get("/quotes/", params={
+        "created_from": "2024-01-03T00:00:00Z",
+        "created_to": "2024-01-01T00:00:00",
+    })
+
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert reversed_range.status_code == 400
+
+
+async def test_list_quotes_filters_by_product(client):
+    """Test only quotes containing the product are returned, whatever the ID's case."""
+    await insert_quote_history()
+
+    response = await client.get("/quotes/", params={"product_id": STONE_ID.upper()})
+
+    assert response.status_code == 200
+    assert [q["status"] for q in response.json()] == ["sent"]
+    assert response.json()[0]["customer_email"] == "a@example.com"
+
+
+async def test_list_quotes_rejects_invalid_product_id(client):
+    """Test a malformed product ID filter is rejected."""
+    response = await client.get("/quotes/", params={"product_id": "not-an-id"})
+
+    assert response.status_code == 400
+
+
+async def test_list_quotes_paginates_newest_first(client):
+    """Test cursor pagination over a customer's quotes in descending date order."""
+    await insert_quote_history()
+    params = {"customer_email": "a@example.com", "sort": "-created_at", "limit": 2}
+
+    first = await client.get("/quotes/", params=params)
+    second = await client.get(
+        "/quotes/", params={**params, "after": first.headers["X-Next-Cursor"]})
+
+    assert [q["status"] for q in first.json()] == ["accepted", "sent"]
+    assert [q["status"] for q in second.json()] == ["draft"]
+
+
+async def test_list_quotes_returns_requested_fields_only(client):
+    """Test ?fields= returns _id and the listed fields, without line items."""
+    await insert_quote_history()
+
+    response = await client.get(
+        "/quotes/", params={"fields": "customer_name,status,total_amount"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+    for quote in response.json():
+        assert set(quote) == {"_id", "customer_name", "status", "total_amount"}
+
+
+async def test_list_quotes_fields_with_unprojected_sort_field(client):
+    """Test pagination sorted on a field left out of ?fields= still works."""
+    await insert_quote_history()
+    params = {"fields": "status", "sort": "-created_at", "limit": 3}
+
+    first = await client.get("/quotes/", params=params)
+    second = await client.get(
+        "/quotes/", params={**params, "after": first.headers["X-Next-Cursor"]})
+
+    assert all(set(quote) == {"_id", "status"} for quote in first.json())
+    assert len(first.json()) + len(second.json()) == 4
+
+
+async def test_list_quotes_rejects_unknown_fields(client):
+    """Test ?fields= naming a field quotes do not have is rejected."""
+    response = await client.get("/quotes/", params={"fields": "status,margin"})
+
+    assert response.status_code == 400
+    assert "margin" in response.json()["detail"]
+
+
+async def test_list_quotes_ndjson_honours_fields(client):
+    """Test the NDJSON stream applies ?fields= as well."""
+    await insert_quote_history()
+
+    response = await client.get(
+        "/quotes/", params={"fields": "status"}, headers={"Accept": "application/x-ndjson"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 4
+    assert all(set(line) == {"_id", "status"} for line in lines)
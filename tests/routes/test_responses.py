@@ -0,0 +1,147 @@
+"""
+Unit tests for direct JSON serialization of MongoDB documents.
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from pydantic_core import PydanticSerializationError
+from starlette.requests import Request
+
+from models.product import Product
+from models.quote import Quote
+from routes.responses import (
+    MongoJSONResponse,
+    dump_json,
+    entity_tag,
+    fieldset_projection,
+    is_not_modified,
+    not_modified_response,
+    projection_for,
+)
+
+
+def make_request(headers):
+    """Build a bare request carrying the given headers."""
+    return Request({
+        "type": "http",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_dump_json_matches_model_serialization():
+    """Test that documents encode exactly as the response model would encode them."""
+    document = {
+        "_id": ObjectId(),
+        "customer_name": "Test Customer",
+        "customer_email": "test@example.com",
+        "project_name": None,
+        "status": "draft",
+        "line_items": [{
+            "product_id": str(ObjectId()),
+            "product_name": "Mulch",
+            "product_price": 35.50,
+            "product_unit": "yard",
+            "quantity": 2.0,
+            "line_total": 71.00,
+        }],
+        "total_amount": 71.00,
+        "created_at": datetime(2024, 1, 15, 14, 30, 0, 123000, tzinfo=timezone.utc),
+        "updated_at": datetime(2024, 1, 15, 14, 30, 0, 123000, tzinfo=timezone.utc),
+    }
+    expected = Quote(**{**document, "_id": str(document["_id"])}).model_dump_json(by_alias=True)
+
+    assert json.loads(dump_json(document)) == json.loads(expected)
+
+
+def test_dump_json_encodes_object_ids_as_strings():
+    """Test that ObjectIds, including nested ones, encode as hex strings."""
+    object_id = ObjectId()
+
+    assert json.loads(dump_json([{"_id": object_id}])) == [{"_id": str(object_id)}]
+
+
+def test_dump_json_rejects_unknown_types():
+    """Test that values with no JSON representation still fail loudly."""
+    with pytest.raises(PydanticSerializationError):
+        dump_json({"value": object()})
+
+
+def test_projection_for_uses_field_aliases():
+    """Test that projections name stored fields, using _id for the id alias."""
+    projection = projection_for(Product)
+
+    assert projection["_id"] == 1
+    assert "id" not in projection
+    assert set(projection) == {
+        "_id", "name", "description", "price", "unit", "supplier_name",
+        "category", "sku", "created_at", "updated_at",
+    }
+
+
+def test_mongo_json_response_renders_documents():
+    """Test that the response encodes its content as JSON."""
+    object_id = ObjectId()
+
+    response = MongoJSONResponse({"_id": object_id}, status_code=201)
+
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == {"_id": str(object_id)}
+
+
+def test_entity_tag_changes_with_updated_at():
+    """Test that the ETag is strong and changes when updated_at does."""
+    object_id = ObjectId()
+    updated_at = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+    etag = entity_tag({"_id": object_id, "updated_at": updated_at})
+    later = entity_tag({"_id": object_id, "updated_at": updated_at.replace(microsecond=1000)})
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert str(object_id) in etag
+    assert etag != later
+
+
+def test_entity_tag_treats_naive_datetimes_as_utc():
+    """Test that naive and aware UTC timestamps give the same ETag."""
+    object_id = ObjectId()
+    aware = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+
+    assert entity_tag({"_id": object_id, "updated_at": aware}) == \
+        entity_tag({"_id": object_id, "updated_at": aware.replace(tzinfo=None)})
+
+
+def test_is_not_modified_matches_if_none_match():
+    """Test If-None-Match matching against the current ETag."""
+    etag = '"abc-1"'
+
+    assert not is_not_modified(make_request({}), etag)
+    assert is_not_modified(make_request({"If-None-Match": etag}), etag)
+    assert is_not_modified(make_request({"If-None-Match": '"old", ' + etag}), etag)
+    assert is_not_modified(make_request({"If-None-Match": "W/" + etag}), etag)
+    assert is_not_modified(make_request({"If-None-Match": "*"}), etag)
+    assert not is_not_modified(make_request({"If-None-Match": '"abc-0"'}), etag)
+
+
+def test_not_modified_response_has_no_body():
+    """Test that 304 responses carry the ETag and no body."""
+    response = not_modified_response('"abc-1"')
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"abc-1"'
+    assert response.body == b""
+
+
+def test_fieldset_projection_always_includes_id():
+    """Test that requested fields are projected along with _id."""
+    assert fieldset_projection(Quote, "customer_name, status,total_amount") == {
+        "_id": 1, "customer_name": 1, "status": 1, "total_amount": 1,
+    }
+
+
+def test_fieldset_projection_rejects_unknown_fields():
+    """Test that fields outside the model are rejected, naming them."""
+    with pytest.raises(ValueError, match="internal_note"):
+        fieldset_projection(Product, "name,internal_note")
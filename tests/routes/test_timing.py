@@ -0,0 +1,115 @@
+"""
+Tests for the opt-in Server-Timing breakdown.
+"""
+from typing import List
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from main import ServerTimingMiddleware, app
+from settings import settings
+from timing import DB, JSON, VALIDATION, RequestTimings, TimedRoute, current_timings, timed
+
+
+def server_timing(response):
+    """Parse a Server-Timing header into durations in milliseconds by metric name."""
+    durations = {}
+    for metric in response.headers["server-timing"].split(", "):
+        name, duration, _ = metric.split(";")
+        durations[name] = float(duration.removeprefix("dur="))
+    return durations
+
+
+class Item(BaseModel):
+    name: str
+    quantity: float
+
+
+def timed_app():
+    """Build an app whose one route validates a large body and response model."""
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post("/items", response_model=List[Item])
+    async def echo_items(items: List[Item]) -> List[Item]:
+        return items
+
+    timed = FastAPI()
+    timed.include_router(router)
+    timed.add_middleware(ServerTimingMiddleware)
+    return timed
+
+
+def test_server_timing_is_off_by_default():
+    """Test that requests without the debug header get no Server-Timing header."""
+    response = TestClient(app).get("/health")
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+
+
+def test_debug_header_enables_server_timing():
+    """Test that X-Debug-Timing reports every metric plus the total."""
+    response = TestClient(app).get("/health", headers={"X-Debug-Timing": "1"})
+
+    durations = server_timing(response)
+    assert list(durations) == [DB, VALIDATION, JSON, "total"]
+    assert 'desc="MongoDB commands"' in response.headers["server-timing"]
+
+
+def test_setting_enables_server_timing(monkeypatch):
+    """Test that SERVER_TIMING times every request, including rejected ones."""
+    monkeypatch.setattr(settings, "SERVER_TIMING", True)
+
+    response = TestClient(app).post("/products/price-adjustments", json={"percent": 5})
+
+    assert response.status_code == 422
+    assert "total" in server_timing(response)
+
+
+def test_debug_header_can_be_disallowed(monkeypatch):
+    """Test that the debug header is ignored when SERVER_TIMING_DEBUG_HEADER is off."""
+    monkeypatch.setattr(settings, "SERVER_TIMING_DEBUG_HEADER", False)
+
+    response = TestClient(app).get("/health", headers={"X-Debug-Timing": "1"})
+
+    assert "server-timing" not in response.headers
+
+
+def test_timed_route_records_validation_and_serialization():
+    """Test that body validation and response serialization are timed separately."""
+    items = [{"name": f"Item {i}", "quantity": i} for i in range(2_000)]
+
+    response = TestClient(timed_app()).post(
+        "/items", json=items, headers={"X-Debug-Timing": "1"})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2_000
+    durations = server_timing(response)
+    assert durations[VALIDATION] > 0
+    assert durations[JSON] > 0
+    assert durations[VALIDATION] + durations[JSON] <= durations["total"]
+
+
+def test_timed_is_a_no_op_outside_timed_requests():
+    """Test that timed blocks only record while a request is being timed."""
+    with timed(JSON):
+        pass
+
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        with timed(JSON):
+            pass
+    finally:
+        current_timings.reset(token)
+    assert timings.seconds[JSON] > 0
+    assert current_timings.get() is None
+
+
+async def test_server_timing_reports_mongodb_time(client):
+    """Test that the MongoDB commands a request runs are reported as db."""
+    response = await client.get("/products/", headers={"X-Debug-Timing": "1"})
+
+    assert response.status_code == 200
+    assert server_timing(response)[DB] > 0
@@ -0,0 +1,118 @@
+"""
+Unit tests for the streaming CSV and NDJSON upload parsers.
+"""
+from starlette.requests import Request
+
+from routes.uploads import iter_csv_records, iter_ndjson_records
+
+
+def make_request(body, chunk_size=7):
+    """Build a request whose body arrives in small chunks."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "headers": []}, receive)
+
+
+async def collect(records):
+    """Gather the records of an async parser."""
+    return [record async for record in records]
+
+
+async def test_csv_records_use_header_and_skip_blank_values():
+    """Test CSV rows are keyed by the header, with blank values left out."""
+    body = b"name,price,description\nMulch,35.50,\nStone,60,Crushed\n"
+
+    records = await collect(iter_csv_records(make_request(body)))
+
+    assert records == [
+        (1, {"name": "Mulch", "price": "35.50"}, None),
+        (2, {"name": "Stone", "price": "60", "description": "Crushed"}, None),
+    ]
+
+
+async def test_csv_records_handle_quotes_bom_and_crlf():
+    """Test quoted commas, quoted newlines, doubled quotes, a BOM and CRLF endings."""
+    body = '\ufeffname,description\r\n"Mulch, dark","Line 1\nLine ""2"""\r\n'.encode()
+
+    records = await collect(iter_csv_records(make_request(body, chunk_size=3)))
+
+    assert records == [(1, {"name": "Mulch, dark", "description": 'Line 1\nLine "2"'}, None)]
+
+
+async def test_csv_records_report_wrong_column_count():
+    """Test a row with too few columns is reported with its row number."""
+    body = b"name,price\nMulch,35.50\nStone\nSoil,20\n"
+
+    records = await collect(iter_csv_records(make_request(body)))
+
+    assert records[1] == (2, None, "Expected 2 columns, got 1")
+    assert records[2] == (3, {"name": "Soil", "price": "20"}, None)
+
+
+async def test_csv_records_report_unterminated_quote():
+    """Test a quote left open at the end of the upload is reported."""
+    body = b'name,description\nMulch,"never closed\n'
+
+    records = await collect(iter_csv_records(make_request(body)))
+
+    assert records == [(1, None, "Unterminated quoted value")]
+
+
+async def test_csv_records_take_quotes_inside_unquoted_values_literally():
+    """Test an inch mark in an unquoted value does not swallow the rows after it."""
+    body = b'name,price\n3/4" River Rock,10\n"1/2"" Gravel",12\nSoil,20\n'
+
+    records = await collect(iter_csv_records(make_request(body)))
+
+    assert records == [
+        (1, {"name": '3/4" River Rock', "price": "10"}, None),
+        (2, {"name": '1/2" Gravel', "price": "12"}, None),
+        (3, {"name": "Soil", "price": "20"}, None),
+    ]
+
+
+async def test_csv_records_cap_the_lines_of_a_record(monkeypatch):
+    """Test a quoted value running on is reported and parsing resumes after it."""
+    monkeypatch.setattr("routes.uploads.MAX_CSV_RECORD_LINES", 3)
+    body = b'name,price\n"Mulch,10\nStone,12\nSand,14\nSoil,20\n'
+
+    records = await collect(iter_csv_records(make_request(body)))
+
+    assert records == [
+        (1, None, "Quoted value spans more than 3 lines"),
+        (2, {"name": "Soil", "price": "20"}, None),
+    ]
+
+
+async def test_ndjson_records_parse_each_line():
+    """Test NDJSON lines become records, with malformed lines reported."""
+    body = b'{"name": "Mulch"}\n\n[1, 2]\n{"name": \n{"name": "Stone"}'
+
+    records = await collect(iter_ndjson_records(make_request(body)))
+
+    assert records[0] == (1, {"name": "Mulch"}, None)
+    assert records[1] == (2, None, "Expected a JSON object")
+    assert records[2][0] == 3 and records[2][2].startswith("Invalid JSON")
+    assert records[3] == (4, {"name": "Stone"}, None)
+
+
+async def test_ndjson_records_keep_unicode_line_separators_in_values():
+    """Test that only newlines split records, not separators inside strings."""
+    body = '{"name": "Mulch\u2028Dark"}\n'.encode()
+
+    records = await collect(iter_ndjson_records(make_request(body, chunk_size=4)))
+
+    assert records == [(1, {"name": "Mulch\u2028Dark"}, None)]
+
+
+async def test_empty_upload_has_no_records():
+    """Test an empty body yields nothing."""
+    assert await collect(iter_csv_records(make_request(b""))) == []
+    assert await collect(iter_ndjson_records(make_request(b""))) == []